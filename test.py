@@ -20,32 +20,105 @@ Run via REST endpoint: Upload BRD, graph runs, returns final state/output.
 brd-multiagent-orchestrator/
 ├── pom.xml
 ├── src/
-│   └── main/
-│       ├── java/
-│       │   └── com/
-│       │       └── example/
-│       │           └── brdmultiagent/
-│       │               ├── BrdMultiagentOrchestratorApplication.java
-│       │               ├── config/
-│       │               │   └── AppConfig.java  // Replaces OpenAiConfig; includes beans
-│       │               ├── agent/
-│       │               │   ├── SupervisorAgent.java
-│       │               │   ├── BAAgent.java
-│       │               │   ├── DevAgent.java
-│       │               │   └── CodingAgent.java
-│       │               ├── tool/
-│       │               │   ├── DocumentExtractorTool.java
-│       │               │   ├── OpenAIAnalysisTool.java
-│       │               │   ├── JsonGeneratorTool.java
-│       │               │   ├── MicroserviceCallerTool.java
-│       │               │   └── JenkinsApiCallerTool.java
-│       │               ├── graph/
-│       │               │   ├── BrdWorkflowGraph.java
-│       │               │   └── AgentState.java  // Custom state
-│       │               └── controller/
-│       │                   └── UploadController.java  // Replaces service
-│       └── resources/
-│           └── application.yml
+│   ├── main/
+│   │   ├── java/
+│   │   │   └── com/
+│   │   │       └── example/
+│   │   │           └── brdmultiagent/
+│   │   │               ├── BrdMultiagentOrchestratorApplication.java
+│   │   │               ├── config/
+│   │   │               │   └── AppConfig.java  // Replaces OpenAiConfig; includes beans
+│   │   │               ├── agent/
+│   │   │               │   ├── SupervisorAgent.java
+│   │   │               │   ├── BAAgent.java
+│   │   │               │   ├── DevAgent.java
+│   │   │               │   ├── CodingAgent.java
+│   │   │               │   ├── ChatCalls.java  // Blocking call or token streaming per run
+│   │   │               │   ├── RouteDecision.java  // Supervisor output schema, shared reader, local repair
+│   │   │               │   └── SupervisorRules.java  // Deterministic routing for unambiguous states
+│   │   │               ├── tool/
+│   │   │               │   ├── DocumentExtractorTool.java
+│   │   │               │   ├── ExtractionCache.java  // Content-hash LRU + optional disk tier
+│   │   │               │   ├── ToolMemoizer.java  // Per-tool idempotency: single-flight + TTL result cache
+│   │   │               │   ├── PageParallelExtractor.java  // Page ranges across a worker pool
+│   │   │               │   ├── DocumentChunks.java  // Lazy, in-order chunk iterator
+│   │   │               │   ├── SectionChunker.java  // Heading/table/requirement-ID aware chunking
+│   │   │               │   ├── DocumentChunk.java
+│   │   │               │   ├── OpenAIAnalysisTool.java  // Single-shot or map-reduce scenario generation
+│   │   │               │   ├── DocumentAnalysisTool.java  // Extraction chunks streamed into the map step
+│   │   │               │   ├── AnalysisResult.java  // Scenarios + per-stage time/tokens
+│   │   │               │   ├── SimpleRateLimiter.java
+│   │   │               │   ├── JsonGeneratorTool.java
+│   │   │               │   ├── MicroserviceCallerTool.java
+│   │   │               │   └── JenkinsApiCallerTool.java
+│   │   │               ├── graph/
+│   │   │               │   ├── BrdWorkflowGraph.java
+│   │   │               │   ├── GraphEventListener.java  // Node/token events for streaming
+│   │   │               │   ├── LoopGuard.java  // Step/token/wall-clock budgets and routing-cycle detection
+│   │   │               │   ├── ContextWindow.java  // Per-agent, token-budgeted message views
+│   │   │               │   ├── ScenarioFanOut.java  // Parallel per-scenario JSON + Excel generation
+│   │   │               │   ├── SpeculativePrefetch.java  // Dev JSON + microservice warm-up while the supervisor decides
+│   │   │               │   ├── ScenarioResult.java
+│   │   │               │   ├── AgentState.java  // Custom state
+│   │   │               │   ├── MessageLog.java  // Immutable, structurally shared message history
+│   │   │               │   ├── Payload.java  // Handle to an interned (gzip, maybe spilled) large output
+│   │   │               │   └── PayloadStore.java  // Content-addressed weak interning, spill to disk
+│   │   │               ├── llm/
+│   │   │               │   ├── LlmCallContext.java  // Which agent/tool is calling the model
+│   │   │               │   ├── InstrumentedChatModel.java  // Outermost decorator: per-call latency/tokens/sizes
+│   │   │               │   ├── CachingChatModel.java  // ChatModel decorator: exact + semantic cache
+│   │   │               │   ├── LlmResponseCache.java  // TTL/LRU store, optional file backing
+│   │   │               │   ├── LlmScheduler.java  // Global RPM/TPM buckets, priorities, fair share, backoff
+│   │   │               │   ├── ScheduledChatModel.java  // Hands caller/run to streamed provider requests
+│   │   │               │   └── ProviderRequestScheduler.java  // Each provider HTTP request goes through the scheduler
+│   │   │               ├── http/
+│   │   │               │   ├── ToolHttpClient.java  // Shared HTTP/2 client: per-host limits, retry, breaker
+│   │   │               │   ├── CircuitBreaker.java
+│   │   │               │   └── HttpCallException.java
+│   │   │               ├── checkpoint/
+│   │   │               │   ├── CheckpointStore.java  // gzip JSON per run + content-addressed artifacts
+│   │   │               │   └── CheckpointCodec.java  // AgentState <-> Checkpoint record
+│   │   │               ├── batch/
+│   │   │               │   ├── BatchIngestService.java  // Zip/multi-file batches: dedup, extract -> graph pipeline
+│   │   │               │   └── IngestBatch.java  // Per-batch outcomes, manifest events, docs/min summary
+│   │   │               ├── trace/
+│   │   │               │   ├── RunTrace.java  // Spans of one run: nodes, LLM calls, tool calls
+│   │   │               │   └── RunTracer.java  // Span recording, Micrometer metrics, slow-run report
+│   │   │               ├── mcp/
+│   │   │               │   ├── McpServer.java  // JSON-RPC dispatch: batches, cached tools/list, tools/call
+│   │   │               │   ├── McpClient.java  // tools/call, batched calls; transport-agnostic
+│   │   │               │   ├── McpClients.java  // In-process fast path for our own /mcp, pooled HTTP otherwise
+│   │   │               │   └── McpException.java
+│   │   │               ├── upload/
+│   │   │               │   ├── UploadRegistry.java  // upload://id -> in-memory or spilled upload
+│   │   │               │   ├── UploadHandle.java  // Ref-counted; last release frees memory/deletes file
+│   │   │               │   └── UploadTooLargeException.java
+│   │   │               ├── job/
+│   │   │               │   ├── BrdJob.java  // Job status, timings, result
+│   │   │               │   └── BrdJobService.java  // Bounded executor + job registry
+│   │   │               └── controller/
+│   │   │                   ├── UploadController.java  // Replaces service
+│   │   │                   ├── UploadSizeAdvice.java  // 413 for container multipart size limit
+│   │   │                   ├── JobController.java  // Job status/result/cancel/trace, slow-run report
+│   │   │                   └── McpController.java  // POST /mcp (JSON-RPC, single or batch)
+│   │   └── resources/
+│   │       └── application.yml
+│   └── test/
+│       └── java/
+│           └── com/example/brdmultiagent/
+│               └── bench/
+│                   ├── GraphCompileBenchmark.java  // JMH: per-request compile vs shared graph
+│                   ├── MapReduceAnalysisBenchmark.java  // JMH: analysis scaling vs document size
+│                   ├── MockChatModel.java  // Deterministic ChatModel with configurable latency + tool loop
+│                   ├── ExtractionCacheBenchmark.java  // JMH: cold PDFBox vs cached extraction
+│                   ├── BrdPdfs.java  // Synthetic BRD PDFs
+│                   ├── StubServices.java  // Local Excel microservice + Jenkins stubs
+│                   ├── BenchProfileConfig.java  // "bench" profile: MockChatModel replaces OpenAI, scheduler kept
+│                   ├── BenchApp.java  // Boots the real app with stubs and the bench profile
+│                   ├── EndToEndBenchmark.java  // JMH: full graph run, p50/p99, -prof gc
+│                   ├── LoadDriver.java  // HTTP load over sizes x concurrency: docs/min, p50/p99, alloc
+│                   ├── McpLoadTest.java  // MCP hop latency/calls/s: HTTP vs in-process vs batch
+│                   └── AgentStateFootprintBenchmark.java  // Retained heap/run and alloc/step at 1k concurrent runs
 └── README.md
 ```
 
@@ -72,6 +145,7 @@ brd-multiagent-orchestrator/
         <java.version>17</java.version>
         <spring-ai.version>1.0.0-M1</spring-ai.version>
         <langgraph-java.version>0.1.0</langgraph-java.version> <!-- For StateGraph; use latest -->
+        <jmh.version>1.37</jmh.version> <!-- Benchmarks under src/test/java/.../bench -->
     </properties>
 
     <dependencies>
@@ -79,6 +153,10 @@ brd-multiagent-orchestrator/
             <groupId>org.springframework.boot</groupId>
             <artifactId>spring-boot-starter-web</artifactId>
         </dependency>
+        <dependency>
+            <groupId>org.springframework.boot</groupId>
+            <artifactId>spring-boot-starter-actuator</artifactId> <!-- Micrometer metrics -->
+        </dependency>
         <dependency>
             <groupId>org.springframework.ai</groupId>
             <artifactId>spring-ai-openai-spring-boot-starter</artifactId>
@@ -103,6 +181,18 @@ brd-multiagent-orchestrator/
             <artifactId>spring-boot-starter-test</artifactId>
             <scope>test</scope>
         </dependency>
+        <dependency>
+            <groupId>org.openjdk.jmh</groupId>
+            <artifactId>jmh-core</artifactId>
+            <version>${jmh.version}</version>
+            <scope>test</scope>
+        </dependency>
+        <dependency>
+            <groupId>org.openjdk.jmh</groupId>
+            <artifactId>jmh-generator-annprocess</artifactId>
+            <version>${jmh.version}</version>
+            <scope>test</scope>
+        </dependency>
     </dependencies>
 
     <dependencyManagement>
@@ -138,12 +228,131 @@ spring:
         options:
           model: gpt-4o-mini
           temperature: 0.7
+  servlet:
+    multipart:
+      max-file-size: 50MB         # Rejected by the container before the body is fully read
+      max-request-size: 500MB     # Room for /upload-brd/batch; each file is still capped above
+      file-size-threshold: 8MB    # Smaller parts stay in memory inside the container too
 logging:
   level:
     root: INFO
     com.example: DEBUG
 server:
   port: 8080
+brd:
+  jobs:
+    pool-size: 4          # Concurrent graph runs
+    queue-capacity: 50    # Waiting jobs before /upload-brd/jobs returns 429
+    retention-minutes: 60 # Finished jobs kept for status/result polling
+  context:
+    token-budget: 6000    # Per-agent prompt history budget before older turns are summarized
+    keep-recent: 4        # Most recent messages always sent verbatim
+  extraction-cache:
+    max-chars: 50000000   # In-memory LRU bound (~100 MB of UTF-16 text)
+    disk-dir:             # e.g. /var/cache/brd-extraction to survive restarts; empty = memory only
+  tool-memo:               # Repeated tool calls with the same input, within and across runs
+    enabled: true
+    ttl-seconds: 600
+    max-entries: 5000
+    max-result-chars: 2000000  # Larger results are shared single-flight but not kept
+    disabled-tools:            # e.g. openAIAnalysisTool to always re-analyze
+  llm-cache:
+    enabled: true
+    max-entries: 10000    # LRU bound, in memory and in dir (older files are deleted at startup)
+    ttl-hours: 24
+    dir:                  # e.g. /var/cache/brd-llm; empty = memory only
+    disabled-agents: dev_agent,coding_agent  # Their tool loops have side effects (Excel, Jenkins); never replay
+    semantic:
+      enabled: false      # Embedding-similarity tier (extra embedding call per miss)
+      threshold: 0.97     # Cosine similarity needed to reuse a response
+  llm-scheduler:
+    enabled: true
+    requests-per-minute: 500         # Provider RPM limit for the API key (all agents and tools together)
+    tokens-per-minute: 200000        # Provider TPM limit; prompt chars/4 + completion estimate, corrected by usage
+    max-concurrent: 16               # Provider requests in flight; not held while a model's tools run
+    completion-token-estimate: 800
+    high-priority-callers: supervisor        # Short routing calls go first
+    bulk-callers: openAIAnalysisTool         # Map-reduce scenario generation goes last
+    max-retries: 3                   # 429 retries per provider request, after the scheduler's backoff
+    max-backoff-seconds: 60
+  analysis:
+    single-shot-chars: 24000       # Up to this size OpenAIAnalysisTool sends one prompt
+    map-chunk-chars: 12000         # Larger documents are split into chunks of about this size (map)
+    concurrency: 4                 # Chunks analyzed in parallel (shared)
+    max-requests-per-second: 5     # Map-stage rate limit
+  extraction:
+    workers: 4            # Page-range parsing threads (shared)
+    pages-per-task: 16
+    chunk-chars: 4000     # Max chunk size; chunks also break at headings and text/table boundaries
+  checkpoint:
+    enabled: true
+    dir: ${java.io.tmpdir}/brd-checkpoints  # Use a persistent volume in production
+  payload:                # Large agent outputs held by AgentState, shared by content across runs
+    spill-bytes: 262144   # Compressed size above which a payload moves to a file
+    spill-dir: ${java.io.tmpdir}/brd-payloads
+  trace:
+    slow-run-threshold-ms: 120000  # Runs slower than this log their top offenders
+    slow-runs-kept: 20             # GET /jobs/slow-runs
+    recent-runs: 200               # Finished traces held until their job stores them
+  budget:                 # Checked after each supervisor decision; exhaustion finishes the run with partial results
+    max-steps: 20         # Graph steps, including those before a resume
+    max-tokens: 300000    # LLM tokens in this execution
+    max-duration-seconds: 1800
+    max-route-repeats: 2  # Same agent (or 2-3 agent sequence) routed more than this many times in a row = cycle
+  batch:
+    extract-workers: 2    # Documents extracted ahead of their graph runs (pipeline depth)
+    max-in-flight: 3      # Graph runs from all batches at once; keep below jobs.pool-size for interactive uploads
+    max-documents: 200    # Per request, after zip expansion
+  upload:
+    max-bytes: 52428800             # 50 MB; keep in line with spring.servlet.multipart.max-file-size
+    memory-threshold-bytes: 8388608 # Uploads up to 8 MB are parsed from memory, larger ones spill to one temp file
+  microservice:
+    url: http://localhost:8081/api/excel  # Excel generation microservice
+  jenkins:
+    url: http://localhost:8082/job/brd-tests/buildWithParameters
+    user: ${JENKINS_USER:}
+    token: ${JENKINS_TOKEN:}
+  http:
+    connect-timeout-ms: 2000
+    request-timeout-ms: 30000
+    max-per-host: 20      # Concurrent requests per host; extra callers wait for a slot
+    retry:
+      max-attempts: 3
+      base-delay-ms: 200  # Full-jitter exponential backoff
+      max-delay-ms: 5000
+      idempotent-targets: # Targets safe to re-send after IO errors/timeouts/5xx (e.g. microservice if it
+                          # de-duplicates). Others retry only 429 and connect failures; never list jenkins.
+    circuit-breaker:
+      failure-threshold: 5
+      open-ms: 30000
+  dev:
+    fan-out:
+      concurrency: 8                  # Scenarios processed in parallel (shared across runs)
+      scenario-timeout-seconds: 120   # Per-scenario JSON + Excel budget, counted from when a worker starts it
+  speculation:            # Dev's jsonGeneratorTool runs while the supervisor's LLM decides after BA (not on the fast path)
+    enabled: true
+    concurrency: 4        # Shared by all runs
+    max-scenarios: 50     # Caps work thrown away when the supervisor routes elsewhere
+  supervisor:
+    fast-path:
+      enabled: true       # Rule-based routing when the next step is obvious; LLM only for ambiguous states
+    json-mode: true       # Provider JSON response format for LLM routing (OpenAI); off for models without it
+  mcp:
+    token: ${MCP_TOKEN:}  # Bearer token required on POST /mcp; empty = /mcp refuses every HTTP request
+    tools: documentExtractorTool,documentAnalysisTool,openAIAnalysisTool,jsonGeneratorTool  # Exposed over MCP; side-effecting tools only if listed
+    upload-only-tools: documentExtractorTool,documentAnalysisTool  # Accept upload:// references only, never server paths
+    max-batch: 100        # JSON-RPC requests per batch
+    batch-concurrency: 8  # Batch entries executed in parallel (shared pool)
+    in-process: true      # Calls to our own /mcp skip HTTP (same JSON-RPC semantics)
+    self-urls:            # Extra URLs that mean "this instance", e.g. its public /mcp URL
+    client:
+      connect-timeout-ms: 2000
+      request-timeout-ms: 60000
+management:
+  endpoints:
+    web:
+      exposure:
+        include: health,metrics
 ```
 
 ### src/main/java/com/example/brdmultiagent/BrdMultiagentOrchestratorApplication.java
@@ -165,16 +374,42 @@ public class BrdMultiagentOrchestratorApplication {
 ```java
 package com.example.brdmultiagent.config;
 
+import com.example.brdmultiagent.llm.CachingChatModel;
+import com.example.brdmultiagent.llm.InstrumentedChatModel;
+import com.example.brdmultiagent.llm.LlmResponseCache;
+import com.example.brdmultiagent.llm.LlmScheduler;
+import com.example.brdmultiagent.llm.ProviderRequestScheduler;
+import com.example.brdmultiagent.llm.ScheduledChatModel;
 import com.example.brdmultiagent.tool.*;
+import com.example.brdmultiagent.tool.ToolMemoizer.Idempotency;
+import com.example.brdmultiagent.trace.RunTracer;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import io.micrometer.core.instrument.MeterRegistry;
 import org.springframework.ai.chat.client.ChatClient;
 import org.springframework.ai.chat.model.ChatModel;
 import org.springframework.ai.openai.OpenAiChatModel;
+import org.springframework.ai.openai.OpenAiChatOptions;
+import org.springframework.ai.openai.OpenAiEmbeddingModel;
 import org.springframework.ai.openai.api.OpenAiApi;
+import org.springframework.ai.retry.RetryUtils;
+import org.springframework.beans.factory.annotation.Qualifier;
 import org.springframework.beans.factory.annotation.Value;
 import org.springframework.context.annotation.Bean;
 import org.springframework.context.annotation.Configuration;
 import org.springframework.ai.model.function.FunctionCallback;
 import org.springframework.ai.model.function.FunctionCallbackWrapper;
+import org.springframework.http.client.BufferingClientHttpRequestFactory;
+import org.springframework.http.client.SimpleClientHttpRequestFactory;
+import org.springframework.retry.support.RetryTemplate;
+import org.springframework.web.client.RestClient;
+import org.springframework.web.reactive.function.client.WebClient;
+
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.time.Duration;
+import java.util.Set;
+import java.util.function.Function;
 
 @Configuration
 public class AppConfig {
@@ -182,9 +417,78 @@ public class AppConfig {
     @Value("${spring.ai.openai.api-key}")
     private String openAiApiKey;
 
+    @Value("${spring.ai.openai.base-url:https://api.openai.com}")
+    private String openAiBaseUrl;
+
+    @Value("${brd.llm-cache.enabled:true}")
+    private boolean llmCacheEnabled;
+
+    @Value("${brd.llm-scheduler.enabled:true}")
+    private boolean llmSchedulerEnabled;
+
+    // instrumentation -> cache -> scheduler -> OpenAI: only real provider calls are rate limited,
+    // every agent/tool call is traced. With the scheduler on, each provider request is granted separately and
+    // OpenAiChatModel's own RetryTemplate is off, so 429s reach the scheduler's backoff instead of being
+    // retried behind its back.
     @Bean
-    public ChatModel chatModel() {
-        return new OpenAiChatModel(new OpenAiApi(openAiApiKey));
+    public ChatModel chatModel(LlmResponseCache llmResponseCache,
+                               LlmScheduler llmScheduler,
+                               RunTracer runTracer,
+                               UploadRegistry uploadRegistry,
+                               @Value("${brd.llm-cache.disabled-agents:dev_agent,coding_agent}") Set<String> disabledAgents,
+                               @Value("${brd.llm-scheduler.completion-token-estimate:800}") int completionTokenEstimate,
+                               @Value("${brd.llm-scheduler.max-retries:3}") int maxRetries) {
+        ChatModel model;
+        if (llmSchedulerEnabled) {
+            ProviderRequestScheduler requests = new ProviderRequestScheduler(llmScheduler, completionTokenEstimate, maxRetries);
+            OpenAiApi api = new OpenAiApi(openAiBaseUrl, openAiApiKey,
+                    RestClient.builder()
+                            .requestFactory(new BufferingClientHttpRequestFactory(new SimpleClientHttpRequestFactory()))
+                            .requestInterceptor(requests),
+                    WebClient.builder().filter(requests.streamingFilter()),
+                    RetryUtils.DEFAULT_RESPONSE_ERROR_HANDLER);
+            OpenAiChatOptions defaults = OpenAiChatOptions.builder()
+                    .withModel(OpenAiApi.DEFAULT_CHAT_MODEL)
+                    .withTemperature(0.7f)
+                    .build(); // OpenAiChatModel's own defaults
+            model = new ScheduledChatModel(
+                    new OpenAiChatModel(api, defaults, null, RetryTemplate.builder().maxAttempts(1).build()),
+                    completionTokenEstimate);
+        } else {
+            model = new OpenAiChatModel(new OpenAiApi(openAiApiKey));
+        }
+        if (llmCacheEnabled) {
+            model = new CachingChatModel(model, llmResponseCache, disabledAgents, uploadRegistry::normalizeReferences);
+        }
+        return new InstrumentedChatModel(model, runTracer);
+    }
+
+    @Bean
+    public LlmScheduler llmScheduler(MeterRegistry meterRegistry,
+                                     @Value("${brd.llm-scheduler.requests-per-minute:500}") int requestsPerMinute,
+                                     @Value("${brd.llm-scheduler.tokens-per-minute:200000}") int tokensPerMinute,
+                                     @Value("${brd.llm-scheduler.max-concurrent:16}") int maxConcurrent,
+                                     @Value("${brd.llm-scheduler.high-priority-callers:supervisor}") Set<String> highPriorityCallers,
+                                     @Value("${brd.llm-scheduler.bulk-callers:openAIAnalysisTool}") Set<String> bulkCallers,
+                                     @Value("${brd.llm-scheduler.max-backoff-seconds:60}") long maxBackoffSeconds) {
+        return new LlmScheduler(requestsPerMinute, tokensPerMinute, maxConcurrent, highPriorityCallers, bulkCallers,
+                Duration.ofSeconds(maxBackoffSeconds), meterRegistry);
+    }
+
+    @Bean
+    public LlmResponseCache llmResponseCache(MeterRegistry meterRegistry,
+                                             @Value("${brd.llm-cache.max-entries:10000}") int maxEntries,
+                                             @Value("${brd.llm-cache.ttl-hours:24}") long ttlHours,
+                                             @Value("${brd.llm-cache.dir:}") String dir,
+                                             @Value("${brd.llm-cache.semantic.enabled:false}") boolean semanticEnabled,
+                                             @Value("${brd.llm-cache.semantic.threshold:0.97}") double threshold) throws IOException {
+        return new LlmResponseCache(
+                dir.isBlank() ? null : Path.of(dir),
+                maxEntries,
+                Duration.ofHours(ttlHours),
+                semanticEnabled ? new OpenAiEmbeddingModel(new OpenAiApi(openAiApiKey)) : null,
+                threshold,
+                meterRegistry);
     }
 
     @Bean
@@ -192,10 +496,16 @@ public class AppConfig {
         return ChatClient.builder(chatModel).build();
     }
 
-    // Tools as FunctionCallbacks
+    // Tools as FunctionCallbacks; each call is timed and sized as a "tool" span of the current run.
+    // Idempotency says how far ToolMemoizer may dedupe: extraction, analysis and JSON generation are pure
+    // for a given input; the microservice writes an Excel per call, so only concurrent duplicates are merged;
+    // every Jenkins call must trigger a build.
     @Bean("documentExtractorTool")
-    public FunctionCallback documentExtractorTool(DocumentExtractorTool impl) {
-        return FunctionCallbackWrapper.builder(impl::extract)
+    public FunctionCallback documentExtractorTool(DocumentExtractorTool impl, RunTracer runTracer, ToolMemoizer memoizer,
+                                                  UploadRegistry uploadRegistry) {
+        return FunctionCallbackWrapper.builder(runTracer.tool("documentExtractorTool",
+                        memoizer.memoize("documentExtractorTool", Idempotency.CACHEABLE, impl::extract,
+                                documentKey(uploadRegistry))))
                 .withName("documentExtractorTool")
                 .withDescription("Extract text from BRD file")
                 .withInputType(String.class) // filePath
@@ -204,8 +514,9 @@ public class AppConfig {
     }
 
     @Bean("openAIAnalysisTool")
-    public FunctionCallback openAIAnalysisTool(OpenAIAnalysisTool impl) {
-        return FunctionCallbackWrapper.builder(impl::analyze)
+    public FunctionCallback openAIAnalysisTool(OpenAIAnalysisTool impl, RunTracer runTracer, ToolMemoizer memoizer) {
+        return FunctionCallbackWrapper.builder(runTracer.tool("openAIAnalysisTool",
+                        memoizer.memoize("openAIAnalysisTool", Idempotency.CACHEABLE, impl::analyze)))
                 .withName("openAIAnalysisTool")
                 .withDescription("Analyze content with OpenAI and generate scenarios")
                 .withInputType(String.class) // content
@@ -213,9 +524,53 @@ public class AppConfig {
                 .build();
     }
 
+    @Bean("documentAnalysisTool")
+    public FunctionCallback documentAnalysisTool(DocumentAnalysisTool impl, RunTracer runTracer, ToolMemoizer memoizer,
+                                                 UploadRegistry uploadRegistry) {
+        return FunctionCallbackWrapper.builder(runTracer.tool("documentAnalysisTool",
+                        memoizer.memoize("documentAnalysisTool", Idempotency.CACHEABLE, impl::analyzeDocument,
+                                documentKey(uploadRegistry))))
+                .withName("documentAnalysisTool")
+                .withDescription("Extract a BRD file and generate scenarios from it in one streaming step")
+                .withInputType(String.class) // file reference
+                .withOutputType(String.class) // scenarios
+                .build();
+    }
+
+    // Memo key for tools that take a BRD reference: every upload gets a new id, so an upload:// reference is keyed
+    // by the document's hash (shared by runs of the same BRD); a plain path by its size and modification time, so a
+    // file edited on disk is extracted again
+    private static Function<String, String> documentKey(UploadRegistry uploadRegistry) {
+        return ref -> {
+            if (ref.contains("upload://")) {
+                return uploadRegistry.normalizeReferences(ref);
+            }
+            try {
+                Path file = Path.of(ref);
+                return ref + '@' + Files.size(file) + ':' + Files.getLastModifiedTime(file).toMillis();
+            } catch (IOException | RuntimeException e) {
+                return ref; // Unreadable: the tool fails or falls back, and neither result is cached
+            }
+        };
+    }
+
+    // The memoized, traced calls on their own, for the Dev fan-out and speculation, which call them directly
+    // rather than through the LLM; they share the cache and in-flight calls with the FunctionCallbacks below
+    @Bean("jsonGeneration")
+    public Function<String, String> jsonGeneration(JsonGeneratorTool impl, RunTracer runTracer, ToolMemoizer memoizer) {
+        return runTracer.tool("jsonGeneratorTool",
+                memoizer.memoize("jsonGeneratorTool", Idempotency.CACHEABLE, impl::generateJson));
+    }
+
+    @Bean("microserviceCall")
+    public Function<String, String> microserviceCall(MicroserviceCallerTool impl, RunTracer runTracer, ToolMemoizer memoizer) {
+        return runTracer.tool("microserviceCallerTool",
+                memoizer.memoize("microserviceCallerTool", Idempotency.SINGLE_FLIGHT, impl::callMicroservice));
+    }
+
     @Bean("jsonGeneratorTool")
-    public FunctionCallback jsonGeneratorTool(JsonGeneratorTool impl) {
-        return FunctionCallbackWrapper.builder(impl::generateJson)
+    public FunctionCallback jsonGeneratorTool(@Qualifier("jsonGeneration") Function<String, String> jsonGeneration) {
+        return FunctionCallbackWrapper.builder(jsonGeneration)
                 .withName("jsonGeneratorTool")
                 .withDescription("Generate JSON from scenarios")
                 .withInputType(String.class)
@@ -224,8 +579,8 @@ public class AppConfig {
     }
 
     @Bean("microserviceCallerTool")
-    public FunctionCallback microserviceCallerTool(MicroserviceCallerTool impl) {
-        return FunctionCallbackWrapper.builder(impl::callMicroservice)
+    public FunctionCallback microserviceCallerTool(@Qualifier("microserviceCall") Function<String, String> microserviceCall) {
+        return FunctionCallbackWrapper.builder(microserviceCall)
                 .withName("microserviceCallerTool")
                 .withDescription("Call microservice with JSON to get Excel")
                 .withInputType(String.class)
@@ -234,8 +589,9 @@ public class AppConfig {
     }
 
     @Bean("jenkinsApiCallerTool")
-    public FunctionCallback jenkinsApiCallerTool(JenkinsApiCallerTool impl) {
-        return FunctionCallbackWrapper.builder(impl::callJenkins)
+    public FunctionCallback jenkinsApiCallerTool(JenkinsApiCallerTool impl, RunTracer runTracer, ToolMemoizer memoizer) {
+        return FunctionCallbackWrapper.builder(runTracer.tool("jenkinsApiCallerTool",
+                        memoizer.memoize("jenkinsApiCallerTool", Idempotency.NONE, impl::callJenkins)))
                 .withName("jenkinsApiCallerTool")
                 .withDescription("Send Excel to Jenkins API")
                 .withInputType(String.class)
@@ -249,21 +605,131 @@ public class AppConfig {
 ```java
 package com.example.brdmultiagent.graph;
 
+import org.springframework.ai.chat.messages.AssistantMessage;
 import org.springframework.ai.chat.messages.Message;
-import java.util.ArrayList;
+import java.util.Collections;
+import java.util.HashMap;
 import java.util.List;
 import java.util.Map;
+import java.util.concurrent.CompletableFuture;
 
 public class AgentState {
-    private List<Message> messages = new ArrayList<>();
+    public static final String AGENT_KEY = "agent";
+    public static final String ARTIFACT_KEY = "artifact";
+    private static final int INLINE_OUTPUT_CHARS = 2000;
+    private static final int PREVIEW_CHARS = 300;
+
+    // Persistent: each append returns a new version sharing the earlier messages, so views never copy
+    private MessageLog messages = MessageLog.empty();
     private String next; // For routing
+    private transient GraphEventListener listener; // Set only for streaming runs
+
+    // Large agent outputs (scenario lists, extracted BRD text) live here as interned handles; history keeps
+    // a short reference
+    private final Map<String, Payload> artifacts = new HashMap<>();
+    private String summary; // Rolling summary of messages[1, summarizedUpTo)
+    private int summarizedUpTo = 1;
+    private List<ScenarioResult> scenarioResults = List.of(); // Dev fan-out results, in scenario order
+    private String runId; // Job id; names the checkpoint
+    private int steps;    // Graph nodes completed so far
+    // jsonGeneratorTool results started while the supervisor decided, by scenario; not checkpointed
+    private transient Map<String, CompletableFuture<String>> prefetchedJson = Map.of();
 
-    public List<Message> getMessages() {
+    public MessageLog getMessages() {
         return messages;
     }
 
+    public String getRunId() {
+        return runId;
+    }
+
+    public void setRunId(String runId) {
+        this.runId = runId;
+    }
+
+    public int getSteps() {
+        return steps;
+    }
+
+    public void setSteps(int steps) {
+        this.steps = steps;
+    }
+
+    public Map<String, Payload> getArtifactPayloads() {
+        return Collections.unmodifiableMap(artifacts);
+    }
+
+    // Checkpoint restore only; agents add artifacts through addAgentOutput
+    public void restoreArtifact(String key, String content) {
+        artifacts.put(key, PayloadStore.shared().intern(content));
+    }
+
     public void addMessage(Message message) {
-        messages.add(message);
+        messages = messages.append(message);
+    }
+
+    // Records an agent's output; anything large is stored once as an artifact and referenced from history.
+    // Artifacts are keyed per message (agent@index), so a later turn of the same agent never replaces what
+    // earlier references point to.
+    public void addAgentOutput(String agent, String content) {
+        if (content == null || content.length() <= INLINE_OUTPUT_CHARS) {
+            addMessage(new AssistantMessage(content == null ? "" : content, Map.of(AGENT_KEY, agent)));
+            return;
+        }
+        String key = agent + "@" + messages.size();
+        artifacts.put(key, PayloadStore.shared().intern(content));
+        String reference = "[" + agent + " output stored as artifact '" + key + "', " + content.length()
+                + " chars] Preview: " + content.substring(0, PREVIEW_CHARS) + "...";
+        addMessage(new AssistantMessage(reference, Map.of(AGENT_KEY, agent, ARTIFACT_KEY, key)));
+    }
+
+    public String getArtifact(String key) {
+        Payload payload = artifacts.get(key);
+        return payload == null ? null : payload.text();
+    }
+
+    // Full text of the agent's most recent output, whether it was inlined or stored as an artifact
+    public String getLatestOutput(String agent) {
+        for (int i = messages.size() - 1; i >= 0; i--) {
+            Map<String, Object> metadata = messages.get(i).getMetadata();
+            if (agent.equals(metadata.get(AGENT_KEY))) {
+                Object artifactKey = metadata.get(ARTIFACT_KEY);
+                return artifactKey != null ? getArtifact(artifactKey.toString()) : messages.get(i).getContent();
+            }
+        }
+        return null;
+    }
+
+    public List<ScenarioResult> getScenarioResults() {
+        return scenarioResults;
+    }
+
+    public void setScenarioResults(List<ScenarioResult> scenarioResults) {
+        this.scenarioResults = List.copyOf(scenarioResults);
+    }
+
+    public void setPrefetchedJson(Map<String, CompletableFuture<String>> prefetchedJson) {
+        this.prefetchedJson = prefetchedJson;
+    }
+
+    // Used once by the Dev agent; a later Dev turn starts from scratch
+    public Map<String, CompletableFuture<String>> takePrefetchedJson() {
+        Map<String, CompletableFuture<String>> taken = prefetchedJson;
+        prefetchedJson = Map.of();
+        return taken;
+    }
+
+    public String getSummary() {
+        return summary;
+    }
+
+    public int getSummarizedUpTo() {
+        return summarizedUpTo;
+    }
+
+    public void setSummary(String summary, int summarizedUpTo) {
+        this.summary = summary;
+        this.summarizedUpTo = summarizedUpTo;
     }
 
     public String getNext() {
@@ -274,69 +740,599 @@ public class AgentState {
         this.next = next;
     }
 
-    // For final output: last message content
+    public GraphEventListener getListener() {
+        return listener;
+    }
+
+    public void setListener(GraphEventListener listener) {
+        this.listener = listener;
+    }
+
+    // For final output: last message content (resolved to the full artifact if it was stored as one)
     public String getFinalOutput() {
         if (!messages.isEmpty()) {
-            return messages.get(messages.size() - 1).getContent();
+            Message last = messages.get(messages.size() - 1);
+            Object artifactKey = last.getMetadata().get(ARTIFACT_KEY);
+            return artifactKey != null ? getArtifact(artifactKey.toString()) : last.getContent();
         }
         return "";
     }
 }
 ```
 
+### graph/MessageLog.java
+```java
+package com.example.brdmultiagent.graph;
+
+import org.springframework.ai.chat.messages.Message;
+
+import java.util.AbstractList;
+import java.util.Objects;
+import java.util.RandomAccess;
+import java.util.concurrent.atomic.AtomicInteger;
+
+// Immutable, append-only message history. Versions share one backing array: append() writes into the slot
+// after this version when no other version has claimed it (CAS on the claimed length) and copies only when the
+// array is full or the history forks. A version never changes, so listeners, traces and in-flight prompts can
+// hold it without a defensive copy.
+public final class MessageLog extends AbstractList<Message> implements RandomAccess {
+    private static final int INITIAL_CAPACITY = 16;
+    private static final MessageLog EMPTY = new MessageLog(new Backing(0), 0, 0);
+
+    private static final class Backing {
+        final Message[] items;
+        final AtomicInteger claimed = new AtomicInteger();
+
+        Backing(int capacity) {
+            this.items = new Message[capacity];
+        }
+    }
+
+    private final Backing backing;
+    private final int size;
+    private final long chars; // Total content length, for token estimates without a pass over the messages
+
+    private MessageLog(Backing backing, int size, long chars) {
+        this.backing = backing;
+        this.size = size;
+        this.chars = chars;
+    }
+
+    public static MessageLog empty() {
+        return EMPTY;
+    }
+
+    public MessageLog append(Message message) {
+        long newChars = chars + (message.getContent() == null ? 0 : message.getContent().length());
+        if (size < backing.items.length && backing.claimed.compareAndSet(size, size + 1)) {
+            backing.items[size] = message; // Visible to readers through the new version's final fields
+            return new MessageLog(backing, size + 1, newChars);
+        }
+        Backing grown = new Backing(Math.max(INITIAL_CAPACITY, size * 2));
+        System.arraycopy(backing.items, 0, grown.items, 0, size);
+        grown.items[size] = message;
+        grown.claimed.set(size + 1);
+        return new MessageLog(grown, size + 1, newChars);
+    }
+
+    @Override
+    public Message get(int index) {
+        Objects.checkIndex(index, size);
+        return backing.items[index];
+    }
+
+    @Override
+    public int size() {
+        return size;
+    }
+
+    public long chars() {
+        return chars;
+    }
+}
+```
+
+### graph/Payload.java
+```java
+package com.example.brdmultiagent.graph;
+
+import java.io.ByteArrayInputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.UncheckedIOException;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.zip.GZIPInputStream;
+
+// Handle to a large text held by PayloadStore: gzip bytes on the heap, or a gzip file once spilled.
+// Obtain through PayloadStore.intern; identical texts share one handle.
+public final class Payload {
+    private final String hash;     // SHA-256 of the UTF-8 text; also its checkpoint artifact name
+    private final int length;      // In chars
+    private final int compressedSize;
+    private final byte[] gzipped;  // null when spilled
+    private final Path file;       // non-null when spilled
+
+    Payload(String hash, int length, int compressedSize, byte[] gzipped, Path file) {
+        this.hash = hash;
+        this.length = length;
+        this.compressedSize = compressedSize;
+        this.gzipped = gzipped;
+        this.file = file;
+    }
+
+    // Decoded on every call; callers that need the text repeatedly should keep it for the step
+    public String text() {
+        try (InputStream in = new GZIPInputStream(gzipped != null ? new ByteArrayInputStream(gzipped)
+                : Files.newInputStream(file))) {
+            return new String(in.readAllBytes(), StandardCharsets.UTF_8);
+        } catch (IOException e) {
+            throw new UncheckedIOException("Unreadable payload " + hash, e);
+        }
+    }
+
+    // Same format as checkpoint artifacts (<hash>.txt.gz), so they are written without re-encoding
+    public byte[] gzipped() throws IOException {
+        return gzipped != null ? gzipped : Files.readAllBytes(file);
+    }
+
+    public String hash() {
+        return hash;
+    }
+
+    public int length() {
+        return length;
+    }
+
+    public int compressedSize() {
+        return compressedSize;
+    }
+
+    public boolean isSpilled() {
+        return file != null;
+    }
+
+    Path file() {
+        return file;
+    }
+}
+```
+
+### graph/PayloadStore.java
+```java
+package com.example.brdmultiagent.graph;
+
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.simple.SimpleMeterRegistry;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.UncheckedIOException;
+import java.lang.ref.Cleaner;
+import java.lang.ref.WeakReference;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.HexFormat;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.zip.GZIPOutputStream;
+
+// Large agent outputs (scenario lists, extracted text) are stored once per distinct content, gzip-compressed,
+// and spilled to disk above spill-bytes. AgentState keeps only Payload handles, so concurrent runs of the same
+// or similar BRDs share one copy and the heap holds compressed bytes instead of UTF-16 text. Interning is weak:
+// a payload lives while some state references it, and a spilled file is deleted once its handle is collected.
+// AgentState is created outside Spring (graph factory, checkpoint decode), so it reaches the store via shared();
+// until the context starts that is a default, memory-only instance.
+@Component
+public class PayloadStore {
+    private static final Logger logger = LoggerFactory.getLogger(PayloadStore.class);
+    private static final Cleaner CLEANER = Cleaner.create();
+    private static volatile PayloadStore shared = new PayloadStore(new SimpleMeterRegistry(), Integer.MAX_VALUE, null);
+
+    private final Map<String, WeakReference<Payload>> interned = new ConcurrentHashMap<>();
+    private final int spillBytes;
+    private final Path spillDir; // null = never spill
+    private final AtomicLong heapBytes = new AtomicLong();
+    private final AtomicLong spilledBytes = new AtomicLong();
+    private final Counter hits;
+    private final Counter misses;
+
+    @Autowired
+    public PayloadStore(MeterRegistry meterRegistry,
+                        @Value("${brd.payload.spill-bytes:262144}") int spillBytes,
+                        @Value("${brd.payload.spill-dir:${java.io.tmpdir}/brd-payloads}") String spillDir) {
+        this(meterRegistry, spillBytes, Path.of(spillDir));
+        shared = this;
+    }
+
+    private PayloadStore(MeterRegistry meterRegistry, int spillBytes, Path spillDir) {
+        this.spillBytes = spillBytes;
+        this.spillDir = spillDir;
+        this.hits = meterRegistry.counter("brd.payload.intern", "result", "hit");
+        this.misses = meterRegistry.counter("brd.payload.intern", "result", "miss");
+        meterRegistry.gauge("brd.payload.entries", interned, Map::size);
+        meterRegistry.gauge("brd.payload.heap.bytes", heapBytes);
+        meterRegistry.gauge("brd.payload.spilled.bytes", spilledBytes);
+    }
+
+    public static PayloadStore shared() {
+        return shared;
+    }
+
+    public Payload intern(String text) {
+        String hash = sha256(text);
+        Payload[] result = new Payload[1]; // Strong holder so the new handle survives until returned
+        interned.compute(hash, (key, ref) -> {
+            Payload existing = ref == null ? null : ref.get();
+            if (existing != null) {
+                hits.increment();
+                result[0] = existing;
+                return ref;
+            }
+            misses.increment();
+            result[0] = create(key, text);
+            WeakReference<Payload> created = new WeakReference<>(result[0]);
+            register(result[0], key, created);
+            return created;
+        });
+        return result[0];
+    }
+
+    private Payload create(String hash, String text) {
+        byte[] gzipped = gzip(text);
+        if (spillDir == null || gzipped.length < spillBytes) {
+            return new Payload(hash, text.length(), gzipped.length, gzipped, null);
+        }
+        try {
+            Files.createDirectories(spillDir);
+            Path file = Files.createTempFile(spillDir, hash, ".txt.gz");
+            Files.write(file, gzipped);
+            return new Payload(hash, text.length(), gzipped.length, null, file);
+        } catch (IOException e) {
+            logger.warn("Could not spill payload {} ({} bytes); keeping it on the heap", hash, gzipped.length, e);
+            return new Payload(hash, text.length(), gzipped.length, gzipped, null);
+        }
+    }
+
+    // Accounts for the payload and undoes that (and deletes any spill file) once the handle is unreachable
+    private void register(Payload payload, String hash, WeakReference<Payload> ref) {
+        long size = payload.compressedSize();
+        AtomicLong counter = payload.isSpilled() ? spilledBytes : heapBytes;
+        counter.addAndGet(size);
+        Path file = payload.file();
+        Map<String, WeakReference<Payload>> entries = interned;
+        CLEANER.register(payload, () -> {
+            counter.addAndGet(-size);
+            entries.remove(hash, ref);
+            if (file != null) {
+                try {
+                    Files.deleteIfExists(file);
+                } catch (IOException ignored) {
+                    // Left for the temp directory cleanup
+                }
+            }
+        });
+    }
+
+    private static byte[] gzip(String text) {
+        byte[] raw = text.getBytes(StandardCharsets.UTF_8);
+        ByteArrayOutputStream buffer = new ByteArrayOutputStream(raw.length / 4 + 64);
+        try (OutputStream out = new GZIPOutputStream(buffer)) {
+            out.write(raw);
+        } catch (IOException e) {
+            throw new UncheckedIOException(e);
+        }
+        return buffer.toByteArray();
+    }
+
+    private static String sha256(String value) {
+        try {
+            byte[] hash = MessageDigest.getInstance("SHA-256").digest(value.getBytes(StandardCharsets.UTF_8));
+            return HexFormat.of().formatHex(hash);
+        } catch (NoSuchAlgorithmException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+}
+```
+
 ### agent/SupervisorAgent.java
 ```java
 package com.example.brdmultiagent.agent;
 
 import com.example.brdmultiagent.graph.AgentState;
-import com.fasterxml.jackson.databind.ObjectMapper;
+import com.example.brdmultiagent.graph.ContextWindow;
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
 import org.springframework.ai.chat.client.ChatClient;
 import org.springframework.ai.chat.messages.AssistantMessage;
 import org.springframework.ai.chat.messages.Message;
 import org.springframework.ai.chat.messages.SystemMessage;
 import org.springframework.ai.chat.messages.UserMessage;
+import org.springframework.ai.openai.OpenAiChatOptions;
+import org.springframework.ai.openai.api.OpenAiApi;
 import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.beans.factory.annotation.Value;
 import org.springframework.stereotype.Component;
 
+import java.util.ArrayList;
 import java.util.List;
-import java.util.Map;
+import java.util.Optional;
+import java.util.concurrent.TimeUnit;
 
 @Component
 public class SupervisorAgent {
+    private static final Logger logger = LoggerFactory.getLogger(SupervisorAgent.class);
+    private static final String REPROMPT = "Your last reply was not a valid routing decision. "
+            + "Reply with only a JSON object matching: " + RouteDecision.SCHEMA;
 
     private final ChatClient chatClient;
+    private final ContextWindow contextWindow;
+    private final MeterRegistry meterRegistry;
+    private final boolean fastPathEnabled;
+    private final OpenAiChatOptions jsonOptions; // null = provider JSON mode off
+    private final Timer llmRoutingTimer;
+    private final Counter ruleRoutes;
 
     @Autowired
-    public SupervisorAgent(ChatClient chatClient) {
+    public SupervisorAgent(ChatClient chatClient, ContextWindow contextWindow, MeterRegistry meterRegistry,
+                           @Value("${brd.supervisor.fast-path.enabled:true}") boolean fastPathEnabled,
+                           @Value("${brd.supervisor.json-mode:true}") boolean jsonMode) {
+        this.contextWindow = contextWindow;
+        this.meterRegistry = meterRegistry;
+        this.fastPathEnabled = fastPathEnabled;
+        // Provider-side JSON mode: the model can only answer with a JSON object; the schema is in the prompt
+        this.jsonOptions = jsonMode ? OpenAiChatOptions.builder()
+                .withResponseFormat(new OpenAiApi.ChatCompletionRequest.ResponseFormat("json_object"))
+                .build() : null;
+        this.llmRoutingTimer = Timer.builder("brd.supervisor.llm.latency").register(meterRegistry);
+        this.ruleRoutes = meterRegistry.counter("brd.supervisor.routes.rule");
+        // Estimated time saved = rule-routed decisions x mean LLM routing latency
+        meterRegistry.gauge("brd.supervisor.saved.ms", this,
+                s -> s.ruleRoutes.count() * s.llmRoutingTimer.mean(TimeUnit.MILLISECONDS));
         this.chatClient = chatClient.defaultSystem("""
                 You are the Supervisor Agent coordinating BRD processing.
                 Agents: ba_agent (extract/analyze BRD, generate scenarios), dev_agent (JSON from scenarios, call microservice for Excel), coding_agent (send Excel to Jenkins).
                 Analyze current state and decide next: "ba_agent", "dev_agent", "coding_agent", or "FINISH".
-                Respond ONLY with JSON: {"next": "agent_name or FINISH"}
-                """);
+                Respond ONLY with a JSON object matching this schema (reason: one short sentence):
+                """ + RouteDecision.SCHEMA);
+    }
+
+    // True when invoke() will route from the state alone, without a model call
+    public boolean routesByRule(AgentState state) {
+        return fastPathEnabled && SupervisorRules.decide(state).isPresent();
     }
 
     public AgentState invoke(AgentState state) {
-        // Build prompt with history
-        List<Message> promptMessages = new ArrayList<>(state.getMessages());
-        promptMessages.add(0, new SystemMessage(chatClient.getDefaultSystemPrompt())); // Ensure system
+        // Fast path: the state alone says what comes next, no LLM call needed
+        if (fastPathEnabled) {
+            Optional<String> next = SupervisorRules.decide(state);
+            if (next.isPresent()) {
+                state.setNext(next.get());
+                state.addAgentOutput("supervisor", "{\"next\": \"" + next.get() + "\"}");
+                ruleRoutes.increment();
+                meterRegistry.counter("brd.supervisor.routes", "path", "rule", "next", next.get()).increment();
+                return state;
+            }
+        }
 
-        String response = chatClient.prompt()
-                .messages(promptMessages)
-                .call()
-                .content();
+        // Build prompt from the supervisor's view: artifacts stay as references, older turns summarized
+        List<Message> view = contextWindow.viewFor("supervisor", state);
+        List<Message> promptMessages = new ArrayList<>(view.size() + 3); // Room for a re-ask
+        promptMessages.add(new SystemMessage(chatClient.getDefaultSystemPrompt())); // Ensure system
+        promptMessages.addAll(view);
 
-        // Parse JSON for next
-        try {
-            Map<String, String> json = new ObjectMapper().readValue(response, Map.class);
-            state.setNext(json.getOrDefault("next", "FINISH"));
-        } catch (Exception e) {
-            state.setNext("FINISH");
+        String response = route(promptMessages, state);
+        RouteDecision decision = parse(response, "parsed").or(() -> repaired(response)).orElse(null);
+        if (decision == null) {
+            // One corrective round trip; never guess FINISH, that would drop the run's work
+            promptMessages.add(new AssistantMessage(response));
+            promptMessages.add(new UserMessage(REPROMPT));
+            String retry = route(promptMessages, state);
+            decision = parse(retry, "reprompted").or(() -> repaired(retry)).orElse(null);
+        }
+        if (decision == null) {
+            meterRegistry.counter("brd.supervisor.parse", "outcome", "failed").increment();
+            logger.warn("Unparseable supervisor decision for run {}: {}", state.getRunId(), response);
+            // Fails the job; the last checkpoint is kept, so POST /jobs/{id}/resume retries this step
+            throw new IllegalStateException("Supervisor returned no valid routing decision");
         }
 
-        state.addMessage(new AssistantMessage(response));
+        state.setNext(decision.next());
+        meterRegistry.counter("brd.supervisor.routes", "path", "llm", "next", decision.next()).increment();
+        state.addAgentOutput("supervisor", decision.toJson()); // Canonical form, whatever the model wrote
         return state;
     }
+
+    private String route(List<Message> promptMessages, AgentState state) {
+        ChatClient.ChatClientRequest request = chatClient.prompt().messages(promptMessages);
+        if (jsonOptions != null) {
+            request = request.options(jsonOptions);
+        }
+        long start = System.nanoTime();
+        String response = ChatCalls.content(request, "supervisor", state);
+        llmRoutingTimer.record(System.nanoTime() - start, TimeUnit.NANOSECONDS);
+        return response;
+    }
+
+    private Optional<RouteDecision> parse(String response, String outcome) {
+        Optional<RouteDecision> decision = RouteDecision.parse(response);
+        decision.ifPresent(d -> meterRegistry.counter("brd.supervisor.parse", "outcome", outcome).increment());
+        return decision;
+    }
+
+    private Optional<RouteDecision> repaired(String response) {
+        Optional<RouteDecision> decision = RouteDecision.repair(response);
+        decision.ifPresent(d -> meterRegistry.counter("brd.supervisor.parse", "outcome", "repaired").increment());
+        return decision;
+    }
+}
+```
+
+### agent/RouteDecision.java
+```java
+package com.example.brdmultiagent.agent;
+
+import com.fasterxml.jackson.core.JsonProcessingException;
+import com.fasterxml.jackson.core.json.JsonReadFeature;
+import com.fasterxml.jackson.databind.DeserializationFeature;
+import com.fasterxml.jackson.databind.MapperFeature;
+import com.fasterxml.jackson.databind.ObjectReader;
+import com.fasterxml.jackson.databind.ObjectWriter;
+import com.fasterxml.jackson.databind.json.JsonMapper;
+
+import java.util.List;
+import java.util.Optional;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+// The supervisor's structured answer: {"next": "<route>", "reason": "..."}. The reader is built once
+// and shared; it tolerates the usual LLM slips (single quotes, trailing commas, unknown fields).
+record RouteDecision(String next, String reason) {
+    static final List<String> ROUTES = List.of("ba_agent", "dev_agent", "coding_agent", "FINISH");
+    static final String SCHEMA = """
+            {"type": "object", "properties": {"next": {"enum": ["ba_agent", "dev_agent", "coding_agent", "FINISH"]}, \
+            "reason": {"type": "string"}}, "required": ["next"], "additionalProperties": false}""";
+
+    private static final JsonMapper MAPPER = JsonMapper.builder()
+            .enable(MapperFeature.ACCEPT_CASE_INSENSITIVE_PROPERTIES)
+            .disable(DeserializationFeature.FAIL_ON_UNKNOWN_PROPERTIES)
+            .enable(JsonReadFeature.ALLOW_SINGLE_QUOTES, JsonReadFeature.ALLOW_TRAILING_COMMA,
+                    JsonReadFeature.ALLOW_UNQUOTED_FIELD_NAMES)
+            .build();
+    private static final ObjectReader READER = MAPPER.readerFor(RouteDecision.class);
+    private static final ObjectWriter WRITER = MAPPER.writerFor(RouteDecision.class);
+    private static final Pattern FENCE = Pattern.compile("(?s)```(?:json)?\\s*(.*?)```");
+    // A reply that is nothing but a route, optionally quoted or followed by a full stop
+    private static final Pattern BARE_ROUTE = Pattern.compile("(?i)[\"'`]?(ba_agent|dev_agent|coding_agent|finish)[\"'`]?\\.?");
+
+    // The response as-is; empty if it is not a JSON decision naming a known route
+    static Optional<RouteDecision> parse(String response) {
+        if (response == null || response.isBlank()) {
+            return Optional.empty();
+        }
+        try {
+            RouteDecision decision = READER.readValue(response.strip());
+            return decision == null ? Optional.empty() : decision.normalized();
+        } catch (JsonProcessingException e) {
+            return Optional.empty();
+        }
+    }
+
+    // Cheap local fixes for a response parse() rejected: code fences, prose around the object, and as a last
+    // resort a reply that is only a route name. Prose that merely mentions a route ("do not call coding_agent
+    // yet") is not a decision; it goes to the re-prompt.
+    static Optional<RouteDecision> repair(String response) {
+        if (response == null) {
+            return Optional.empty();
+        }
+        String text = response;
+        Matcher fence = FENCE.matcher(text);
+        if (fence.find()) {
+            text = fence.group(1);
+        }
+        int open = text.indexOf('{');
+        int close = text.lastIndexOf('}');
+        if (open >= 0 && close > open) {
+            Optional<RouteDecision> decision = parse(text.substring(open, close + 1));
+            if (decision.isPresent()) {
+                return decision;
+            }
+        }
+        Matcher route = BARE_ROUTE.matcher(text.strip());
+        return route.matches() ? new RouteDecision(route.group(1), null).normalized() : Optional.empty();
+    }
+
+    String toJson() {
+        try {
+            return WRITER.writeValueAsString(this);
+        } catch (JsonProcessingException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    // Canonical route spelling ("finish" -> "FINISH"); empty for anything that is not a route
+    private Optional<RouteDecision> normalized() {
+        if (next == null) {
+            return Optional.empty();
+        }
+        String trimmed = next.strip();
+        return ROUTES.stream()
+                .filter(route -> route.equalsIgnoreCase(trimmed))
+                .findFirst()
+                .map(route -> new RouteDecision(route, reason));
+    }
+}
+```
+
+### agent/SupervisorRules.java
+```java
+package com.example.brdmultiagent.agent;
+
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ScenarioFanOut;
+import com.example.brdmultiagent.graph.ScenarioResult;
+import org.springframework.ai.chat.messages.Message;
+
+import java.util.List;
+import java.util.Optional;
+import java.util.regex.Pattern;
+
+// The usual ba_agent -> dev_agent -> coding_agent -> FINISH order, decided from AgentState alone.
+// Empty result = ambiguous (unparseable scenarios, failed Excel/Jenkins step); the LLM supervisor decides.
+final class SupervisorRules {
+    private static final Pattern FAILURE = Pattern.compile("(?i)\\b(fail(ed|ure)?|error|exception)\\b");
+
+    private SupervisorRules() {
+    }
+
+    static Optional<String> decide(AgentState state) {
+        String lastAgent = lastAgent(state);
+        if (lastAgent == null) {
+            return Optional.of("ba_agent"); // Nothing has run yet
+        }
+        String output = state.getLatestOutput(lastAgent);
+        return switch (lastAgent) {
+            case "ba_agent" -> ScenarioFanOut.parseScenarios(output).isEmpty()
+                    ? Optional.empty() : Optional.of("dev_agent");
+            case "dev_agent" -> allScenariosSucceeded(state.getScenarioResults())
+                    ? Optional.of("coding_agent") : Optional.empty();
+            case "coding_agent" -> output == null || output.isBlank() || FAILURE.matcher(output).find()
+                    ? Optional.empty() : Optional.of("FINISH");
+            default -> Optional.empty();
+        };
+    }
+
+    private static boolean allScenariosSucceeded(List<ScenarioResult> results) {
+        return !results.isEmpty() && results.stream().allMatch(ScenarioResult::succeeded);
+    }
+
+    // Most recent worker agent (supervisor turns skipped)
+    private static String lastAgent(AgentState state) {
+        List<Message> messages = state.getMessages();
+        for (int i = messages.size() - 1; i >= 0; i--) {
+            Object agent = messages.get(i).getMetadata().get(AgentState.AGENT_KEY);
+            if (agent != null && !"supervisor".equals(agent)) {
+                return agent.toString();
+            }
+        }
+        return null;
+    }
 }
 ```
 
@@ -345,8 +1341,8 @@ public class SupervisorAgent {
 package com.example.brdmultiagent.agent;
 
 import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ContextWindow;
 import org.springframework.ai.chat.client.ChatClient;
-import org.springframework.ai.chat.messages.AssistantMessage;
 import org.springframework.ai.chat.messages.SystemMessage;
 import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.beans.factory.annotation.Qualifier;
@@ -357,26 +1353,30 @@ import org.springframework.ai.model.function.FunctionCallback;
 public class BAAgent {
 
     private final ChatClient baClient;
+    private final ContextWindow contextWindow;
 
     @Autowired
     public BAAgent(ChatClient chatClient,
+                   ContextWindow contextWindow,
+                   @Qualifier("documentAnalysisTool") FunctionCallback documentAnalysisTool,
                    @Qualifier("documentExtractorTool") FunctionCallback extractorTool,
                    @Qualifier("openAIAnalysisTool") FunctionCallback analysisTool) {
+        this.contextWindow = contextWindow;
         this.baClient = chatClient.defaultSystem("""
                 You are BA Agent. Extract BRD content, analyze with OpenAI, generate scenarios.
-                Use tools: documentExtractorTool, openAIAnalysisTool.
+                Start with documentAnalysisTool on the BRD file reference: it extracts and generates scenarios
+                in one step. Use documentExtractorTool and openAIAnalysisTool only to inspect or re-analyze text.
                 Reflect if needed, output scenarios.
                 """)
-                .functions(extractorTool.getName(), analysisTool.getName());
+                .functions(documentAnalysisTool.getName(), extractorTool.getName(), analysisTool.getName());
     }
 
     public AgentState invoke(AgentState state) {
-        String response = baClient.prompt()
-                .messages(state.getMessages())
-                .call()
-                .content(); // Handles tool calls internally if response has tools
+        // Handles tool calls internally if response has tools
+        String response = ChatCalls.content(baClient.prompt().messages(contextWindow.viewFor("ba_agent", state)),
+                "ba_agent", state);
 
-        state.addMessage(new AssistantMessage(response));
+        state.addAgentOutput("ba_agent", response);
         return state;
     }
 }
@@ -387,22 +1387,32 @@ public class BAAgent {
 package com.example.brdmultiagent.agent;
 
 import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ContextWindow;
+import com.example.brdmultiagent.graph.ScenarioFanOut;
+import com.example.brdmultiagent.graph.ScenarioResult;
 import org.springframework.ai.chat.client.ChatClient;
-import org.springframework.ai.chat.messages.AssistantMessage;
 import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.beans.factory.annotation.Qualifier;
 import org.springframework.stereotype.Component;
 import org.springframework.ai.model.function.FunctionCallback;
 
+import java.util.List;
+
 @Component
 public class DevAgent {
 
     private final ChatClient devClient;
+    private final ContextWindow contextWindow;
+    private final ScenarioFanOut scenarioFanOut;
 
     @Autowired
     public DevAgent(ChatClient chatClient,
+                    ContextWindow contextWindow,
+                    ScenarioFanOut scenarioFanOut,
                     @Qualifier("jsonGeneratorTool") FunctionCallback jsonTool,
                     @Qualifier("microserviceCallerTool") FunctionCallback microserviceTool) {
+        this.contextWindow = contextWindow;
+        this.scenarioFanOut = scenarioFanOut;
         this.devClient = chatClient.defaultSystem("""
                 You are Dev Agent. From scenarios, generate JSON, call microservice for Excel.
                 Use tools: jsonGeneratorTool, microserviceCallerTool.
@@ -412,12 +1422,22 @@ public class DevAgent {
     }
 
     public AgentState invoke(AgentState state) {
-        String response = devClient.prompt()
-                .messages(state.getMessages())
-                .call()
-                .content();
+        // Fast path: BA produced a parseable scenario list, so run the tools per scenario in parallel
+        List<String> scenarios = ScenarioFanOut.parseScenarios(state.getLatestOutput("ba_agent"));
+        if (!scenarios.isEmpty()) {
+            List<ScenarioResult> results = scenarioFanOut.process(scenarios, state.takePrefetchedJson(),
+                    state.getListener());
+            state.setScenarioResults(results);
+            state.addAgentOutput("dev_agent", ScenarioFanOut.describe(results));
+            return state;
+        }
 
-        state.addMessage(new AssistantMessage(response));
+        // Free-form BA output: let the LLM drive the tools sequentially
+        state.setScenarioResults(List.of());
+        String response = ChatCalls.content(devClient.prompt().messages(contextWindow.viewFor("dev_agent", state)),
+                "dev_agent", state);
+
+        state.addAgentOutput("dev_agent", response);
         return state;
     }
 }
@@ -428,8 +1448,8 @@ public class DevAgent {
 package com.example.brdmultiagent.agent;
 
 import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ContextWindow;
 import org.springframework.ai.chat.client.ChatClient;
-import org.springframework.ai.chat.messages.AssistantMessage;
 import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.beans.factory.annotation.Qualifier;
 import org.springframework.stereotype.Component;
@@ -439,10 +1459,13 @@ import org.springframework.ai.model.function.FunctionCallback;
 public class CodingAgent {
 
     private final ChatClient codingClient;
+    private final ContextWindow contextWindow;
 
     @Autowired
     public CodingAgent(ChatClient chatClient,
+                       ContextWindow contextWindow,
                        @Qualifier("jenkinsApiCallerTool") FunctionCallback jenkinsTool) {
+        this.contextWindow = contextWindow;
         this.codingClient = chatClient.defaultSystem("""
                 You are Coding Agent. Send Excel to Jenkins API.
                 Use tool: jenkinsApiCallerTool.
@@ -452,158 +1475,6885 @@ public class CodingAgent {
     }
 
     public AgentState invoke(AgentState state) {
-        String response = codingClient.prompt()
-                .messages(state.getMessages())
-                .call()
-                .content();
+        String response = ChatCalls.content(codingClient.prompt().messages(contextWindow.viewFor("coding_agent", state)),
+                "coding_agent", state);
 
-        state.addMessage(new AssistantMessage(response));
+        state.addAgentOutput("coding_agent", response);
         return state;
     }
 }
 ```
 
-### tool/* (Same as before, but impl as classes with methods)
+### agent/ChatCalls.java
 ```java
-// DocumentExtractorTool.java (example; others similar)
-package com.example.brdmultiagent.tool;
+package com.example.brdmultiagent.agent;
 
-import org.apache.pdfbox.pdmodel.PDDocument;
-import org.apache.pdfbox.text.PDFTextStripper;
-import org.springframework.stereotype.Component;
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.llm.LlmCallContext;
+import org.springframework.ai.chat.client.ChatClient;
 
-import java.io.File;
+import java.util.Map;
 
-@Component
-public class DocumentExtractorTool {
-    public String extract(String filePath) {
-        try (PDDocument doc = PDDocument.load(new File(filePath))) {
-            PDFTextStripper stripper = new PDFTextStripper();
-            return stripper.getText(doc);
+final class ChatCalls {
+
+    private ChatCalls() {
+    }
+
+    // Plain blocking call, or, when the run has a listener, stream tokens to it and return the full text
+    static String content(ChatClient.ChatClientRequest request, String agent, AgentState state) {
+        return LlmCallContext.callAs(agent, () -> LlmCallContext.listenAs(state.getListener(), () -> {
+            GraphEventListener listener = state.getListener();
+            if (listener == null) {
+                return request.call().content();
+            }
+
+            StringBuilder response = new StringBuilder();
+            request.stream()
+                    .content()
+                    .doOnNext(token -> {
+                        response.append(token);
+                        listener.onEvent("token", Map.of("agent", agent, "token", token));
+                    })
+                    .blockLast();
+            return response.toString();
+        }));
+    }
+}
+```
+
+### tool/* (Same as before, but impl as classes with methods)
+```java
+// DocumentExtractorTool.java (example; others similar)
+package com.example.brdmultiagent.tool;
+
+import com.example.brdmultiagent.upload.UploadHandle;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import org.apache.pdfbox.pdmodel.PDDocument;
+import org.springframework.stereotype.Component;
+
+import java.io.File;
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.Optional;
+
+@Component
+public class DocumentExtractorTool {
+    private final ExtractionCache cache;
+    private final UploadRegistry uploads;
+    private final PageParallelExtractor pageExtractor;
+
+    public DocumentExtractorTool(ExtractionCache cache, UploadRegistry uploads, PageParallelExtractor pageExtractor) {
+        this.cache = cache;
+        this.uploads = uploads;
+        this.pageExtractor = pageExtractor;
+    }
+
+    // Tool entry point for the LLM: the whole document as one string, built from the chunk stream
+    public String extract(String fileRef) {
+        try (DocumentChunks chunks = extractChunks(fileRef)) {
+            StringBuilder text = new StringBuilder();
+            chunks.forEachRemaining(chunk -> text.append(chunk.text()).append("\n\n"));
+            return text.toString();
+        } catch (Exception e) {
+            ToolMemoizer.doNotCache(); // Fallback: a transient failure must not be served for the whole TTL
+            return "Mock extracted content: BRD requirements...";
+        }
+    }
+
+    // Accepts an upload://<id> reference from UploadController, or a plain file path. Chunks arrive in
+    // document order while later page ranges are still being parsed; close() to stop early.
+    public DocumentChunks extractChunks(String fileRef) throws IOException {
+        Optional<UploadHandle> upload = uploads.acquire(fileRef);
+        try {
+            // Keyed by content hash, so a re-uploaded BRD still hits
+            String key = cache.keyFor(upload.isPresent() ? upload.get().openStream() : Files.newInputStream(Path.of(fileRef)));
+            Optional<String> cached = cache.get(key);
+            if (cached.isPresent()) {
+                upload.ifPresent(UploadHandle::release);
+                return DocumentChunks.of(cached.get(), pageExtractor.newChunker());
+            }
+
+            PageParallelExtractor.DocumentOpener opener = upload.isPresent()
+                    ? () -> load(upload.get())
+                    : () -> PDDocument.load(new File(fileRef));
+            // The upload stays referenced until the iterator is exhausted or closed
+            return pageExtractor.extract(opener, fullText -> cache.put(key, fullText),
+                    () -> upload.ifPresent(UploadHandle::release));
+        } catch (IOException | RuntimeException e) {
+            upload.ifPresent(UploadHandle::release);
+            throw e;
+        }
+    }
+
+    // Small uploads parse straight from the request's bytes; spilled ones from their single temp file
+    private static PDDocument load(UploadHandle upload) throws IOException {
+        return upload.bytes() != null ? PDDocument.load(upload.bytes()) : PDDocument.load(upload.path().toFile());
+    }
+}
+
+// DocumentChunk.java
+package com.example.brdmultiagent.tool;
+
+import java.util.List;
+
+// One section-aware slice of a BRD; pages are the extraction range(s) the text came from
+public record DocumentChunk(int index, int startPage, int endPage, String section, Kind kind,
+                            List<String> requirementIds, String text) {
+
+    public enum Kind { TEXT, TABLE }
+}
+
+// SectionChunker.java
+package com.example.brdmultiagent.tool;
+
+import java.util.ArrayList;
+import java.util.LinkedHashSet;
+import java.util.List;
+import java.util.Set;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+// Fed page-range text in document order. Starts a new chunk at headings, at text/table boundaries and
+// at the size limit, so a chunk never mixes two sections. Not thread-safe: one per document.
+public class SectionChunker {
+    // "3.2 Payment Limits", "4. REPORTING", or a short all-caps line
+    private static final Pattern HEADING = Pattern.compile("^(\\d+(\\.\\d+)*\\.?\\s+\\S.{0,100}|[A-Z][A-Z0-9 &/-]{3,80})$");
+    // Three or more cells separated by runs of spaces, tabs or pipes
+    private static final Pattern TABLE_ROW = Pattern.compile("\\S+( {2,}|\\t|\\s?\\|\\s?)\\S+( {2,}|\\t|\\s?\\|\\s?)\\S+");
+    private static final Pattern REQUIREMENT_ID = Pattern.compile("\\b(?:REQ|BR|FR|NFR|UC)-\\d+(?:\\.\\d+)*\\b");
+
+    private final int maxChars;
+    private final List<DocumentChunk> ready = new ArrayList<>();
+    private final StringBuilder current = new StringBuilder();
+    private final Set<String> requirementIds = new LinkedHashSet<>();
+    private String section = "";
+    private DocumentChunk.Kind kind = DocumentChunk.Kind.TEXT;
+    private int chunkStartPage = -1;
+    private int chunkEndPage = -1;
+    private int index;
+
+    public SectionChunker(int maxChars) {
+        this.maxChars = maxChars;
+    }
+
+    public List<DocumentChunk> feed(String text, int startPage, int endPage) {
+        for (String rawLine : text.split("\\R")) {
+            String line = rawLine.strip();
+            if (line.isEmpty()) {
+                continue;
+            }
+            if (HEADING.matcher(line).matches() && !TABLE_ROW.matcher(line).find()) {
+                emit();
+                section = line;
+            }
+            DocumentChunk.Kind lineKind = TABLE_ROW.matcher(line).find() ? DocumentChunk.Kind.TABLE : DocumentChunk.Kind.TEXT;
+            if (lineKind != kind || current.length() + line.length() + 1 > maxChars) {
+                emit();
+                kind = lineKind;
+            }
+            if (chunkStartPage < 0) {
+                chunkStartPage = startPage;
+            }
+            chunkEndPage = endPage;
+            current.append(line).append('\n');
+            Matcher ids = REQUIREMENT_ID.matcher(line);
+            while (ids.find()) {
+                requirementIds.add(ids.group());
+            }
+        }
+        return drain();
+    }
+
+    public List<DocumentChunk> flush() {
+        emit();
+        return drain();
+    }
+
+    private void emit() {
+        if (current.length() == 0) {
+            return;
+        }
+        ready.add(new DocumentChunk(index++, chunkStartPage, chunkEndPage, section, kind,
+                List.copyOf(requirementIds), current.toString()));
+        current.setLength(0);
+        requirementIds.clear();
+        chunkStartPage = -1;
+    }
+
+    private List<DocumentChunk> drain() {
+        List<DocumentChunk> out = new ArrayList<>(ready);
+        ready.clear();
+        return out;
+    }
+}
+
+// DocumentChunks.java
+package com.example.brdmultiagent.tool;
+
+import java.util.ArrayDeque;
+import java.util.Deque;
+import java.util.Iterator;
+import java.util.NoSuchElementException;
+import java.util.Spliterator;
+import java.util.Spliterators;
+import java.util.stream.Stream;
+import java.util.stream.StreamSupport;
+
+// Lazy, in-order chunk iterator. next() blocks only until the next page range is parsed.
+public class DocumentChunks implements Iterator<DocumentChunk>, AutoCloseable {
+
+    // Produces the next page range's text in document order; null when the document is done
+    interface RangeSource extends AutoCloseable {
+        PageRange next() throws Exception;
+
+        @Override
+        void close();
+    }
+
+    record PageRange(int startPage, int endPage, String text) {
+    }
+
+    private final RangeSource source;
+    private final SectionChunker chunker;
+    private final Deque<DocumentChunk> buffer = new ArrayDeque<>();
+    private boolean exhausted;
+
+    DocumentChunks(RangeSource source, SectionChunker chunker) {
+        this.source = source;
+        this.chunker = chunker;
+    }
+
+    // Already-extracted text (cache hit): chunked synchronously, one page at a time. Pages are recovered from
+    // the page-end marker the extractor writes; text cached without markers counts as page 1.
+    public static DocumentChunks of(String text, SectionChunker chunker) {
+        int[] position = {0};
+        int[] page = {0};
+        return new DocumentChunks(new RangeSource() {
+            @Override
+            public PageRange next() {
+                if (position[0] >= text.length() && page[0] > 0) {
+                    return null;
+                }
+                int end = text.indexOf(PageParallelExtractor.PAGE_END, position[0]);
+                int next = end < 0 ? text.length() : end + PageParallelExtractor.PAGE_END.length();
+                String pageText = text.substring(position[0], end < 0 ? text.length() : end);
+                position[0] = next;
+                page[0]++;
+                return new PageRange(page[0], page[0], pageText);
+            }
+
+            @Override
+            public void close() {
+            }
+        }, chunker);
+    }
+
+    @Override
+    public boolean hasNext() {
+        while (buffer.isEmpty() && !exhausted) {
+            PageRange range;
+            try {
+                range = source.next();
+            } catch (Exception e) {
+                close();
+                throw new IllegalStateException("Page extraction failed", e);
+            }
+            if (range == null) {
+                buffer.addAll(chunker.flush());
+                exhausted = true;
+                source.close();
+            } else {
+                buffer.addAll(chunker.feed(range.text(), range.startPage(), range.endPage()));
+            }
+        }
+        return !buffer.isEmpty();
+    }
+
+    @Override
+    public DocumentChunk next() {
+        if (!hasNext()) {
+            throw new NoSuchElementException();
+        }
+        return buffer.poll();
+    }
+
+    public Stream<DocumentChunk> stream() {
+        return StreamSupport.stream(Spliterators.spliteratorUnknownSize(this, Spliterator.ORDERED), false)
+                .onClose(this::close);
+    }
+
+    @Override
+    public void close() {
+        exhausted = true;
+        source.close();
+    }
+}
+
+// PageParallelExtractor.java
+package com.example.brdmultiagent.tool;
+
+import jakarta.annotation.PreDestroy;
+import org.apache.pdfbox.pdmodel.PDDocument;
+import org.apache.pdfbox.text.PDFTextStripper;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.io.IOException;
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Deque;
+import java.util.List;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.function.Consumer;
+
+// Splits a PDF into page ranges parsed concurrently. PDDocument is not thread-safe, so a task borrows an instance
+// no other task is using; instances are kept for the whole document, so it is parsed at most once per worker
+// rather than once per range. At most `window` ranges are in flight or buffered, which bounds memory on huge BRDs.
+@Component
+public class PageParallelExtractor {
+
+    @FunctionalInterface
+    public interface DocumentOpener {
+        PDDocument open() throws IOException;
+    }
+
+    private final ExecutorService executor;
+    private final int pagesPerTask;
+    private final int window;
+    private final int chunkChars;
+
+    // Ends every page in extracted text; DocumentChunks.of uses it to recover page numbers from cached text
+    static final String PAGE_END = "\n\f";
+
+    public PageParallelExtractor(@Value("${brd.extraction.workers:4}") int workers,
+                                 @Value("${brd.extraction.pages-per-task:16}") int pagesPerTask,
+                                 @Value("${brd.extraction.chunk-chars:4000}") int chunkChars) {
+        AtomicInteger threadCount = new AtomicInteger();
+        this.executor = Executors.newFixedThreadPool(workers,
+                r -> new Thread(r, "brd-pdf-" + threadCount.incrementAndGet()));
+        this.pagesPerTask = pagesPerTask;
+        this.window = workers * 2;
+        this.chunkChars = chunkChars;
+    }
+
+    public SectionChunker newChunker() {
+        return new SectionChunker(chunkChars);
+    }
+
+    // onComplete gets the full text only if every range was read (for the extraction cache);
+    // onClose always runs once, when the iterator is exhausted or closed early
+    public DocumentChunks extract(DocumentOpener opener, Consumer<String> onComplete, Runnable onClose) throws IOException {
+        Documents documents = new Documents(opener);
+        PDDocument first = documents.borrow(); // Also the first range's instance
+        int pageCount = first.getNumberOfPages();
+        documents.giveBack(first);
+
+        Deque<Future<DocumentChunks.PageRange>> inFlight = new ArrayDeque<>();
+        int[] nextStart = {1};
+        StringBuilder fullText = new StringBuilder();
+        AtomicBoolean closed = new AtomicBoolean();
+
+        Runnable submitNext = () -> {
+            int start = nextStart[0];
+            if (start > pageCount) {
+                return;
+            }
+            int end = Math.min(pageCount, start + pagesPerTask - 1);
+            nextStart[0] = end + 1;
+            inFlight.add(executor.submit(() -> extractRange(documents, start, end)));
+        };
+        for (int i = 0; i < window; i++) {
+            submitNext.run();
+        }
+
+        return new DocumentChunks(new DocumentChunks.RangeSource() {
+            @Override
+            public DocumentChunks.PageRange next() throws Exception {
+                Future<DocumentChunks.PageRange> head = inFlight.poll();
+                if (head == null) {
+                    documents.close(); // Every range is parsed
+                    onComplete.accept(fullText.toString());
+                    return null;
+                }
+                DocumentChunks.PageRange range = head.get();
+                submitNext.run(); // Keep the window full while the caller works on this range
+                fullText.append(range.text());
+                return range;
+            }
+
+            @Override
+            public void close() {
+                if (closed.compareAndSet(false, true)) {
+                    inFlight.forEach(f -> f.cancel(true));
+                    inFlight.clear();
+                    documents.close();
+                    onClose.run();
+                }
+            }
+        }, newChunker());
+    }
+
+    private static DocumentChunks.PageRange extractRange(Documents documents, int start, int end) throws IOException {
+        PDDocument doc = documents.borrow();
+        try {
+            PDFTextStripper stripper = new PDFTextStripper();
+            stripper.setStartPage(start);
+            stripper.setEndPage(end);
+            stripper.setPageEnd(PAGE_END);
+            return new DocumentChunks.PageRange(start, end, stripper.getText(doc));
+        } finally {
+            documents.giveBack(doc);
+        }
+    }
+
+    // Parsed instances of one document, each used by one task at a time
+    private static final class Documents {
+        private final DocumentOpener opener;
+        private final Deque<PDDocument> idle = new ArrayDeque<>();
+        private boolean closed;
+
+        Documents(DocumentOpener opener) {
+            this.opener = opener;
+        }
+
+        PDDocument borrow() throws IOException {
+            synchronized (this) {
+                if (closed) {
+                    throw new IOException("Extraction closed");
+                }
+                if (!idle.isEmpty()) {
+                    return idle.pop();
+                }
+            }
+            return opener.open();
+        }
+
+        void giveBack(PDDocument doc) {
+            synchronized (this) {
+                if (!closed) {
+                    idle.push(doc);
+                    return;
+                }
+            }
+            closeQuietly(doc); // Finished after the extraction was closed
+        }
+
+        void close() {
+            List<PDDocument> toClose;
+            synchronized (this) {
+                closed = true;
+                toClose = new ArrayList<>(idle);
+                idle.clear();
+            }
+            toClose.forEach(Documents::closeQuietly);
+        }
+
+        private static void closeQuietly(PDDocument doc) {
+            try {
+                doc.close();
+            } catch (IOException ignored) {
+                // Nothing to recover; the instance is discarded either way
+            }
+        }
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        executor.shutdownNow();
+    }
+}
+
+// ExtractionCache.java
+package com.example.brdmultiagent.tool;
+
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.io.IOException;
+import java.io.InputStream;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.security.MessageDigest;
+import java.util.HexFormat;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Optional;
+
+@Component
+public class ExtractionCache {
+    private static final Logger logger = LoggerFactory.getLogger(ExtractionCache.class);
+
+    private final long maxChars;
+    private final Path diskDir; // null = memory only
+    private final LinkedHashMap<String, String> entries = new LinkedHashMap<>(64, 0.75f, true); // Access order = LRU
+    private long currentChars;
+
+    private final Counter memoryHits;
+    private final Counter diskHits;
+    private final Counter misses;
+    private final Counter evictions;
+
+    public ExtractionCache(MeterRegistry meterRegistry,
+                           @Value("${brd.extraction-cache.max-chars:50000000}") long maxChars,
+                           @Value("${brd.extraction-cache.disk-dir:}") String diskDir) throws IOException {
+        this.maxChars = maxChars;
+        this.diskDir = diskDir.isBlank() ? null : Files.createDirectories(Path.of(diskDir));
+        this.memoryHits = meterRegistry.counter("brd.extraction.cache.hits", "tier", "memory");
+        this.diskHits = meterRegistry.counter("brd.extraction.cache.hits", "tier", "disk");
+        this.misses = meterRegistry.counter("brd.extraction.cache.misses");
+        this.evictions = meterRegistry.counter("brd.extraction.cache.evictions");
+        meterRegistry.gauge("brd.extraction.cache.chars", this, c -> c.currentChars);
+        meterRegistry.gauge("brd.extraction.cache.entries", entries, Map::size);
+    }
+
+    // SHA-256 of the document bytes; streaming, so hashing a large PDF is far cheaper than parsing it
+    public String keyFor(InputStream content) throws IOException {
+        try (InputStream in = content) {
+            MessageDigest digest = MessageDigest.getInstance("SHA-256");
+            byte[] buffer = new byte[64 * 1024];
+            int read;
+            while ((read = in.read(buffer)) != -1) {
+                digest.update(buffer, 0, read);
+            }
+            return HexFormat.of().formatHex(digest.digest());
+        } catch (java.security.NoSuchAlgorithmException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    public Optional<String> get(String key) {
+        synchronized (this) {
+            String text = entries.get(key);
+            if (text != null) {
+                memoryHits.increment();
+                return Optional.of(text);
+            }
+        }
+        if (diskDir != null) {
+            Path file = diskDir.resolve(key + ".txt");
+            if (Files.exists(file)) {
+                try {
+                    String text = Files.readString(file, StandardCharsets.UTF_8);
+                    diskHits.increment();
+                    putInMemory(key, text); // Promote
+                    return Optional.of(text);
+                } catch (IOException e) {
+                    logger.warn("Unreadable extraction cache entry {}", file, e);
+                }
+            }
+        }
+        misses.increment();
+        return Optional.empty();
+    }
+
+    public void put(String key, String text) {
+        putInMemory(key, text);
+        if (diskDir != null) {
+            try {
+                // Write-then-rename so a crash never leaves a truncated entry behind
+                Path tmp = Files.createTempFile(diskDir, key, ".tmp");
+                Files.writeString(tmp, text, StandardCharsets.UTF_8);
+                Files.move(tmp, diskDir.resolve(key + ".txt"), StandardCopyOption.ATOMIC_MOVE,
+                        StandardCopyOption.REPLACE_EXISTING);
+            } catch (IOException e) {
+                logger.warn("Failed to persist extraction cache entry {}", key, e);
+            }
+        }
+    }
+
+    private synchronized void putInMemory(String key, String text) {
+        if (text.length() > maxChars) {
+            return; // Larger than the whole cache; disk tier only
+        }
+        String previous = entries.put(key, text);
+        currentChars += text.length() - (previous == null ? 0 : previous.length());
+        Iterator<Map.Entry<String, String>> eldest = entries.entrySet().iterator();
+        while (currentChars > maxChars && eldest.hasNext()) {
+            Map.Entry<String, String> entry = eldest.next();
+            currentChars -= entry.getValue().length();
+            eldest.remove();
+            evictions.increment();
+        }
+    }
+}
+
+// OpenAIAnalysisTool.java
+package com.example.brdmultiagent.tool;
+
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.graph.ScenarioFanOut;
+import com.example.brdmultiagent.llm.LlmCallContext;
+import io.micrometer.core.instrument.MeterRegistry;
+import jakarta.annotation.PreDestroy;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.ai.chat.metadata.Usage;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.model.ChatResponse;
+import org.springframework.ai.chat.prompt.Prompt;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashSet;
+import java.util.Iterator;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.CancellationException;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.CompletionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.function.Consumer;
+
+@Component
+public class OpenAIAnalysisTool {
+    private static final Logger logger = LoggerFactory.getLogger(OpenAIAnalysisTool.class);
+    private static final double NEAR_DUPLICATE_JACCARD = 0.8;
+
+    private final ChatModel chatModel;
+    private final MeterRegistry meterRegistry;
+    private final int singleShotChars;
+    private final int mapChunkChars;
+    private final ExecutorService executor;
+    private final SimpleRateLimiter rateLimiter;
+
+    public OpenAIAnalysisTool(ChatModel chatModel,
+                              MeterRegistry meterRegistry,
+                              @Value("${brd.analysis.single-shot-chars:24000}") int singleShotChars,
+                              @Value("${brd.analysis.map-chunk-chars:12000}") int mapChunkChars,
+                              @Value("${brd.analysis.concurrency:4}") int concurrency,
+                              @Value("${brd.analysis.max-requests-per-second:5}") double maxRequestsPerSecond) {
+        this.chatModel = chatModel;
+        this.meterRegistry = meterRegistry;
+        this.singleShotChars = singleShotChars;
+        this.mapChunkChars = mapChunkChars;
+        this.rateLimiter = new SimpleRateLimiter(maxRequestsPerSecond);
+        AtomicInteger threadCount = new AtomicInteger();
+        this.executor = Executors.newFixedThreadPool(concurrency,
+                r -> new Thread(r, "brd-analysis-" + threadCount.incrementAndGet()));
+    }
+
+    // Tool entry point; each chunk's scenarios are streamed to the calling run as they finish
+    public String analyze(String content) {
+        return analyze(content, partialsToRun("openAIAnalysisTool")).scenariosText();
+    }
+
+    // "analysis" events with one map chunk's scenarios for the run's listener (streaming runs); without one they
+    // are only logged. The listener is captured here, on the tool-call thread: map results complete on the pool.
+    public static Consumer<List<String>> partialsToRun(String tool) {
+        GraphEventListener listener = LlmCallContext.currentListener();
+        if (listener == null) {
+            return partial -> logger.debug("Chunk produced {} scenarios", partial.size());
+        }
+        AtomicInteger chunks = new AtomicInteger();
+        return partial -> {
+            try {
+                synchronized (listener) { // Map chunks finish concurrently; SSE sends must not interleave
+                    listener.onEvent("analysis", Map.of("tool", tool, "chunk", chunks.incrementAndGet(),
+                            "scenarios", partial));
+                }
+            } catch (RuntimeException e) {
+                logger.debug("Listener rejected partial scenarios", e); // Never fails the analysis
+            }
+        };
+    }
+
+    // Small documents: one prompt. Large ones: map each chunk concurrently (rate-limited), reduce by
+    // de-duplicating scenarios. onPartial receives each chunk's scenarios as soon as that chunk finishes.
+    public AnalysisResult analyze(String content, Consumer<List<String>> onPartial) {
+        if (content.length() <= singleShotChars) {
+            return singleShot(content, System.nanoTime());
+        }
+        SectionChunker chunker = new SectionChunker(mapChunkChars);
+        List<DocumentChunk> sections = new ArrayList<>(chunker.feed(content, 0, 0));
+        sections.addAll(chunker.flush());
+        return analyze(sections.iterator(), onPartial);
+    }
+
+    // Same analysis over chunks that are still being produced (DocumentExtractorTool.extractChunks): map calls
+    // start as soon as a pack of chunks is complete, while later pages are parsed. Until single-shot-chars have
+    // arrived the chunks are held back, so a small document still gets one prompt.
+    // A failed map chunk is logged and counted, and the other chunks' scenarios are kept; the analysis only fails
+    // when every chunk fails, or when the chunk source does (queued map calls are then dropped).
+    public AnalysisResult analyze(Iterator<DocumentChunk> chunks, Consumer<List<String>> onPartial) {
+        AtomicLong promptTokens = new AtomicLong();
+        AtomicLong completionTokens = new AtomicLong();
+        AtomicBoolean abandoned = new AtomicBoolean();
+        long start = System.nanoTime();
+        String run = LlmCallContext.currentRun(); // Map calls count against this run's fair share
+
+        List<String> held = new ArrayList<>();
+        int heldChars = 0;
+        long contentChars = 0;
+        List<CompletableFuture<List<String>>> mapped = new ArrayList<>();
+        StringBuilder pack = new StringBuilder();
+        try {
+            while (chunks.hasNext()) {
+                DocumentChunk section = chunks.next();
+                String text = section.section().isEmpty() || section.text().startsWith(section.section())
+                        ? section.text() : "[" + section.section() + "]\n" + section.text();
+                contentChars += section.text().length();
+                if (held != null) {
+                    held.add(text);
+                    heldChars += text.length();
+                    if (heldChars <= singleShotChars) {
+                        continue;
+                    }
+                    // Too large for one prompt: everything held so far goes to the map stage
+                    for (String heldText : held) {
+                        pack = packOrMap(pack, heldText, mapped, run, promptTokens, completionTokens, abandoned, onPartial);
+                    }
+                    held = null;
+                    continue;
+                }
+                pack = packOrMap(pack, text, mapped, run, promptTokens, completionTokens, abandoned, onPartial);
+            }
+        } catch (RuntimeException e) {
+            abandoned.set(true);
+            mapped.forEach(future -> future.cancel(false));
+            throw e;
+        }
+        if (held != null) {
+            return singleShot(String.join("\n", held), start);
+        }
+        if (pack.length() > 0) {
+            mapped.add(map(pack.toString(), run, promptTokens, completionTokens, abandoned, onPartial));
+        }
+
+        List<String> all = new ArrayList<>();
+        int failedChunks = 0;
+        RuntimeException firstFailure = null;
+        for (int i = 0; i < mapped.size(); i++) {
+            try {
+                all.addAll(mapped.get(i).join()); // Chunk order, so merged scenarios follow the document
+            } catch (CompletionException e) {
+                RuntimeException cause = e.getCause() instanceof RuntimeException failure ? failure : e;
+                logger.warn("Analysis chunk {} of {} failed", i + 1, mapped.size(), cause);
+                meterRegistry.counter("brd.analysis.chunk.failures").increment();
+                failedChunks++;
+                firstFailure = firstFailure == null ? cause : firstFailure;
+            }
+        }
+        if (failedChunks == mapped.size()) {
+            throw firstFailure; // Nothing to reduce
+        }
+        long mapMillis = (System.nanoTime() - start) / 1_000_000;
+
+        long reduceStart = System.nanoTime();
+        List<String> merged = deduplicate(all);
+        long reduceMillis = (System.nanoTime() - reduceStart) / 1_000_000;
+
+        meterRegistry.timer("brd.analysis.stage", "stage", "map").record(mapMillis, TimeUnit.MILLISECONDS);
+        meterRegistry.timer("brd.analysis.stage", "stage", "reduce").record(reduceMillis, TimeUnit.MILLISECONDS);
+        AnalysisResult result = new AnalysisResult(merged, mapped.size(), failedChunks, mapMillis, reduceMillis,
+                promptTokens.get(), completionTokens.get());
+        logger.info("Map-reduce analysis: {} chars, {} chunks ({} failed), {} -> {} scenarios, map {} ms, reduce {} ms, "
+                        + "{} prompt / {} completion tokens", contentChars, mapped.size(), failedChunks, all.size(),
+                merged.size(), mapMillis, reduceMillis, promptTokens.get(), completionTokens.get());
+        return result;
+    }
+
+    private AnalysisResult singleShot(String content, long start) {
+        AtomicLong promptTokens = new AtomicLong();
+        AtomicLong completionTokens = new AtomicLong();
+        String scenarios = call("Generate scenarios from BRD: " + content, promptTokens, completionTokens);
+        long elapsed = (System.nanoTime() - start) / 1_000_000;
+        List<String> parsed = ScenarioFanOut.parseScenarios(scenarios);
+        return new AnalysisResult(parsed.isEmpty() ? List.of(scenarios) : parsed, 1, 0, elapsed, 0,
+                promptTokens.get(), completionTokens.get());
+    }
+
+    // Section-aware chunks are packed back together up to mapChunkChars so short sections don't each cost a call;
+    // a full pack is submitted right away and a new one returned
+    private StringBuilder packOrMap(StringBuilder pack, String text, List<CompletableFuture<List<String>>> mapped,
+                                    String run, AtomicLong promptTokens, AtomicLong completionTokens,
+                                    AtomicBoolean abandoned, Consumer<List<String>> onPartial) {
+        if (pack.length() > 0 && pack.length() + text.length() > mapChunkChars) {
+            mapped.add(map(pack.toString(), run, promptTokens, completionTokens, abandoned, onPartial));
+            pack = new StringBuilder();
+        }
+        return pack.append(text).append('\n');
+    }
+
+    private CompletableFuture<List<String>> map(String chunk, String run, AtomicLong promptTokens,
+                                                AtomicLong completionTokens, AtomicBoolean abandoned,
+                                                Consumer<List<String>> onPartial) {
+        return CompletableFuture
+                .supplyAsync(() -> LlmCallContext.runAs(run, () -> {
+                    if (abandoned.get()) {
+                        throw new CancellationException("Analysis abandoned"); // Still queued when the source failed
+                    }
+                    rateLimiter.acquire();
+                    String scenarios = call(
+                            "Generate scenarios (numbered list, one per line, 'As a [user], I want [goal] so that "
+                                    + "[benefit]') covering only this part of a larger BRD:\n" + chunk,
+                            promptTokens, completionTokens);
+                    List<String> parsed = ScenarioFanOut.parseScenarios(scenarios);
+                    return parsed.isEmpty() ? List.of(scenarios) : parsed; // Unparseable reply: raw text, as singleShot
+                }), executor)
+                .whenComplete((partial, e) -> {
+                    if (partial != null) {
+                        onPartial.accept(partial);
+                    }
+                });
+    }
+
+    private String call(String prompt, AtomicLong promptTokens, AtomicLong completionTokens) {
+        ChatResponse response = LlmCallContext.callAs("openAIAnalysisTool", () -> chatModel.call(new Prompt(prompt)));
+        Usage usage = response.getMetadata() == null ? null : response.getMetadata().getUsage();
+        if (usage != null) {
+            promptTokens.addAndGet(usage.getPromptTokens() == null ? 0 : usage.getPromptTokens());
+            completionTokens.addAndGet(usage.getGenerationTokens() == null ? 0 : usage.getGenerationTokens());
+        }
+        meterRegistry.counter("brd.analysis.tokens", "type", "prompt").increment(usage == null || usage.getPromptTokens() == null ? 0 : usage.getPromptTokens());
+        meterRegistry.counter("brd.analysis.tokens", "type", "completion").increment(usage == null || usage.getGenerationTokens() == null ? 0 : usage.getGenerationTokens());
+        return response.getResult().getOutput().getContent();
+    }
+
+    // Exact duplicates after normalization, then near-duplicates by word-set Jaccard similarity
+    static List<String> deduplicate(List<String> scenarios) {
+        List<String> kept = new ArrayList<>();
+        List<Set<String>> keptWords = new ArrayList<>();
+        Set<String> seen = new HashSet<>();
+        for (String scenario : scenarios) {
+            String normalized = scenario.toLowerCase(Locale.ROOT).replaceAll("[^a-z0-9 ]", " ").replaceAll("\\s+", " ").trim();
+            if (normalized.isEmpty() || !seen.add(normalized)) {
+                continue;
+            }
+            Set<String> words = new HashSet<>(Arrays.asList(normalized.split(" "))); // Words repeat in most scenarios
+            boolean nearDuplicate = keptWords.stream().anyMatch(other -> jaccard(words, other) >= NEAR_DUPLICATE_JACCARD);
+            if (!nearDuplicate) {
+                kept.add(scenario);
+                keptWords.add(words);
+            }
+        }
+        return kept;
+    }
+
+    private static double jaccard(Set<String> a, Set<String> b) {
+        int intersection = 0;
+        for (String word : a) {
+            if (b.contains(word)) {
+                intersection++;
+            }
+        }
+        return (double) intersection / (a.size() + b.size() - intersection);
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        executor.shutdownNow();
+    }
+}
+
+// DocumentAnalysisTool.java
+package com.example.brdmultiagent.tool;
+
+import org.springframework.stereotype.Component;
+
+import java.io.IOException;
+import java.io.UncheckedIOException;
+
+// Extraction feeding analysis directly: scenario generation for the first sections starts while later pages
+// are still being parsed, instead of waiting for the whole document as one tool result
+@Component
+public class DocumentAnalysisTool {
+
+    private final DocumentExtractorTool extractor;
+    private final OpenAIAnalysisTool analysis;
+
+    public DocumentAnalysisTool(DocumentExtractorTool extractor, OpenAIAnalysisTool analysis) {
+        this.extractor = extractor;
+        this.analysis = analysis;
+    }
+
+    // Tool entry point: BRD reference in, numbered scenario list out
+    public String analyzeDocument(String fileRef) {
+        try (DocumentChunks chunks = extractor.extractChunks(fileRef)) {
+            return analysis.analyze(chunks, OpenAIAnalysisTool.partialsToRun("documentAnalysisTool")).scenariosText();
+        } catch (IOException e) {
+            throw new UncheckedIOException("Cannot read BRD " + fileRef, e);
+        }
+    }
+}
+
+// AnalysisResult.java
+package com.example.brdmultiagent.tool;
+
+import java.util.List;
+
+public record AnalysisResult(List<String> scenarios, int chunks, int failedChunks, long mapMillis, long reduceMillis,
+                             long promptTokens, long completionTokens) {
+
+    // Numbered list, the format BA output and ScenarioFanOut.parseScenarios expect
+    public String scenariosText() {
+        StringBuilder text = new StringBuilder();
+        for (int i = 0; i < scenarios.size(); i++) {
+            text.append(i + 1).append(". ").append(scenarios.get(i)).append('\n');
+        }
+        return text.toString();
+    }
+}
+
+// SimpleRateLimiter.java
+package com.example.brdmultiagent.tool;
+
+// Spaces calls evenly at `permitsPerSecond`; callers block until their slot
+public class SimpleRateLimiter {
+    private final long intervalNanos;
+    private long nextFree = System.nanoTime();
+
+    public SimpleRateLimiter(double permitsPerSecond) {
+        this.intervalNanos = (long) (1_000_000_000L / permitsPerSecond);
+    }
+
+    public void acquire() {
+        long waitNanos;
+        synchronized (this) {
+            long now = System.nanoTime();
+            long slot = Math.max(now, nextFree);
+            nextFree = slot + intervalNanos;
+            waitNanos = slot - now;
+        }
+        if (waitNanos > 0) {
+            try {
+                Thread.sleep(waitNanos / 1_000_000, (int) (waitNanos % 1_000_000));
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new IllegalStateException("Interrupted while rate limited", e);
+            }
+        }
+    }
+}
+
+// ToolMemoizer.java
+package com.example.brdmultiagent.tool;
+
+import io.micrometer.core.instrument.MeterRegistry;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.nio.charset.StandardCharsets;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.time.Duration;
+import java.util.HexFormat;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.TimeUnit;
+import java.util.function.Function;
+
+// Wraps tool functions (AppConfig) so repeated calls with the same input are not repeated, whether they come from
+// the same run (BA re-extracting across supervisor loops) or from concurrent runs of the same BRD. Each tool
+// declares how far that is safe to go. Results are shared across runs, keyed by tool + SHA-256 of the input, or of
+// what the input refers to when the tool supplies a key function (document references); failures are never cached.
+@Component
+public class ToolMemoizer {
+
+    public enum Idempotency {
+        NONE,          // Side effects per call (e.g. triggering a Jenkins build): always runs
+        SINGLE_FLIGHT, // Concurrent identical calls share one execution; nothing kept afterwards
+        CACHEABLE      // Single-flight, and the result is reused until the TTL expires
+    }
+
+    private record Entry(String result, long expiresAt, long costNanos) {
+    }
+
+    private final boolean enabled;
+    private final Duration ttl;
+    private final int maxEntries;
+    private final int maxResultChars;
+    private final Set<String> disabledTools;
+    private final MeterRegistry meterRegistry;
+    // Set by a tool that returned a degraded or fallback result: concurrent waiters still share it, but it is not stored
+    private static final ThreadLocal<Boolean> DO_NOT_CACHE = new ThreadLocal<>();
+    private final Map<String, CompletableFuture<String>> inFlight = new ConcurrentHashMap<>();
+    private final LinkedHashMap<String, Entry> entries = new LinkedHashMap<>(256, 0.75f, true); // Access order = LRU
+
+    public ToolMemoizer(MeterRegistry meterRegistry,
+                        @Value("${brd.tool-memo.enabled:true}") boolean enabled,
+                        @Value("${brd.tool-memo.ttl-seconds:600}") long ttlSeconds,
+                        @Value("${brd.tool-memo.max-entries:5000}") int maxEntries,
+                        @Value("${brd.tool-memo.max-result-chars:2000000}") int maxResultChars,
+                        @Value("${brd.tool-memo.disabled-tools:}") Set<String> disabledTools) {
+        this.meterRegistry = meterRegistry;
+        this.enabled = enabled;
+        this.ttl = Duration.ofSeconds(ttlSeconds);
+        this.maxEntries = maxEntries;
+        this.maxResultChars = maxResultChars;
+        this.disabledTools = disabledTools;
+        meterRegistry.gauge("brd.tool.memo.entries", entries, Map::size);
+        meterRegistry.gauge("brd.tool.memo.in-flight", inFlight, Map::size);
+    }
+
+    // Called from inside a tool implementation, on the calling thread, to keep the current result out of the cache
+    public static void doNotCache() {
+        DO_NOT_CACHE.set(Boolean.TRUE);
+    }
+
+    public Function<String, String> memoize(String tool, Idempotency idempotency, Function<String, String> call) {
+        return memoize(tool, idempotency, call, Function.identity());
+    }
+
+    // keyOf maps the input to what determines the result, e.g. an upload:// reference to the document's hash
+    public Function<String, String> memoize(String tool, Idempotency idempotency, Function<String, String> call,
+                                            Function<String, String> keyOf) {
+        if (!enabled || idempotency == Idempotency.NONE || disabledTools.contains(tool)) {
+            return call;
+        }
+        boolean cacheable = idempotency == Idempotency.CACHEABLE;
+        return input -> invoke(tool, cacheable, call, input, keyOf.apply(input));
+    }
+
+    private String invoke(String tool, boolean cacheable, Function<String, String> call, String input, String keyInput) {
+        String key = tool + ':' + sha256(keyInput);
+        if (cacheable) {
+            String cached = lookup(tool, key);
+            if (cached != null) {
+                return cached;
+            }
+        }
+
+        CompletableFuture<String> mine = new CompletableFuture<>();
+        CompletableFuture<String> running = inFlight.putIfAbsent(key, mine);
+        if (running != null) {
+            meterRegistry.counter("brd.tool.memo.avoided", "tool", tool, "reason", "single_flight").increment();
+            try {
+                // Interruptible, so a scenario timeout in ScenarioFanOut frees a worker waiting here
+                return running.get();
+            } catch (ExecutionException e) {
+                throw e.getCause() instanceof RuntimeException cause ? cause : new IllegalStateException(e.getCause());
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new IllegalStateException("Interrupted while waiting for an identical " + tool + " call", e);
+            }
+        }
+        try {
+            // The call that just left inFlight may have stored its result between our lookup and putIfAbsent
+            String cached = cacheable ? lookup(tool, key) : null;
+            if (cached != null) {
+                mine.complete(cached);
+                return cached;
+            }
+            meterRegistry.counter("brd.tool.memo.misses", "tool", tool).increment();
+            long start = System.nanoTime();
+            DO_NOT_CACHE.remove();
+            String result = call.apply(input);
+            if (cacheable && result != null && result.length() <= maxResultChars && DO_NOT_CACHE.get() == null) {
+                store(key, new Entry(result, System.currentTimeMillis() + ttl.toMillis(), System.nanoTime() - start));
+            }
+            mine.complete(result);
+            return result;
+        } catch (RuntimeException e) {
+            mine.completeExceptionally(e);
+            throw e;
+        } finally {
+            inFlight.remove(key, mine);
+            DO_NOT_CACHE.remove();
+        }
+    }
+
+    private String lookup(String tool, String key) {
+        Entry entry;
+        synchronized (this) {
+            entry = entries.get(key);
+            if (entry != null && entry.expiresAt() < System.currentTimeMillis()) {
+                entries.remove(key);
+                entry = null;
+            }
+        }
+        if (entry == null) {
+            return null;
+        }
+        meterRegistry.counter("brd.tool.memo.avoided", "tool", tool, "reason", "cache").increment();
+        // What the original call cost, i.e. the time this hit saved
+        meterRegistry.timer("brd.tool.memo.saved", "tool", tool).record(entry.costNanos(), TimeUnit.NANOSECONDS);
+        return entry.result();
+    }
+
+    private synchronized void store(String key, Entry entry) {
+        entries.put(key, entry);
+        while (entries.size() > maxEntries) {
+            entries.remove(entries.keySet().iterator().next()); // Least recently used
+        }
+    }
+
+    private static String sha256(String value) {
+        try {
+            byte[] hash = MessageDigest.getInstance("SHA-256").digest(value.getBytes(StandardCharsets.UTF_8));
+            return HexFormat.of().formatHex(hash);
+        } catch (NoSuchAlgorithmException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+}
+
+// JsonGeneratorTool.java (similar mock as before)
+
+// MicroserviceCallerTool.java
+package com.example.brdmultiagent.tool;
+
+import com.example.brdmultiagent.http.ToolHttpClient;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+@Component
+public class MicroserviceCallerTool {
+    private final ToolHttpClient httpClient;
+    private final String microserviceUrl;
+
+    public MicroserviceCallerTool(ToolHttpClient httpClient,
+                                  @Value("${brd.microservice.url}") String microserviceUrl) {
+        this.httpClient = httpClient;
+        this.microserviceUrl = microserviceUrl;
+    }
+
+    // Returns the Excel path/location reported by the microservice
+    public String callMicroservice(String json) {
+        return httpClient.postJson("microservice", microserviceUrl, json);
+    }
+
+    // Opens the connection ahead of the first scenario call
+    public void warmUp() {
+        httpClient.warm(microserviceUrl);
+    }
+}
+
+// JenkinsApiCallerTool.java
+package com.example.brdmultiagent.tool;
+
+import com.example.brdmultiagent.http.ToolHttpClient;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.net.URI;
+import java.net.URLEncoder;
+import java.net.http.HttpRequest;
+import java.nio.charset.StandardCharsets;
+import java.util.Base64;
+
+@Component
+public class JenkinsApiCallerTool {
+    private final ToolHttpClient httpClient;
+    private final String jenkinsUrl;
+    private final String authHeader;
+
+    public JenkinsApiCallerTool(ToolHttpClient httpClient,
+                                @Value("${brd.jenkins.url}") String jenkinsUrl,
+                                @Value("${brd.jenkins.user:}") String user,
+                                @Value("${brd.jenkins.token:}") String token) {
+        this.httpClient = httpClient;
+        this.jenkinsUrl = jenkinsUrl;
+        this.authHeader = user.isBlank() ? null
+                : "Basic " + Base64.getEncoder().encodeToString((user + ":" + token).getBytes(StandardCharsets.UTF_8));
+    }
+
+    // Triggers the parameterized test job with the Excel location; returns Jenkins' response as the status
+    public String callJenkins(String excelPath) {
+        String form = "EXCEL_PATH=" + URLEncoder.encode(excelPath, StandardCharsets.UTF_8);
+        HttpRequest.Builder request = HttpRequest.newBuilder(URI.create(jenkinsUrl))
+                .header("Content-Type", "application/x-www-form-urlencoded")
+                .POST(HttpRequest.BodyPublishers.ofString(form));
+        if (authHeader != null) {
+            request.header("Authorization", authHeader);
+        }
+        String body = httpClient.send("jenkins", request);
+        return body.isBlank() ? "Jenkins job queued for " + excelPath : body;
+    }
+}
+```
+
+### graph/BrdWorkflowGraph.java
+```java
+package com.example.brdmultiagent.graph;
+
+import com.example.brdmultiagent.agent.BAAgent;
+import com.example.brdmultiagent.agent.CodingAgent;
+import com.example.brdmultiagent.agent.DevAgent;
+import com.example.brdmultiagent.agent.SupervisorAgent;
+import com.example.brdmultiagent.checkpoint.CheckpointStore;
+import com.example.brdmultiagent.llm.LlmCallContext;
+import com.example.brdmultiagent.trace.RunTrace;
+import com.example.brdmultiagent.trace.RunTracer;
+import dev.langchain4j.langgraph.CompiledGraph;
+import dev.langchain4j.langgraph.StateGraph;
+import dev.langchain4j.langgraph.StateGraph.Edge;
+import dev.langchain4j.langgraph.StateGraph.Node;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.stereotype.Component;
+
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+import java.util.UUID;
+
+import static dev.langchain4j.langgraph.StateGraph.END;
+import static dev.langchain4j.langgraph.StateGraph.START;
+
+@Component
+public class BrdWorkflowGraph {
+    private static final Logger logger = LoggerFactory.getLogger(BrdWorkflowGraph.class);
+
+    private final SupervisorAgent supervisorAgent;
+    private final BAAgent baAgent;
+    private final DevAgent devAgent;
+    private final CodingAgent codingAgent;
+
+    private final CheckpointStore checkpointStore;
+    private final RunTracer runTracer;
+    private final LoopGuard loopGuard;
+    private final SpeculativePrefetch speculativePrefetch;
+
+    // Compiled once when the context starts; holds no per-run state, so all requests share it
+    private final CompiledGraph<AgentState> compiledGraph;
+
+    @Autowired
+    public BrdWorkflowGraph(SupervisorAgent supervisorAgent, BAAgent baAgent, DevAgent devAgent, CodingAgent codingAgent,
+                            CheckpointStore checkpointStore, RunTracer runTracer, LoopGuard loopGuard,
+                            SpeculativePrefetch speculativePrefetch) {
+        this.supervisorAgent = supervisorAgent;
+        this.baAgent = baAgent;
+        this.devAgent = devAgent;
+        this.codingAgent = codingAgent;
+        this.checkpointStore = checkpointStore;
+        this.runTracer = runTracer;
+        this.loopGuard = loopGuard;
+        this.speculativePrefetch = speculativePrefetch;
+
+        // An invalid graph (unknown node, dangling edge) fails application startup here, not the first upload
+        long start = System.nanoTime();
+        this.compiledGraph = buildGraph().compile();
+        logger.info("Compiled BRD workflow graph in {} ms", (System.nanoTime() - start) / 1_000_000);
+    }
+
+    public StateGraph<AgentState> buildGraph() {
+        return new StateGraph<>(AgentState::new)
+                .addNode("supervisor", state -> nodeCompleted("supervisor", decide(state)))
+                .addNode("ba_agent", state -> nodeCompleted("ba_agent", runTracer.node("ba_agent", () -> baAgent.invoke(state))))
+                .addNode("dev_agent", state -> nodeCompleted("dev_agent", runTracer.node("dev_agent", () -> devAgent.invoke(state))))
+                .addNode("coding_agent", state -> nodeCompleted("coding_agent",
+                        runTracer.node("coding_agent", () -> codingAgent.invoke(state))))
+                .addEdge(START, "supervisor")
+                .addConditionalEdges("supervisor",
+                        AgentState::getNext, // Router function
+                        Map.of("ba_agent", "ba_agent",
+                               "dev_agent", "dev_agent",
+                               "coding_agent", "coding_agent",
+                               "FINISH", END))
+                .addEdge("ba_agent", "supervisor")
+                .addEdge("dev_agent", "supervisor")
+                .addEdge("coding_agent", "supervisor");
+    }
+
+    // Supervisor decision (budget-guarded), with the predicted next step's tool work running alongside it.
+    // Rule-based decisions take no time, so there is nothing to overlap; only LLM routing speculates.
+    private AgentState decide(AgentState state) {
+        Optional<SpeculativePrefetch.Speculation> speculation = supervisorAgent.routesByRule(state)
+                ? Optional.empty() : speculativePrefetch.start(state);
+        boolean decided = false;
+        try {
+            guard(runTracer.node("supervisor", () -> supervisorAgent.invoke(state)));
+            decided = true;
+        } finally {
+            if (speculation.isPresent()) {
+                speculation.get().resolve(state, decided);
+            }
+        }
+        return state;
+    }
+
+    // Overrides the supervisor's decision with FINISH once a budget is exhausted; the run then ends normally
+    // and returns what the agents produced so far
+    private AgentState guard(AgentState state) {
+        loopGuard.check(state).ifPresent(exhausted -> {
+            logger.warn("Stopping run {} early at {} -> {}: {} budget exhausted ({})", state.getRunId(),
+                    state.getSteps(), state.getNext(), exhausted.budget(), exhausted.detail());
+            StringBuilder partial = new StringBuilder("Run stopped early: ").append(exhausted.budget())
+                    .append(" budget exhausted (").append(exhausted.detail()).append("). Partial results:\n");
+            for (String agent : List.of("ba_agent", "dev_agent", "coding_agent")) {
+                String output = state.getLatestOutput(agent);
+                partial.append("\n[").append(agent).append("]\n").append(output == null ? "(not run)" : output).append('\n');
+            }
+            state.setNext("FINISH");
+            state.addAgentOutput("supervisor", partial.toString());
+            if (state.getListener() != null) {
+                state.getListener().onEvent("budget", Map.of("budget", exhausted.budget(), "detail", exhausted.detail()));
+            }
+        });
+        return state;
+    }
+
+    // Checkpoints the state, then emits the node's output: supervisor decision, BA scenarios, Dev Excel path,
+    // Coding job status
+    private AgentState nodeCompleted(String node, AgentState state) {
+        state.setSteps(state.getSteps() + 1);
+        if (state.getRunId() != null) {
+            checkpointStore.save(state, node);
+        }
+
+        GraphEventListener listener = state.getListener();
+        if (listener != null) {
+            Map<String, Object> data = new HashMap<>();
+            data.put("node", node);
+            data.put("output", state.getFinalOutput());
+            if ("supervisor".equals(node)) {
+                data.put("next", state.getNext());
+            }
+            listener.onEvent("node", data);
+        }
+        return state;
+    }
+
+    public String run(String initialInput) {
+        return run(null, initialInput, null);
+    }
+
+    // runId != null turns on per-node checkpoints so the run can be resumed after a crash or failure
+    public String run(String runId, String initialInput, GraphEventListener listener) {
+        AgentState initialState = new AgentState();
+        initialState.setRunId(runId);
+        initialState.setListener(listener);
+        initialState.addMessage(new org.springframework.ai.chat.messages.UserMessage(initialInput));
+        return execute(initialState);
+    }
+
+    // Restarts from a checkpointed state. Every agent edge leads back to the supervisor, so entering at the
+    // supervisor continues after the last completed node; the rule-based router makes that step cheap.
+    public String resume(AgentState checkpointed, GraphEventListener listener) {
+        checkpointed.setListener(listener);
+        return execute(checkpointed);
+    }
+
+    private String execute(AgentState initialState) {
+        // Each run gets its own AgentState; the compiled graph itself is read-only.
+        // The run key lets the LLM scheduler share capacity fairly between concurrent runs.
+        String runKey = initialState.getRunId() != null ? initialState.getRunId() : UUID.randomUUID().toString();
+        RunTrace trace = runTracer.start(runKey);
+        AgentState finalState;
+        try {
+            finalState = LlmCallContext.runAs(runKey, () -> compiledGraph.invoke(initialState));
+        } finally {
+            runTracer.finish(trace);
+        }
+        if (finalState.getRunId() != null) {
+            checkpointStore.delete(finalState.getRunId()); // Finished runs need no resume point
+        }
+        return finalState.getFinalOutput();
+    }
+
+    public CompiledGraph<AgentState> getCompiledGraph() {
+        return compiledGraph;
+    }
+}
+```
+
+### graph/LoopGuard.java
+```java
+package com.example.brdmultiagent.graph;
+
+import com.example.brdmultiagent.trace.RunTrace;
+import com.example.brdmultiagent.trace.RunTracer;
+import io.micrometer.core.instrument.MeterRegistry;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Optional;
+
+// Checked after every supervisor decision: step, token and wall-clock budgets, and repeated-route cycles
+// (the same agent, or the same 2-3 agent sequence, routed to more than max-route-repeats times in a row).
+// Tokens and time come from the run's trace, so they cover this execution only, not earlier attempts
+// before a resume; steps are checkpointed and do cover them.
+@Component
+public class LoopGuard {
+    private static final int MAX_CYCLE_PERIOD = 3;
+
+    public record Exhausted(String budget, String detail) {
+    }
+
+    private final RunTracer runTracer;
+    private final MeterRegistry meterRegistry;
+    private final int maxSteps;
+    private final long maxTokens;
+    private final long maxDurationMs;
+    private final int maxRouteRepeats;
+
+    public LoopGuard(RunTracer runTracer,
+                     MeterRegistry meterRegistry,
+                     @Value("${brd.budget.max-steps:20}") int maxSteps,
+                     @Value("${brd.budget.max-tokens:300000}") long maxTokens,
+                     @Value("${brd.budget.max-duration-seconds:1800}") long maxDurationSeconds,
+                     @Value("${brd.budget.max-route-repeats:2}") int maxRouteRepeats) {
+        this.runTracer = runTracer;
+        this.meterRegistry = meterRegistry;
+        this.maxSteps = maxSteps;
+        this.maxTokens = maxTokens;
+        this.maxDurationMs = maxDurationSeconds * 1000;
+        this.maxRouteRepeats = maxRouteRepeats;
+    }
+
+    // Empty = let the supervisor's decision stand
+    public Optional<Exhausted> check(AgentState state) {
+        String next = state.getNext();
+        if (next == null || "FINISH".equals(next)) {
+            return Optional.empty();
+        }
+        Exhausted exhausted = null;
+        Optional<RunTrace> trace = runTracer.current();
+        if (state.getSteps() >= maxSteps) {
+            exhausted = new Exhausted("steps", state.getSteps() + " steps (limit " + maxSteps + ")");
+        } else if (trace.isPresent() && trace.get().totalTokens() >= maxTokens) {
+            exhausted = new Exhausted("tokens", trace.get().totalTokens() + " tokens (limit " + maxTokens + ")");
+        } else if (trace.isPresent() && trace.get().getDurationMs() >= maxDurationMs) {
+            exhausted = new Exhausted("wall_clock", trace.get().getDurationMs() + " ms (limit " + maxDurationMs + " ms)");
+        } else {
+            List<String> routes = workerRoutes(state);
+            routes.add(next);
+            int period = cyclePeriod(routes);
+            if (period > 0) {
+                exhausted = new Exhausted("cycle", String.join(" -> ", routes.subList(routes.size() - period, routes.size()))
+                        + " routed " + (maxRouteRepeats + 1) + " times in a row");
+            }
+        }
+        if (exhausted != null) {
+            meterRegistry.counter("brd.budget.exhausted", "budget", exhausted.budget()).increment();
+        }
+        return Optional.ofNullable(exhausted);
+    }
+
+    // Worker agents in the order they ran (supervisor turns skipped)
+    private static List<String> workerRoutes(AgentState state) {
+        List<String> routes = new ArrayList<>();
+        state.getMessages().forEach(message -> {
+            Object agent = message.getMetadata().get(AgentState.AGENT_KEY);
+            if (agent != null && !"supervisor".equals(agent)) {
+                routes.add(agent.toString());
+            }
+        });
+        return routes;
+    }
+
+    // Smallest period p such that the last p routes repeat maxRouteRepeats + 1 times back to back; 0 if none
+    private int cyclePeriod(List<String> routes) {
+        for (int period = 1; period <= MAX_CYCLE_PERIOD; period++) {
+            int window = period * (maxRouteRepeats + 1);
+            if (routes.size() < window) {
+                break;
+            }
+            int start = routes.size() - window;
+            boolean repeating = true;
+            for (int i = start + period; i < routes.size() && repeating; i++) {
+                repeating = routes.get(i).equals(routes.get(i - period));
+            }
+            if (repeating) {
+                return period;
+            }
+        }
+        return 0;
+    }
+}
+```
+
+### graph/ContextWindow.java
+```java
+package com.example.brdmultiagent.graph;
+
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.ai.chat.messages.AssistantMessage;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.messages.SystemMessage;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.prompt.Prompt;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.ArrayList;
+import java.util.IdentityHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+
+@Component
+public class ContextWindow {
+    private static final Logger logger = LoggerFactory.getLogger(ContextWindow.class);
+
+    // Whose artifacts each agent gets in full; everyone else only sees the reference + preview
+    private static final Map<String, Set<String>> INLINE_ARTIFACTS = Map.of(
+            "supervisor", Set.of(),
+            "ba_agent", Set.of(),
+            "dev_agent", Set.of("ba_agent"),          // Scenarios
+            "coding_agent", Set.of("dev_agent"));     // Excel path/content
+
+    private final ChatModel chatModel;
+    private final int tokenBudget;
+    private final int keepRecent;
+
+    public ContextWindow(ChatModel chatModel,
+                         @Value("${brd.context.token-budget:6000}") int tokenBudget,
+                         @Value("${brd.context.keep-recent:4}") int keepRecent) {
+        this.chatModel = chatModel;
+        this.tokenBudget = tokenBudget;
+        this.keepRecent = keepRecent;
+    }
+
+    // Message 0 (the upload request) is always kept; older turns collapse into a summary once over budget
+    public List<Message> viewFor(String agent, AgentState state) {
+        Set<String> inlined = INLINE_ARTIFACTS.getOrDefault(agent, Set.of());
+        MessageLog history = state.getMessages();
+
+        // The history itself is the view unless some artifact must be inlined; copy only then
+        List<Message> full = history;
+        Map<Message, Message> references = new IdentityHashMap<>(); // Inlined artifact -> its reference message
+        for (int i = 0; i < history.size(); i++) {
+            Message rendered = render(history.get(i), inlined, state);
+            if (rendered != history.get(i)) {
+                if (full == history) {
+                    full = new ArrayList<>(history);
+                }
+                full.set(i, rendered);
+                references.put(rendered, history.get(i));
+            }
+        }
+        long tokens = full == history ? history.chars() / 4 : estimateTokens(full);
+        if (tokens <= tokenBudget) {
+            return full;
+        }
+        if (history.size() <= keepRecent + 1) {
+            return fitInlined(full, references);
+        }
+
+        int keepFrom = history.size() - keepRecent;
+        List<Message> view = new ArrayList<>(keepRecent + 2);
+        view.add(full.get(0));
+        view.add(new SystemMessage("Summary of earlier steps: " + summarize(state, keepFrom)));
+        view.addAll(full.subList(keepFrom, full.size()));
+        return fitInlined(view, references);
+    }
+
+    private Message render(Message message, Set<String> inlined, AgentState state) {
+        Object artifactKey = message.getMetadata().get(AgentState.ARTIFACT_KEY);
+        Object agent = message.getMetadata().get(AgentState.AGENT_KEY);
+        if (artifactKey != null && agent != null && inlined.contains(agent.toString())) {
+            String content = state.getArtifact(artifactKey.toString());
+            if (content != null) {
+                return new AssistantMessage(content);
+            }
+        }
+        return message;
+    }
+
+    // Inlined artifacts count toward the budget as well: older ones go back to their reference + preview,
+    // then the newest is cut to what is left
+    private List<Message> fitInlined(List<Message> view, Map<Message, Message> references) {
+        long tokens = estimateTokens(view);
+        if (tokens <= tokenBudget || references.isEmpty()) {
+            return view;
+        }
+        List<Message> fitted = new ArrayList<>(view);
+        int newest = -1;
+        for (int i = 0; i < fitted.size(); i++) {
+            if (references.containsKey(fitted.get(i))) {
+                newest = i;
+            }
+        }
+        for (int i = 0; i < newest && tokens > tokenBudget; i++) {
+            Message reference = references.get(fitted.get(i));
+            if (reference != null) {
+                tokens -= estimateTokens(List.of(fitted.get(i))) - estimateTokens(List.of(reference));
+                fitted.set(i, reference);
+            }
+        }
+        if (tokens > tokenBudget && newest >= 0) {
+            String content = fitted.get(newest).getContent();
+            int keep = (int) Math.max(0, content.length() - (tokens - tokenBudget) * 4);
+            fitted.set(newest, new AssistantMessage(content.substring(0, keep) + "\n[... "
+                    + (content.length() - keep) + " chars omitted to fit the context budget]"));
+        }
+        return fitted;
+    }
+
+    // Incremental: only turns added since the last summary are sent, together with the previous summary
+    private String summarize(AgentState state, int upTo) {
+        if (state.getSummary() != null && state.getSummarizedUpTo() >= upTo) {
+            return state.getSummary();
+        }
+        StringBuilder input = new StringBuilder();
+        if (state.getSummary() != null) {
+            input.append("Previous summary: ").append(state.getSummary()).append("\n\n");
+        }
+        List<Message> history = state.getMessages();
+        for (int i = state.getSummarizedUpTo(); i < upTo; i++) {
+            input.append(history.get(i).getMessageType()).append(": ").append(history.get(i).getContent()).append("\n");
+        }
+
+        String summary = chatModel.call(new Prompt(
+                "Summarize these BRD workflow steps in under 150 words. Keep agent names, decisions, "
+                        + "scenario counts, file paths and job statuses:\n" + input))
+                .getResult().getOutput().getContent();
+        state.setSummary(summary, upTo);
+        logger.debug("Summarized messages 1..{} into {} chars", upTo, summary.length());
+        return summary;
+    }
+
+    // ~4 chars per token is close enough for budgeting English prompts
+    static int estimateTokens(List<Message> messages) {
+        int chars = 0;
+        for (Message message : messages) {
+            chars += message.getContent() == null ? 0 : message.getContent().length();
+        }
+        return chars / 4;
+    }
+}
+```
+
+### graph/ScenarioFanOut.java
+```java
+package com.example.brdmultiagent.graph;
+
+import jakarta.annotation.PreDestroy;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Qualifier;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.ScheduledFuture;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.function.Function;
+import java.util.function.Supplier;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+@Component
+public class ScenarioFanOut {
+    private static final Logger logger = LoggerFactory.getLogger(ScenarioFanOut.class);
+    // "1. As a ...", "2) ...", "- ...", "* ..."; group 1 = indentation, group 2 = number (null for bullets)
+    private static final Pattern SCENARIO_LINE = Pattern.compile("^([ \\t]*)(?:(\\d+)[.)]|[-*])\\s+(.+)$");
+
+    // Memoized like the LLM-facing tools, so concurrent runs with the same scenarios share the calls
+    private final Function<String, String> jsonGeneration;
+    private final Function<String, String> microserviceCall;
+    private final ExecutorService executor;
+    private final ScheduledExecutorService timeouts;
+    private final long scenarioTimeoutSeconds;
+
+    public ScenarioFanOut(@Qualifier("jsonGeneration") Function<String, String> jsonGeneration,
+                          @Qualifier("microserviceCall") Function<String, String> microserviceCall,
+                          @Value("${brd.dev.fan-out.concurrency:8}") int concurrency,
+                          @Value("${brd.dev.fan-out.scenario-timeout-seconds:120}") long scenarioTimeoutSeconds) {
+        this.jsonGeneration = jsonGeneration;
+        this.microserviceCall = microserviceCall;
+        this.scenarioTimeoutSeconds = scenarioTimeoutSeconds;
+        // Shared by all runs, so the concurrency limit also caps total pressure on the LLM and microservice
+        AtomicInteger threadCount = new AtomicInteger();
+        this.executor = Executors.newFixedThreadPool(concurrency,
+                r -> new Thread(r, "brd-scenario-" + threadCount.incrementAndGet()));
+        this.timeouts = Executors.newSingleThreadScheduledExecutor(r -> new Thread(r, "brd-scenario-timeout"));
+    }
+
+    // Top-level list items only: when the list is numbered, bullets are details of a scenario, and anything
+    // indented deeper than the outermost items is a sub-point
+    public static List<String> parseScenarios(String baOutput) {
+        List<String> scenarios = new ArrayList<>();
+        if (baOutput == null) {
+            return scenarios;
+        }
+        List<Matcher> items = new ArrayList<>();
+        boolean numbered = false;
+        for (String line : baOutput.split("\\R")) {
+            Matcher matcher = SCENARIO_LINE.matcher(line);
+            if (matcher.matches()) {
+                items.add(matcher);
+                numbered |= matcher.group(2) != null;
+            }
+        }
+        int outermost = Integer.MAX_VALUE;
+        for (Matcher item : items) {
+            if (!numbered || item.group(2) != null) {
+                outermost = Math.min(outermost, indent(item.group(1)));
+            }
+        }
+        for (Matcher item : items) {
+            if ((!numbered || item.group(2) != null) && indent(item.group(1)) == outermost) {
+                scenarios.add(item.group(3).trim());
+            }
+        }
+        return scenarios;
+    }
+
+    private static int indent(String whitespace) {
+        return whitespace.replace("\t", "    ").length();
+    }
+
+    public List<ScenarioResult> process(List<String> scenarios, GraphEventListener listener) {
+        return process(scenarios, Map.of(), listener);
+    }
+
+    // JSON then Excel per scenario; a failing scenario yields an error result instead of failing the batch.
+    // prefetchedJson holds JSON already started by SpeculativePrefetch; missing or failed entries are regenerated.
+    // A scenario with a prefetch in flight is only handed to a worker once it resolves (or after the scenario
+    // timeout), so workers never block on the speculation pool and the wait is not charged to the scenario budget.
+    public List<ScenarioResult> process(List<String> scenarios, Map<String, CompletableFuture<String>> prefetchedJson,
+                                        GraphEventListener listener) {
+        long start = System.nanoTime();
+        List<CompletableFuture<ScenarioResult>> futures = new ArrayList<>(scenarios.size());
+        for (int i = 0; i < scenarios.size(); i++) {
+            int index = i;
+            String scenario = scenarios.get(i);
+            CompletableFuture<String> prefetched = prefetchedJson.get(scenario);
+            CompletableFuture<String> json = prefetched == null ? CompletableFuture.completedFuture(null)
+                    : prefetched.exceptionally(e -> null).completeOnTimeout(null, scenarioTimeoutSeconds, TimeUnit.SECONDS);
+            futures.add(json.thenCompose(ready -> submit(() -> processOne(index, scenario, ready)))
+                    .exceptionally(e -> ScenarioResult.failed(index, scenario, e))
+                    .whenComplete((result, e) -> notify(listener, result)));
+        }
+
+        // Join in submission order so results line up with the BA scenario numbering
+        List<ScenarioResult> results = new ArrayList<>(futures.size());
+        for (CompletableFuture<ScenarioResult> future : futures) {
+            results.add(future.join());
+        }
+        long failed = results.stream().filter(r -> !r.succeeded()).count();
+        logger.info("Processed {} scenarios ({} failed) in {} ms", results.size(), failed,
+                (System.nanoTime() - start) / 1_000_000);
+        return results;
+    }
+
+    // The per-scenario budget starts when a worker picks the scenario up, not while it waits behind other runs'
+    // scenarios; on timeout the worker is interrupted, which aborts the blocking LLM/HTTP call it is in
+    private CompletableFuture<ScenarioResult> submit(Supplier<ScenarioResult> work) {
+        CompletableFuture<ScenarioResult> result = new CompletableFuture<>();
+        executor.execute(() -> {
+            Thread worker = Thread.currentThread();
+            AtomicBoolean running = new AtomicBoolean(true);
+            ScheduledFuture<?> timeout = timeouts.schedule(() -> {
+                synchronized (running) {
+                    if (running.get() && result.completeExceptionally(new TimeoutException(
+                            "Scenario exceeded " + scenarioTimeoutSeconds + " s"))) {
+                        worker.interrupt();
+                    }
+                }
+            }, scenarioTimeoutSeconds, TimeUnit.SECONDS);
+            try {
+                result.complete(work.get());
+            } catch (Throwable e) {
+                result.completeExceptionally(e);
+            } finally {
+                timeout.cancel(false);
+                synchronized (running) {
+                    running.set(false);
+                }
+                Thread.interrupted(); // Never hand a pending timeout interrupt to the next scenario
+            }
+        });
+        return result;
+    }
+
+    private ScenarioResult processOne(int index, String scenario, String prefetchedJson) {
+        String json = prefetchedJson;
+        if (json == null) {
+            json = jsonGeneration.apply(scenario);
+        }
+        String excelPath = microserviceCall.apply(json);
+        return ScenarioResult.succeeded(index, scenario, json, excelPath);
+    }
+
+    private static void notify(GraphEventListener listener, ScenarioResult result) {
+        if (listener == null || result == null) {
+            return;
+        }
+        Map<String, Object> data = new HashMap<>();
+        data.put("index", result.index());
+        data.put("scenario", result.scenario());
+        data.put("excelPath", result.excelPath());
+        data.put("error", result.error());
+        try {
+            synchronized (listener) { // Runs on every worker; SSE sends must not interleave
+                listener.onEvent("scenario", data);
+            }
+        } catch (RuntimeException e) {
+            // Runs inside whenComplete: a throw here would fail the scenario's future and with it the whole batch
+            logger.debug("Listener rejected scenario result {}", result.index(), e);
+        }
+    }
+
+    // Agent output for the supervisor and Coding agent: one line per scenario
+    public static String describe(List<ScenarioResult> results) {
+        StringBuilder out = new StringBuilder("Excel generation results:\n");
+        for (ScenarioResult result : results) {
+            out.append(result.index() + 1).append(". ").append(result.scenario()).append(" -> ")
+                    .append(result.succeeded() ? result.excelPath() : "FAILED: " + result.error()).append('\n');
+        }
+        return out.toString();
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        executor.shutdownNow();
+        timeouts.shutdownNow();
+    }
+}
+```
+
+### graph/SpeculativePrefetch.java
+```java
+package com.example.brdmultiagent.graph;
+
+import com.example.brdmultiagent.llm.LlmCallContext;
+import com.example.brdmultiagent.tool.MicroserviceCallerTool;
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import jakarta.annotation.PreDestroy;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.beans.factory.annotation.Qualifier;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.LinkedHashMap;
+import java.util.LinkedHashSet;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+import java.util.Set;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.function.Function;
+
+// Runs the Dev agent's first step while the supervisor's LLM is still deciding (the rule-based fast path is
+// instant and never speculates). Once BA has produced a parseable scenario list the supervisor almost always
+// routes to dev_agent, so jsonGeneratorTool starts per scenario
+// and a connection to the microservice is opened. If the supervisor agrees, DevAgent picks up the futures;
+// otherwise they are dropped. jsonGeneratorTool only transforms text, so discarded work has no side effects.
+@Component
+public class SpeculativePrefetch {
+    private final Function<String, String> jsonGeneration; // Memoized: a speculated result is reused by other runs
+    private final MicroserviceCallerTool microserviceCallerTool;
+    private final boolean enabled;
+    private final int maxScenarios;
+    private final ExecutorService executor;
+    private final Counter committed;
+    private final Counter discarded;
+    private final Counter wasted;
+    private final Timer saved;
+
+    public SpeculativePrefetch(@Qualifier("jsonGeneration") Function<String, String> jsonGeneration,
+                               MicroserviceCallerTool microserviceCallerTool,
+                               MeterRegistry meterRegistry,
+                               @Value("${brd.speculation.enabled:true}") boolean enabled,
+                               @Value("${brd.speculation.concurrency:4}") int concurrency,
+                               @Value("${brd.speculation.max-scenarios:50}") int maxScenarios) {
+        this.jsonGeneration = jsonGeneration;
+        this.microserviceCallerTool = microserviceCallerTool;
+        this.enabled = enabled;
+        this.maxScenarios = maxScenarios;
+        AtomicInteger threadCount = new AtomicInteger();
+        this.executor = Executors.newFixedThreadPool(concurrency,
+                r -> new Thread(r, "brd-speculate-" + threadCount.incrementAndGet()));
+        // Hit rate = committed / (committed + discarded)
+        this.committed = meterRegistry.counter("brd.speculation", "outcome", "committed");
+        this.discarded = meterRegistry.counter("brd.speculation", "outcome", "discarded");
+        this.wasted = meterRegistry.counter("brd.speculation.wasted");
+        this.saved = meterRegistry.timer("brd.speculation.saved");
+    }
+
+    // Prefetched work for one supervisor step; resolve() exactly once
+    public final class Speculation {
+        private final long startNanos = System.nanoTime();
+        private final AtomicBoolean dropped = new AtomicBoolean();
+        private final AtomicLong finishedNanos = new AtomicLong();
+        private final Map<String, CompletableFuture<String>> json = new LinkedHashMap<>();
+
+        private Speculation(List<String> scenarios, String run) {
+            Set<String> distinct = new LinkedHashSet<>(scenarios); // Futures are keyed by scenario text
+            AtomicInteger pending = new AtomicInteger(distinct.size());
+            for (String scenario : distinct) {
+                json.put(scenario, CompletableFuture.supplyAsync(() -> {
+                    if (dropped.get()) {
+                        return null; // Supervisor already went elsewhere; don't start
+                    }
+                    try {
+                        return LlmCallContext.runAs(run, () -> jsonGeneration.apply(scenario));
+                    } finally {
+                        if (pending.decrementAndGet() == 0) {
+                            finishedNanos.set(System.nanoTime());
+                        }
+                    }
+                }, executor));
+            }
+        }
+
+        // Hands the futures to the Dev agent if the supervisor chose it, drops them otherwise
+        public void resolve(AgentState state, boolean decided) {
+            if (decided && "dev_agent".equals(state.getNext())) {
+                state.setPrefetchedJson(json);
+                committed.increment();
+                // Time the JSON work ran ahead of the Dev agent: the decision latency, or less if it finished sooner
+                long end = finishedNanos.get() != 0 ? Math.min(finishedNanos.get(), System.nanoTime()) : System.nanoTime();
+                saved.record(end - startNanos, TimeUnit.NANOSECONDS);
+                return;
+            }
+            dropped.set(true);
+            discarded.increment();
+            wasted.increment(json.values().stream().filter(f -> f.isDone() && !f.isCompletedExceptionally()).count());
+            json.values().forEach(f -> f.cancel(false));
+        }
+    }
+
+    // Empty when speculation is off or the next step is not predictable from the state
+    public Optional<Speculation> start(AgentState state) {
+        if (!enabled || !"ba_agent".equals(lastWorker(state))) {
+            return Optional.empty();
+        }
+        List<String> scenarios = ScenarioFanOut.parseScenarios(state.getLatestOutput("ba_agent"));
+        if (scenarios.isEmpty()) {
+            return Optional.empty();
+        }
+        microserviceCallerTool.warmUp();
+        return Optional.of(new Speculation(scenarios.subList(0, Math.min(scenarios.size(), maxScenarios)),
+                LlmCallContext.currentRun()));
+    }
+
+    private static String lastWorker(AgentState state) {
+        List<Message> messages = state.getMessages();
+        for (int i = messages.size() - 1; i >= 0; i--) {
+            Object agent = messages.get(i).getMetadata().get(AgentState.AGENT_KEY);
+            if (agent != null && !"supervisor".equals(agent)) {
+                return agent.toString();
+            }
+        }
+        return null;
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        executor.shutdownNow();
+    }
+}
+```
+
+### graph/ScenarioResult.java
+```java
+package com.example.brdmultiagent.graph;
+
+import java.util.concurrent.CompletionException;
+
+public record ScenarioResult(int index, String scenario, String json, String excelPath, String error) {
+
+    public static ScenarioResult succeeded(int index, String scenario, String json, String excelPath) {
+        return new ScenarioResult(index, scenario, json, excelPath, null);
+    }
+
+    public static ScenarioResult failed(int index, String scenario, Throwable e) {
+        Throwable cause = e instanceof CompletionException && e.getCause() != null ? e.getCause() : e;
+        return new ScenarioResult(index, scenario, null, null, cause.getClass().getSimpleName() + ": " + cause.getMessage());
+    }
+
+    public boolean succeeded() {
+        return error == null;
+    }
+}
+```
+
+### graph/GraphEventListener.java
+```java
+package com.example.brdmultiagent.graph;
+
+import java.util.Map;
+
+// Receives "node" events after each graph node, "token" events while an agent's LLM call streams and
+// "analysis" events with partial scenarios as the analysis tools finish each chunk
+@FunctionalInterface
+public interface GraphEventListener {
+    void onEvent(String event, Map<String, Object> data);
+}
+```
+
+### controller/UploadController.java
+```java
+package com.example.brdmultiagent.controller;
+
+import com.example.brdmultiagent.batch.BatchIngestService;
+import com.example.brdmultiagent.batch.IngestBatch;
+import com.example.brdmultiagent.graph.BrdWorkflowGraph;
+import com.example.brdmultiagent.job.BrdJob;
+import com.example.brdmultiagent.job.BrdJobService;
+import com.example.brdmultiagent.upload.UploadHandle;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import com.example.brdmultiagent.upload.UploadTooLargeException;
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.http.HttpStatus;
+import org.springframework.http.MediaType;
+import org.springframework.http.ResponseEntity;
+import org.springframework.web.bind.annotation.PostMapping;
+import org.springframework.web.bind.annotation.RequestParam;
+import org.springframework.web.bind.annotation.RestController;
+import org.springframework.web.multipart.MultipartFile;
+import org.springframework.web.server.ResponseStatusException;
+import org.springframework.web.servlet.mvc.method.annotation.SseEmitter;
+
+import java.io.IOException;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicReference;
+
+@RestController
+public class UploadController {
+
+    @Autowired
+    private BrdWorkflowGraph workflowGraph;
+
+    @Autowired
+    private BrdJobService jobService;
+
+    @Autowired
+    private UploadRegistry uploads;
+
+    @Autowired
+    private BatchIngestService batchService;
+
+    @PostMapping("/upload-brd")
+    public ResponseEntity<String> uploadBrd(@RequestParam("file") MultipartFile file) {
+        // The upload is released (memory freed / spill file deleted) as soon as the run returns
+        try (UploadHandle upload = uploads.register(file)) {
+            String result = workflowGraph.run(initialInput(upload));
+            return ResponseEntity.ok(result);
+        } catch (UploadTooLargeException e) {
+            return ResponseEntity.status(HttpStatus.PAYLOAD_TOO_LARGE).body("Error: " + e.getMessage());
+        } catch (Exception e) {
+            return ResponseEntity.badRequest().body("Error: " + e.getMessage());
+        }
+    }
+
+    // Job mode: returns 202 + job id immediately; poll /jobs/{id} for status and /jobs/{id}/result
+    @PostMapping("/upload-brd/jobs")
+    public ResponseEntity<Map<String, Object>> submitBrd(@RequestParam("file") MultipartFile file) {
+        try {
+            UploadHandle upload = uploads.register(file);
+            BrdJob job = jobService.submit(initialInput(upload), null, upload);
+            return ResponseEntity.accepted().body(job.toStatus());
+        } catch (UploadTooLargeException e) {
+            return ResponseEntity.status(HttpStatus.PAYLOAD_TOO_LARGE).body(Map.of("error", e.getMessage()));
+        } catch (RejectedExecutionException e) {
+            // Backpressure: pool and queue are full, client should retry later
+            return ResponseEntity.status(HttpStatus.TOO_MANY_REQUESTS)
+                    .header("Retry-After", "30")
+                    .body(Map.of("error", "Job queue is full", "queueDepth", jobService.getQueueDepth()));
+        } catch (Exception e) {
+            return ResponseEntity.badRequest().body(Map.of("error", String.valueOf(e.getMessage())));
+        }
+    }
+
+    // SSE: "queued", "node" per graph step, "token" per streamed LLM chunk, "analysis" per analysed chunk, then
+    // "done", "error" or "cancelled"
+    @PostMapping(value = "/upload-brd/stream", produces = MediaType.TEXT_EVENT_STREAM_VALUE)
+    public SseEmitter streamBrd(@RequestParam("file") MultipartFile file) throws IOException {
+        UploadHandle upload;
+        try {
+            upload = uploads.register(file);
+        } catch (UploadTooLargeException e) {
+            throw new ResponseStatusException(HttpStatus.PAYLOAD_TOO_LARGE, e.getMessage());
+        }
+
+        SseEmitter emitter = new SseEmitter(0L); // No servlet timeout; the job pool bounds the run
+        AtomicReference<BrdJob> jobRef = new AtomicReference<>();
+        AtomicBoolean gone = new AtomicBoolean();
+        // Stop spending LLM calls on a run nobody is listening to. The client can go away before submit()
+        // returns, so both sides check: whoever comes second cancels.
+        Runnable abandon = () -> {
+            gone.set(true);
+            BrdJob job = jobRef.get();
+            if (job != null) {
+                jobService.cancel(job);
+            }
+        };
+        emitter.onError(e -> abandon.run());
+        emitter.onTimeout(abandon);
+        try {
+            // "queued" is the first event, sent by the job service before the job can start
+            jobRef.set(jobService.submit(initialInput(upload), (event, data) -> {
+                if (gone.get()) {
+                    return;
+                }
+                try {
+                    emitter.send(SseEmitter.event().name(event).data(data, MediaType.APPLICATION_JSON));
+                    if ("done".equals(event) || "error".equals(event) || "cancelled".equals(event)) {
+                        emitter.complete();
+                    }
+                } catch (IOException e) {
+                    emitter.completeWithError(e); // Client went away
+                    abandon.run();
+                }
+            }, upload));
+        } catch (RejectedExecutionException e) {
+            throw new ResponseStatusException(HttpStatus.TOO_MANY_REQUESTS, "Job queue is full");
+        }
+        if (gone.get()) {
+            jobService.cancel(jobRef.get());
+        }
+        return emitter;
+    }
+
+    // Many files and/or .zip archives in one request. SSE: "batch" (counts), one "document" manifest entry per
+    // BRD as it finishes (status, jobId, result or error, duplicateOf), then "summary" with docs/minute
+    @PostMapping(value = "/upload-brd/batch", produces = MediaType.TEXT_EVENT_STREAM_VALUE)
+    public SseEmitter batchBrd(@RequestParam("files") List<MultipartFile> files) throws IOException {
+        List<UploadHandle> documents;
+        try {
+            documents = batchService.register(files);
+        } catch (UploadTooLargeException e) {
+            throw new ResponseStatusException(HttpStatus.PAYLOAD_TOO_LARGE, e.getMessage());
+        } catch (IllegalArgumentException e) {
+            throw new ResponseStatusException(HttpStatus.BAD_REQUEST, e.getMessage());
+        }
+
+        SseEmitter emitter = new SseEmitter(0L);
+        AtomicReference<IngestBatch> batchRef = new AtomicReference<>();
+        AtomicBoolean gone = new AtomicBoolean();
+        // As in streamBrd: start() already emits, so the client can go away before it returns
+        Runnable abandon = () -> {
+            gone.set(true);
+            batchService.cancel(batchRef.get());
+        };
+        emitter.onError(e -> abandon.run());
+        emitter.onTimeout(abandon);
+        batchRef.set(batchService.start(documents, (event, data) -> {
+            if (gone.get()) {
+                return;
+            }
+            try {
+                emitter.send(SseEmitter.event().name(event).data(data, MediaType.APPLICATION_JSON));
+                if ("summary".equals(event)) {
+                    emitter.complete();
+                }
+            } catch (IOException e) {
+                emitter.completeWithError(e); // Client went away
+                abandon.run();
+            }
+        }));
+        if (gone.get()) {
+            batchService.cancel(batchRef.get());
+        }
+        return emitter;
+    }
+
+    private static String initialInput(UploadHandle upload) {
+        return "Process BRD file: " + upload.describe();
+    }
+}
+```
+
+### controller/UploadSizeAdvice.java
+```java
+package com.example.brdmultiagent.controller;
+
+import org.springframework.http.HttpStatus;
+import org.springframework.http.ResponseEntity;
+import org.springframework.web.bind.annotation.ExceptionHandler;
+import org.springframework.web.bind.annotation.RestControllerAdvice;
+import org.springframework.web.multipart.MaxUploadSizeExceededException;
+
+// Container-level cap (spring.servlet.multipart.max-file-size) trips in DispatcherServlet.checkMultipart, before a
+// handler is chosen, so only an advice (not a controller-local @ExceptionHandler) sees it
+@RestControllerAdvice
+public class UploadSizeAdvice {
+
+    @ExceptionHandler(MaxUploadSizeExceededException.class)
+    public ResponseEntity<String> uploadTooLarge(MaxUploadSizeExceededException e) {
+        return ResponseEntity.status(HttpStatus.PAYLOAD_TOO_LARGE).body("Error: " + e.getMessage());
+    }
+}
+```
+
+### controller/JobController.java
+```java
+package com.example.brdmultiagent.controller;
+
+import com.example.brdmultiagent.job.BrdJob;
+import com.example.brdmultiagent.job.BrdJobService;
+import com.example.brdmultiagent.trace.RunTracer;
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.http.HttpStatus;
+import org.springframework.http.ResponseEntity;
+import org.springframework.web.bind.annotation.*;
+
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.RejectedExecutionException;
+
+@RestController
+@RequestMapping("/jobs")
+public class JobController {
+
+    @Autowired
+    private BrdJobService jobService;
+
+    @Autowired
+    private RunTracer runTracer;
+
+    @GetMapping("/{id}")
+    public ResponseEntity<Map<String, Object>> status(@PathVariable String id) {
+        return jobService.find(id)
+                .map(job -> ResponseEntity.ok(job.toStatus()))
+                .orElse(ResponseEntity.notFound().build());
+    }
+
+    @GetMapping("/{id}/result")
+    public ResponseEntity<String> result(@PathVariable String id) {
+        BrdJob job = jobService.find(id).orElse(null);
+        if (job == null) {
+            return ResponseEntity.notFound().build();
+        }
+        return switch (job.getStatus()) {
+            case SUCCEEDED -> ResponseEntity.ok(job.getResult());
+            case FAILED -> ResponseEntity.internalServerError().body("Error: " + job.getError());
+            case CANCELLED -> ResponseEntity.status(HttpStatus.GONE).body("Job cancelled");
+            default -> ResponseEntity.status(HttpStatus.ACCEPTED).body(job.getStatus().name());
+        };
+    }
+
+    // Where the run's time went: per node / LLM caller / tool totals, plus every span
+    @GetMapping("/{id}/trace")
+    public ResponseEntity<Map<String, Object>> trace(@PathVariable String id) {
+        BrdJob job = jobService.find(id).orElse(null);
+        if (job == null || job.getTrace() == null) {
+            return ResponseEntity.notFound().build();
+        }
+        return ResponseEntity.ok(job.getTrace().toView(true));
+    }
+
+    // Slowest recent runs (jobs and synchronous uploads) with their top offenders
+    @GetMapping("/slow-runs")
+    public List<Map<String, Object>> slowRuns(@RequestParam(defaultValue = "10") int limit) {
+        return runTracer.slowRuns(limit);
+    }
+
+    // Continue a failed, cancelled or interrupted (e.g. JVM restart) run from its last checkpoint
+    @PostMapping("/{id}/resume")
+    public ResponseEntity<Map<String, Object>> resume(@PathVariable String id) {
+        try {
+            return jobService.resume(id)
+                    .map(job -> ResponseEntity.accepted().body(job.toStatus()))
+                    .orElse(ResponseEntity.notFound().build());
+        } catch (IllegalArgumentException e) {
+            return ResponseEntity.badRequest().body(Map.of("error", e.getMessage()));
+        } catch (IllegalStateException e) {
+            return ResponseEntity.status(HttpStatus.CONFLICT).body(Map.of("error", e.getMessage()));
+        } catch (RejectedExecutionException e) {
+            return ResponseEntity.status(HttpStatus.TOO_MANY_REQUESTS).body(Map.of("error", "Job queue is full"));
+        }
+    }
+
+    @DeleteMapping("/{id}")
+    public ResponseEntity<Map<String, Object>> cancel(@PathVariable String id) {
+        return jobService.find(id)
+                .map(job -> {
+                    jobService.cancel(job);
+                    return ResponseEntity.ok(job.toStatus());
+                })
+                .orElse(ResponseEntity.notFound().build());
+    }
+
+    // Pool sizing view; the same numbers are published as brd.jobs.* Micrometer metrics
+    @GetMapping("/stats")
+    public Map<String, Object> stats() {
+        return jobService.stats();
+    }
+}
+```
+
+### mcp/McpServer.java
+```java
+package com.example.brdmultiagent.mcp;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import com.fasterxml.jackson.databind.node.ArrayNode;
+import com.fasterxml.jackson.databind.node.NullNode;
+import com.fasterxml.jackson.databind.node.ObjectNode;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import jakarta.annotation.PreDestroy;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.ai.model.function.FunctionCallback;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.util.ArrayList;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.atomic.AtomicInteger;
+
+// MCP over JSON-RPC 2.0 (initialize, ping, tools/list, tools/call) for the application's FunctionCallback tools.
+// Transport-free: McpController hands it HTTP bodies, McpClients' in-process transport hands it request trees
+// directly, and both get the same responses and errors.
+@Component
+public class McpServer {
+    private static final Logger logger = LoggerFactory.getLogger(McpServer.class);
+    static final ObjectMapper objectMapper = new ObjectMapper();
+
+    public static final String PROTOCOL_VERSION = "2024-11-05";
+    public static final int PARSE_ERROR = -32700;
+    public static final int INVALID_REQUEST = -32600;
+    public static final int METHOD_NOT_FOUND = -32601;
+    public static final int INVALID_PARAMS = -32602;
+    public static final int INTERNAL_ERROR = -32603;
+    private static final Set<String> METHODS = Set.of("initialize", "notifications/initialized", "ping",
+            "tools/list", "tools/call");
+    // Batch entries run in parallel on the batch pool; a batch sent from inside one of them runs inline
+    private static final ThreadLocal<Boolean> IN_BATCH = ThreadLocal.withInitial(() -> false);
+
+    private final Map<String, FunctionCallback> tools = new LinkedHashMap<>();
+    private final Set<String> uploadOnlyTools;
+    private final ObjectNode initializeResult;
+    private final ObjectNode toolsListResult; // Built once; shared by every response, never mutated
+    private final MeterRegistry meterRegistry;
+    private final int maxBatch;
+    private final ExecutorService batchExecutor;
+
+    // Only allow-listed tools are exposed: the Jenkins and microservice tools have side effects, and file tools
+    // must not read server paths for a remote caller
+    public McpServer(List<FunctionCallback> callbacks,
+                     MeterRegistry meterRegistry,
+                     @Value("${brd.mcp.tools:documentExtractorTool,documentAnalysisTool,openAIAnalysisTool,jsonGeneratorTool}") Set<String> exposedTools,
+                     @Value("${brd.mcp.upload-only-tools:documentExtractorTool,documentAnalysisTool}") Set<String> uploadOnlyTools,
+                     @Value("${brd.mcp.max-batch:100}") int maxBatch,
+                     @Value("${brd.mcp.batch-concurrency:8}") int batchConcurrency) {
+        this.meterRegistry = meterRegistry;
+        this.maxBatch = maxBatch;
+        this.uploadOnlyTools = uploadOnlyTools;
+        callbacks.stream()
+                .filter(tool -> exposedTools.contains(tool.getName()))
+                .forEach(tool -> tools.put(tool.getName(), tool));
+
+        ObjectNode inputSchema = objectMapper.createObjectNode().put("type", "object");
+        inputSchema.putObject("properties").putObject("input").put("type", "string")
+                .put("description", "Tool input: file reference, document text, scenario or JSON");
+        inputSchema.putArray("required").add("input");
+        this.toolsListResult = objectMapper.createObjectNode();
+        ArrayNode list = toolsListResult.putArray("tools");
+        for (FunctionCallback tool : tools.values()) {
+            list.addObject().put("name", tool.getName()).put("description", tool.getDescription())
+                    .set("inputSchema", inputSchema);
+        }
+
+        this.initializeResult = objectMapper.createObjectNode().put("protocolVersion", PROTOCOL_VERSION);
+        initializeResult.putObject("capabilities").putObject("tools").put("listChanged", false);
+        initializeResult.putObject("serverInfo").put("name", "brd-multiagent-orchestrator").put("version", "1.0.0");
+
+        AtomicInteger threadCount = new AtomicInteger();
+        this.batchExecutor = Executors.newFixedThreadPool(batchConcurrency, r -> new Thread(() -> {
+            IN_BATCH.set(true);
+            r.run();
+        }, "brd-mcp-batch-" + threadCount.incrementAndGet()));
+    }
+
+    // A request, notification or batch; null when there is nothing to send back (notifications only)
+    public JsonNode handle(JsonNode message) {
+        return message.isArray() ? handleBatch((ArrayNode) message) : handleOne(message);
+    }
+
+    private JsonNode handleBatch(ArrayNode batch) {
+        if (batch.isEmpty()) {
+            return error(NullNode.instance, INVALID_REQUEST, "Empty batch");
+        }
+        if (batch.size() > maxBatch) {
+            return error(NullNode.instance, INVALID_REQUEST, "Batch of " + batch.size() + " exceeds " + maxBatch);
+        }
+        meterRegistry.summary("brd.mcp.batch.size").record(batch.size());
+
+        List<CompletableFuture<JsonNode>> futures = new ArrayList<>(batch.size());
+        for (JsonNode entry : batch) {
+            futures.add(IN_BATCH.get() ? CompletableFuture.completedFuture(handleOne(entry))
+                    : CompletableFuture.supplyAsync(() -> handleOne(entry), batchExecutor));
+        }
+        // Responses in request order (the spec allows any order; in order is easier on clients)
+        ArrayNode responses = objectMapper.createArrayNode();
+        for (CompletableFuture<JsonNode> future : futures) {
+            JsonNode response = future.join();
+            if (response != null) {
+                responses.add(response);
+            }
+        }
+        return responses.isEmpty() ? null : responses;
+    }
+
+    private JsonNode handleOne(JsonNode request) {
+        JsonNode id = request.get("id"); // Absent = notification, answered with nothing
+        if (!request.isObject() || !"2.0".equals(request.path("jsonrpc").asText())
+                || !request.path("method").isTextual()) {
+            return error(id == null ? NullNode.instance : id, INVALID_REQUEST, "Not a JSON-RPC 2.0 request");
+        }
+        String method = request.get("method").asText();
+        Timer.Sample sample = Timer.start(meterRegistry);
+        String outcome = "ok";
+        try {
+            JsonNode result = switch (method) {
+                case "initialize" -> initializeResult;
+                case "notifications/initialized" -> null;
+                case "ping" -> objectMapper.createObjectNode();
+                case "tools/list" -> toolsListResult;
+                case "tools/call" -> callTool(request.path("params"));
+                default -> throw new McpException(METHOD_NOT_FOUND, "Method not found: " + method);
+            };
+            if (id == null) {
+                return null;
+            }
+            ObjectNode response = objectMapper.createObjectNode().put("jsonrpc", "2.0");
+            response.set("id", id);
+            response.set("result", result == null ? objectMapper.createObjectNode() : result);
+            return response;
+        } catch (McpException e) {
+            outcome = "error";
+            return id == null ? null : error(id, e.getCode(), e.getMessage());
+        } catch (RuntimeException e) {
+            outcome = "error";
+            logger.warn("MCP {} failed", method, e);
+            return id == null ? null : error(id, INTERNAL_ERROR, e.getMessage());
+        } finally {
+            sample.stop(meterRegistry.timer("brd.mcp.requests",
+                    "method", METHODS.contains(method) ? method : "other", "outcome", outcome));
+        }
+    }
+
+    // Tool failures are results with isError, not protocol errors, so the calling agent can read them
+    private ObjectNode callTool(JsonNode params) {
+        String name = params.path("name").asText(null);
+        FunctionCallback tool = name == null ? null : tools.get(name);
+        if (tool == null) {
+            throw new McpException(INVALID_PARAMS, "Unknown tool: " + name);
+        }
+        JsonNode input = params.path("arguments").get("input");
+        if (input == null || !input.isTextual()) {
+            throw new McpException(INVALID_PARAMS, "arguments.input (string) is required");
+        }
+        if (uploadOnlyTools.contains(name) && !input.asText().strip().startsWith("upload://")) {
+            throw new McpException(INVALID_PARAMS, name + " only accepts upload:// references");
+        }
+        ObjectNode result = objectMapper.createObjectNode();
+        ObjectNode content = result.putArray("content").addObject().put("type", "text");
+        try {
+            String output = tool.call(input.toString()); // The tools take a JSON string argument
+            content.put("text", output.startsWith("\"") ? objectMapper.readValue(output, String.class) : output);
+            result.put("isError", false);
+        } catch (Exception e) {
+            content.put("text", e.getClass().getSimpleName() + ": " + e.getMessage());
+            result.put("isError", true);
+        }
+        return result;
+    }
+
+    public static ObjectNode error(JsonNode id, int code, String message) {
+        ObjectNode response = objectMapper.createObjectNode().put("jsonrpc", "2.0");
+        response.set("id", id);
+        response.putObject("error").put("code", code).put("message", message);
+        return response;
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        batchExecutor.shutdownNow();
+    }
+}
+```
+
+### mcp/McpClient.java
+```java
+package com.example.brdmultiagent.mcp;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.node.ArrayNode;
+import com.fasterxml.jackson.databind.node.ObjectNode;
+
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.CompletionException;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.function.Function;
+
+import static com.example.brdmultiagent.mcp.McpServer.objectMapper;
+
+// JSON-RPC client for /mcp; get one from McpClients. The transport takes a request (or batch) tree and
+// completes with the response tree, or null for notifications. Thread-safe; share one per target.
+public class McpClient {
+
+    public record ToolCall(String name, String input) {
+    }
+
+    public record ToolResult(String text, boolean isError) {
+    }
+
+    private final Function<JsonNode, CompletableFuture<JsonNode>> transport;
+    private final AtomicLong ids = new AtomicLong();
+
+    McpClient(Function<JsonNode, CompletableFuture<JsonNode>> transport) {
+        this.transport = transport;
+    }
+
+    public JsonNode initialize() {
+        ObjectNode params = objectMapper.createObjectNode().put("protocolVersion", McpServer.PROTOCOL_VERSION);
+        params.putObject("capabilities");
+        params.putObject("clientInfo").put("name", "brd-mcp-client").put("version", "1.0.0");
+        JsonNode result = join(send(request("initialize", params)));
+        transport.apply(objectMapper.createObjectNode().put("jsonrpc", "2.0").put("method", "notifications/initialized"));
+        return result;
+    }
+
+    public List<String> listTools() {
+        List<String> names = new ArrayList<>();
+        join(send(request("tools/list", objectMapper.createObjectNode()))).path("tools")
+                .forEach(tool -> names.add(tool.path("name").asText()));
+        return names;
+    }
+
+    public ToolResult callTool(String name, String input) {
+        return join(callToolAsync(name, input));
+    }
+
+    public CompletableFuture<ToolResult> callToolAsync(String name, String input) {
+        return send(toolCall(name, input)).thenApply(McpClient::toolResult);
+    }
+
+    // Independent calls in one round trip (one JSON-RPC batch); results in call order. A call the server
+    // rejected comes back as an error result rather than failing the others.
+    public List<ToolResult> callTools(List<ToolCall> calls) {
+        ArrayNode batch = objectMapper.createArrayNode();
+        calls.forEach(call -> batch.add(toolCall(call.name(), call.input())));
+        JsonNode responses = join(transport.apply(batch));
+        if (responses == null || !responses.isArray()) {
+            throw new McpException(McpServer.INVALID_REQUEST, "Batch rejected: " + responses);
+        }
+        Map<Long, JsonNode> byId = new HashMap<>();
+        responses.forEach(response -> byId.put(response.path("id").asLong(), response));
+        List<ToolResult> results = new ArrayList<>(calls.size());
+        for (JsonNode request : batch) {
+            JsonNode response = byId.get(request.get("id").asLong());
+            if (response == null) {
+                results.add(new ToolResult("No response", true));
+            } else if (response.has("error")) {
+                results.add(new ToolResult(response.path("error").path("message").asText(), true));
+            } else {
+                results.add(toolResult(response.get("result")));
+            }
+        }
+        return results;
+    }
+
+    private ObjectNode toolCall(String name, String input) {
+        ObjectNode params = objectMapper.createObjectNode().put("name", name);
+        params.putObject("arguments").put("input", input);
+        return request("tools/call", params);
+    }
+
+    private ObjectNode request(String method, ObjectNode params) {
+        ObjectNode request = objectMapper.createObjectNode()
+                .put("jsonrpc", "2.0")
+                .put("id", ids.incrementAndGet())
+                .put("method", method);
+        request.set("params", params);
+        return request;
+    }
+
+    // Completes with the result, or McpException for a JSON-RPC error
+    private CompletableFuture<JsonNode> send(ObjectNode request) {
+        return transport.apply(request).thenApply(response -> {
+            if (response == null) {
+                throw new McpException(McpServer.INTERNAL_ERROR, "No response to " + request.get("method").asText());
+            }
+            JsonNode error = response.get("error");
+            if (error != null) {
+                throw new McpException(error.path("code").asInt(), error.path("message").asText());
+            }
+            return response.get("result");
+        });
+    }
+
+    private static ToolResult toolResult(JsonNode result) {
+        return new ToolResult(result.path("content").path(0).path("text").asText(), result.path("isError").asBoolean());
+    }
+
+    private static <T> T join(CompletableFuture<T> future) {
+        try {
+            return future.join();
+        } catch (CompletionException e) {
+            throw e.getCause() instanceof RuntimeException cause ? cause : e;
+        }
+    }
+}
+```
+
+### mcp/McpClients.java
+```java
+package com.example.brdmultiagent.mcp;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.boot.web.context.WebServerInitializedEvent;
+import org.springframework.context.event.EventListener;
+import org.springframework.stereotype.Component;
+
+import java.io.IOException;
+import java.io.UncheckedIOException;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.time.Duration;
+import java.util.Set;
+import java.util.concurrent.CompletableFuture;
+
+import static com.example.brdmultiagent.mcp.McpServer.objectMapper;
+
+// Hands out McpClients. A URL that points at this application's own /mcp endpoint gets the in-process
+// transport: the request tree goes straight to McpServer on the calling thread, with no serialization and
+// no loopback HTTP, and the response is deep-copied so callers see exactly what they would over HTTP.
+// Every other URL shares one JDK HttpClient: keep-alive connection pool, HTTP/2 multiplexing where the
+// server offers it (the JDK client does not pipeline HTTP/1.1; use callTools batches instead).
+@Component
+public class McpClients {
+    private static final Set<String> LOOPBACK = Set.of("localhost", "127.0.0.1", "[::1]", "::1");
+
+    private final McpServer server;
+    private final boolean inProcess;
+    private final Set<String> selfUrls;
+    private final Duration requestTimeout;
+    private final String token; // Sent only to this instance's own /mcp
+    private final HttpClient httpClient;
+    private final Counter localCalls;
+    private final Counter httpCalls;
+    private volatile int localPort = -1;
+
+    public McpClients(McpServer server,
+                      MeterRegistry meterRegistry,
+                      @Value("${brd.mcp.in-process:true}") boolean inProcess,
+                      @Value("${brd.mcp.self-urls:}") Set<String> selfUrls,
+                      @Value("${brd.mcp.token:}") String token,
+                      @Value("${brd.mcp.client.connect-timeout-ms:2000}") long connectTimeoutMs,
+                      @Value("${brd.mcp.client.request-timeout-ms:60000}") long requestTimeoutMs) {
+        this.server = server;
+        this.inProcess = inProcess;
+        this.selfUrls = selfUrls;
+        this.token = token;
+        this.requestTimeout = Duration.ofMillis(requestTimeoutMs);
+        this.httpClient = HttpClient.newBuilder()
+                .version(HttpClient.Version.HTTP_2) // Falls back to HTTP/1.1 keep-alive when not offered
+                .connectTimeout(Duration.ofMillis(connectTimeoutMs))
+                .build();
+        this.localCalls = meterRegistry.counter("brd.mcp.client.messages", "transport", "in_process");
+        this.httpCalls = meterRegistry.counter("brd.mcp.client.messages", "transport", "http");
+    }
+
+    @EventListener
+    public void onWebServerInitialized(WebServerInitializedEvent event) {
+        localPort = event.getWebServer().getPort();
+    }
+
+    // In-process for this application's own /mcp (brd.mcp.in-process), HTTP otherwise
+    public McpClient connect(String url) {
+        URI uri = URI.create(url);
+        return inProcess && isSelf(uri) ? local() : http(uri);
+    }
+
+    public McpClient local() {
+        return new McpClient(message -> {
+            localCalls.increment();
+            JsonNode response = server.handle(message);
+            return CompletableFuture.completedFuture(response == null ? null : response.deepCopy());
+        });
+    }
+
+    public McpClient http(URI uri) {
+        boolean self = !token.isBlank() && isSelf(uri);
+        return new McpClient(message -> {
+            httpCalls.increment();
+            HttpRequest request;
+            try {
+                HttpRequest.Builder builder = HttpRequest.newBuilder(uri)
+                        .timeout(requestTimeout)
+                        .header("Content-Type", "application/json")
+                        .header("Accept", "application/json")
+                        .POST(HttpRequest.BodyPublishers.ofByteArray(objectMapper.writeValueAsBytes(message)));
+                if (self) {
+                    builder.header("Authorization", "Bearer " + token);
+                }
+                request = builder.build();
+            } catch (IOException e) {
+                return CompletableFuture.failedFuture(e);
+            }
+            return httpClient.sendAsync(request, HttpResponse.BodyHandlers.ofByteArray()).thenApply(response -> {
+                if (response.statusCode() == 202 || response.statusCode() == 204) {
+                    return null; // Notifications only
+                }
+                if (response.statusCode() != 200) {
+                    throw new McpException(McpServer.INTERNAL_ERROR, uri + " returned HTTP " + response.statusCode());
+                }
+                try {
+                    return objectMapper.readTree(response.body());
+                } catch (IOException e) {
+                    throw new UncheckedIOException(e);
+                }
+            });
+        });
+    }
+
+    private boolean isSelf(URI uri) {
+        if (selfUrls.contains(uri.toString())) {
+            return true;
+        }
+        return uri.getHost() != null && LOOPBACK.contains(uri.getHost()) && uri.getPort() == localPort
+                && "/mcp".equals(uri.getPath());
+    }
+}
+```
+
+### mcp/McpException.java
+```java
+package com.example.brdmultiagent.mcp;
+
+// A JSON-RPC error: thrown by McpServer handlers and rethrown by McpClient from error responses
+public class McpException extends RuntimeException {
+    private final int code;
+
+    public McpException(int code, String message) {
+        super(message);
+        this.code = code;
+    }
+
+    public int getCode() {
+        return code;
+    }
+}
+```
+
+### controller/McpController.java
+```java
+package com.example.brdmultiagent.controller;
+
+import com.example.brdmultiagent.mcp.McpServer;
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import com.fasterxml.jackson.databind.node.NullNode;
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.http.HttpHeaders;
+import org.springframework.http.HttpStatus;
+import org.springframework.http.MediaType;
+import org.springframework.http.ResponseEntity;
+import org.springframework.web.bind.annotation.PostMapping;
+import org.springframework.web.bind.annotation.RequestBody;
+import org.springframework.web.bind.annotation.RequestHeader;
+import org.springframework.web.bind.annotation.RestController;
+
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.security.MessageDigest;
+
+@RestController
+public class McpController {
+    private static final ObjectMapper objectMapper = new ObjectMapper();
+
+    @Autowired
+    private McpServer mcpServer;
+
+    @Value("${brd.mcp.token:}")
+    private String token;
+
+    // One JSON-RPC request or a batch; input with only notifications gets 202 and no body.
+    // Requires "Authorization: Bearer <brd.mcp.token>"; without a configured token every request is refused.
+    @PostMapping(value = "/mcp", consumes = MediaType.APPLICATION_JSON_VALUE, produces = MediaType.APPLICATION_JSON_VALUE)
+    public ResponseEntity<JsonNode> handle(@RequestHeader(value = HttpHeaders.AUTHORIZATION, required = false) String authorization,
+                                           @RequestBody byte[] body) {
+        if (!authorized(authorization)) {
+            return ResponseEntity.status(HttpStatus.UNAUTHORIZED).build();
+        }
+        JsonNode message;
+        try {
+            message = objectMapper.readTree(body);
+        } catch (IOException e) {
+            message = null;
+        }
+        if (message == null || message.isMissingNode()) {
+            return ResponseEntity.ok(McpServer.error(NullNode.instance, McpServer.PARSE_ERROR, "Parse error"));
+        }
+        JsonNode response = mcpServer.handle(message);
+        return response == null ? ResponseEntity.accepted().build() : ResponseEntity.ok(response);
+    }
+
+    private boolean authorized(String authorization) {
+        if (token.isBlank() || authorization == null) {
+            return false;
+        }
+        return MessageDigest.isEqual(("Bearer " + token).getBytes(StandardCharsets.UTF_8),
+                authorization.getBytes(StandardCharsets.UTF_8)); // Constant time
+    }
+}
+```
+
+### llm/LlmCallContext.java
+```java
+package com.example.brdmultiagent.llm;
+
+import com.example.brdmultiagent.graph.GraphEventListener;
+
+import java.util.function.Supplier;
+
+// Tags model calls made on this thread with the calling agent/tool (per-agent cache policy, scheduler
+// priority), the workflow run (scheduler fair share) and, for streaming runs, the run's event listener
+// (progress from tools the model calls)
+public final class LlmCallContext {
+    private static final ThreadLocal<String> CALLER = new ThreadLocal<>();
+    private static final ThreadLocal<String> RUN = new ThreadLocal<>();
+    private static final ThreadLocal<GraphEventListener> LISTENER = new ThreadLocal<>();
+
+    private LlmCallContext() {
+    }
+
+    public static <T> T callAs(String caller, Supplier<T> call) {
+        return with(CALLER, caller, call);
+    }
+
+    // Worker pools that call the model for a run (e.g. map-reduce analysis) must re-apply the run here
+    public static <T> T runAs(String run, Supplier<T> call) {
+        return with(RUN, run, call);
+    }
+
+    public static <T> T listenAs(GraphEventListener listener, Supplier<T> call) {
+        return with(LISTENER, listener, call);
+    }
+
+    public static String currentCaller() {
+        return CALLER.get();
+    }
+
+    // Null outside streaming runs, and in tool calls the provider runs off the calling thread
+    public static GraphEventListener currentListener() {
+        return LISTENER.get();
+    }
+
+    public static String currentRun() {
+        return RUN.get();
+    }
+
+    private static <V, T> T with(ThreadLocal<V> slot, V value, Supplier<T> call) {
+        V previous = slot.get();
+        slot.set(value);
+        try {
+            return call.get();
+        } finally {
+            if (previous == null) {
+                slot.remove();
+            } else {
+                slot.set(previous);
+            }
+        }
+    }
+}
+```
+
+### llm/CachingChatModel.java
+```java
+package com.example.brdmultiagent.llm;
+
+import com.fasterxml.jackson.databind.ObjectMapper;
+import com.fasterxml.jackson.databind.SerializationFeature;
+import org.springframework.ai.chat.messages.AssistantMessage;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.messages.MessageType;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.model.ChatResponse;
+import org.springframework.ai.chat.model.Generation;
+import org.springframework.ai.chat.prompt.ChatOptions;
+import org.springframework.ai.chat.prompt.Prompt;
+import reactor.core.publisher.Flux;
+
+import java.nio.charset.StandardCharsets;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.HexFormat;
+import java.util.List;
+import java.util.Set;
+import java.util.function.UnaryOperator;
+
+// Sits in front of the real ChatModel; every ChatClient and OpenAIAnalysisTool call goes through it
+public class CachingChatModel implements ChatModel {
+    private static final ObjectMapper OPTIONS_MAPPER = new ObjectMapper()
+            .disable(SerializationFeature.FAIL_ON_EMPTY_BEANS);
+
+    private final ChatModel delegate;
+    private final LlmResponseCache cache;
+    private final Set<String> disabledCallers;
+    private final UnaryOperator<String> normalizer; // Rewrites per-request details (upload ids) before keying
+
+    public CachingChatModel(ChatModel delegate, LlmResponseCache cache, Set<String> disabledCallers,
+                            UnaryOperator<String> normalizer) {
+        this.delegate = delegate;
+        this.cache = cache;
+        this.disabledCallers = disabledCallers;
+        this.normalizer = normalizer;
+    }
+
+    @Override
+    public ChatResponse call(Prompt prompt) {
+        if (bypass()) {
+            return delegate.call(prompt);
+        }
+        CacheKey key = keyFor(prompt);
+        LlmResponseCache.Lookup lookup = cache.lookup(key.exact(), key.scope(), key.semanticText());
+        if (lookup.hit() != null) {
+            return toResponse(lookup.hit());
+        }
+        ChatResponse response = delegate.call(prompt);
+        cache.store(key.exact(), key.scope(), lookup.embedding(), response.getResult().getOutput().getContent());
+        return response;
+    }
+
+    @Override
+    public Flux<ChatResponse> stream(Prompt prompt) {
+        if (bypass()) {
+            return delegate.stream(prompt);
+        }
+        CacheKey key = keyFor(prompt);
+        LlmResponseCache.Lookup lookup = cache.lookup(key.exact(), key.scope(), key.semanticText());
+        if (lookup.hit() != null) {
+            return Flux.just(toResponse(lookup.hit())); // One chunk: the whole cached answer
+        }
+        StringBuilder full = new StringBuilder();
+        return delegate.stream(prompt)
+                .doOnNext(chunk -> {
+                    if (chunk.getResult() != null && chunk.getResult().getOutput().getContent() != null) {
+                        full.append(chunk.getResult().getOutput().getContent());
+                    }
+                })
+                .doOnComplete(() -> cache.store(key.exact(), key.scope(), lookup.embedding(), full.toString()));
+    }
+
+    @Override
+    public ChatOptions getDefaultOptions() {
+        return delegate.getDefaultOptions();
+    }
+
+    // Callers listed in brd.llm-cache.disabled-agents (side-effecting tool loops) always hit the model
+    private boolean bypass() {
+        String caller = LlmCallContext.currentCaller();
+        if (caller != null && disabledCallers.contains(caller)) {
+            cache.recordBypass();
+            return true;
+        }
+        return false;
+    }
+
+    private record CacheKey(String exact, String scope, String semanticText) {
+    }
+
+    // exact = (model, options, every message); scope = (model, options, system prompt) for the semantic tier.
+    // The configured default options (model name, temperature) are part of the key, since prompt options are
+    // often null; upload:// references are normalized to the document's content hash, so a re-upload of the
+    // same BRD can hit.
+    private CacheKey keyFor(Prompt prompt) {
+        String modelAndOptions = delegate.getClass().getName() + "|" + describe(delegate.getDefaultOptions())
+                + "|" + describe(prompt.getOptions());
+        StringBuilder system = new StringBuilder(modelAndOptions);
+        StringBuilder all = new StringBuilder(modelAndOptions);
+        StringBuilder conversation = new StringBuilder();
+        for (Message message : prompt.getInstructions()) {
+            String content = message.getContent() == null ? null : normalizer.apply(message.getContent());
+            all.append('\u0000').append(message.getMessageType()).append(':').append(content);
+            if (message.getMessageType() == MessageType.SYSTEM) {
+                system.append('\u0000').append(content);
+            } else {
+                conversation.append(content).append('\n');
+            }
+        }
+        return new CacheKey(sha256(all.toString()), sha256(system.toString()), conversation.toString());
+    }
+
+    private static String describe(ChatOptions options) {
+        if (options == null) {
+            return "";
+        }
+        try {
+            return OPTIONS_MAPPER.writeValueAsString(options);
+        } catch (Exception e) {
+            return options.toString(); // Options holding function callbacks may not serialize
+        }
+    }
+
+    private static ChatResponse toResponse(String content) {
+        return new ChatResponse(List.of(new Generation(new AssistantMessage(content))));
+    }
+
+    static String sha256(String value) {
+        try {
+            byte[] hash = MessageDigest.getInstance("SHA-256").digest(value.getBytes(StandardCharsets.UTF_8));
+            return HexFormat.of().formatHex(hash);
+        } catch (NoSuchAlgorithmException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+}
+```
+
+### llm/LlmResponseCache.java
+```java
+package com.example.brdmultiagent.llm;
+
+import com.fasterxml.jackson.databind.ObjectMapper;
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.MeterRegistry;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.ai.embedding.EmbeddingModel;
+
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.time.Duration;
+import java.util.ArrayList;
+import java.util.Comparator;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.stream.Stream;
+
+public class LlmResponseCache {
+    private static final Logger logger = LoggerFactory.getLogger(LlmResponseCache.class);
+    private static final ObjectMapper objectMapper = new ObjectMapper();
+    private static final int MAX_EMBED_CHARS = 8000;
+
+    public record Entry(String key, String scope, long createdAt, float[] embedding, String response) {
+    }
+
+    // hit == null means miss; the embedding is handed back so store() does not compute it twice
+    public record Lookup(String hit, float[] embedding) {
+    }
+
+    private final Path dir; // null = memory only
+    private final int maxEntries;
+    private final Duration ttl;
+    private final EmbeddingModel embeddingModel; // null = exact tier only
+    private final double threshold;
+    private final LinkedHashMap<String, Entry> entries = new LinkedHashMap<>(256, 0.75f, true);
+
+    private final Counter exactHits;
+    private final Counter semanticHits;
+    private final Counter misses;
+    private final Counter evictions;
+    private final Counter bypasses;
+
+    public LlmResponseCache(Path dir, int maxEntries, Duration ttl, EmbeddingModel embeddingModel,
+                            double threshold, MeterRegistry meterRegistry) throws IOException {
+        this.dir = dir;
+        this.maxEntries = maxEntries;
+        this.ttl = ttl;
+        this.embeddingModel = embeddingModel;
+        this.threshold = threshold;
+        this.exactHits = meterRegistry.counter("brd.llm.cache.hits", "tier", "exact");
+        this.semanticHits = meterRegistry.counter("brd.llm.cache.hits", "tier", "semantic");
+        this.misses = meterRegistry.counter("brd.llm.cache.misses");
+        this.evictions = meterRegistry.counter("brd.llm.cache.evictions");
+        this.bypasses = meterRegistry.counter("brd.llm.cache.bypass");
+        meterRegistry.gauge("brd.llm.cache.entries", entries, Map::size);
+        if (dir != null) {
+            Files.createDirectories(dir);
+            load();
+        }
+    }
+
+    public Lookup lookup(String key, String scope, String semanticText) {
+        synchronized (this) {
+            Entry entry = entries.get(key);
+            if (entry != null && !expired(entry)) {
+                exactHits.increment();
+                return new Lookup(entry.response(), entry.embedding());
+            }
+        }
+        if (embeddingModel == null) {
+            misses.increment();
+            return new Lookup(null, null);
+        }
+
+        float[] embedding = embed(semanticText);
+        Entry best = null;
+        double bestScore = threshold;
+        synchronized (this) {
+            // Linear scan is fine at the configured max-entries; only entries with the same system prompt compete
+            for (Entry candidate : entries.values()) {
+                if (candidate.embedding() == null || !candidate.scope().equals(scope) || expired(candidate)) {
+                    continue;
+                }
+                double score = cosine(embedding, candidate.embedding());
+                if (score >= bestScore) {
+                    bestScore = score;
+                    best = candidate;
+                }
+            }
+        }
+        if (best != null) {
+            semanticHits.increment();
+            return new Lookup(best.response(), embedding);
+        }
+        misses.increment();
+        return new Lookup(null, embedding);
+    }
+
+    public void store(String key, String scope, float[] embedding, String response) {
+        if (response == null || response.isEmpty()) {
+            return;
+        }
+        Entry entry = new Entry(key, scope, System.currentTimeMillis(), embedding, response);
+        synchronized (this) {
+            entries.put(key, entry);
+            Iterator<Entry> eldest = entries.values().iterator();
+            while (entries.size() > maxEntries && eldest.hasNext()) {
+                Entry evicted = eldest.next();
+                eldest.remove();
+                evictions.increment();
+                deleteFile(evicted.key());
+            }
+        }
+        writeFile(entry);
+        synchronized (this) {
+            // Evicted by a concurrent store while the file was being written: its delete ran before the write
+            if (!entries.containsKey(key)) {
+                deleteFile(key);
+            }
+        }
+    }
+
+    public void recordBypass() {
+        bypasses.increment();
+    }
+
+    private boolean expired(Entry entry) {
+        return System.currentTimeMillis() - entry.createdAt() > ttl.toMillis();
+    }
+
+    private float[] embed(String text) {
+        List<Double> vector = embeddingModel.embed(text.length() > MAX_EMBED_CHARS ? text.substring(0, MAX_EMBED_CHARS) : text);
+        float[] embedding = new float[vector.size()];
+        for (int i = 0; i < embedding.length; i++) {
+            embedding[i] = vector.get(i).floatValue();
+        }
+        return embedding;
+    }
+
+    private static double cosine(float[] a, float[] b) {
+        if (a.length != b.length) {
+            return -1;
+        }
+        double dot = 0, normA = 0, normB = 0;
+        for (int i = 0; i < a.length; i++) {
+            dot += a[i] * b[i];
+            normA += a[i] * a[i];
+            normB += b[i] * b[i];
+        }
+        return dot / (Math.sqrt(normA) * Math.sqrt(normB) + 1e-12);
+    }
+
+    // Newest files first, and only until max-entries are loaded; everything older, expired or unreadable is deleted,
+    // as are temp files left by a crash mid-write. Entries are then inserted oldest first, so the LRU order after a
+    // restart approximates insertion order.
+    private void load() throws IOException {
+        List<Path> files;
+        try (Stream<Path> listing = Files.list(dir)) {
+            files = listing.filter(f -> f.toString().endsWith(".json") || f.toString().endsWith(".tmp"))
+                    .sorted(Comparator.comparingLong(LlmResponseCache::modifiedAt).reversed())
+                    .toList();
+        }
+        List<Entry> loaded = new ArrayList<>();
+        int deleted = 0;
+        for (Path file : files) {
+            Entry entry = loaded.size() < maxEntries && file.toString().endsWith(".json") ? readFile(file) : null;
+            if (entry == null || expired(entry)) {
+                deleteFile(file);
+                deleted++;
+                continue;
+            }
+            loaded.add(entry);
+        }
+        loaded.sort(Comparator.comparingLong(Entry::createdAt));
+        loaded.forEach(e -> entries.put(e.key(), e));
+        logger.info("Loaded {} LLM cache entries from {}, deleted {} stale files", entries.size(), dir, deleted);
+    }
+
+    private static long modifiedAt(Path file) {
+        try {
+            return Files.getLastModifiedTime(file).toMillis();
+        } catch (IOException e) {
+            return 0; // Gone or unreadable: sorts last and is deleted
+        }
+    }
+
+    private Entry readFile(Path file) {
+        try {
+            return objectMapper.readValue(file.toFile(), Entry.class);
+        } catch (IOException e) {
+            logger.warn("Skipping unreadable LLM cache entry {}", file);
+            return null;
+        }
+    }
+
+    private void writeFile(Entry entry) {
+        if (dir == null) {
+            return;
+        }
+        try {
+            Path tmp = Files.createTempFile(dir, entry.key(), ".tmp");
+            objectMapper.writeValue(tmp.toFile(), entry);
+            Files.move(tmp, dir.resolve(entry.key() + ".json"), StandardCopyOption.ATOMIC_MOVE,
+                    StandardCopyOption.REPLACE_EXISTING);
+        } catch (IOException e) {
+            logger.warn("Failed to persist LLM cache entry {}", entry.key(), e);
+        }
+    }
+
+    private void deleteFile(String key) {
+        if (dir != null) {
+            deleteFile(dir.resolve(key + ".json"));
+        }
+    }
+
+    private static void deleteFile(Path file) {
+        try {
+            Files.deleteIfExists(file);
+        } catch (IOException e) {
+            logger.warn("Failed to delete LLM cache file {}", file, e);
+        }
+    }
+}
+```
+
+### llm/LlmScheduler.java
+```java
+package com.example.brdmultiagent.llm;
+
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.Gauge;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import java.time.Duration;
+import java.util.ArrayDeque;
+import java.util.EnumMap;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.locks.Condition;
+import java.util.concurrent.locks.ReentrantLock;
+
+// One process-wide gate for model calls: requests/min and tokens/min buckets, a cap on calls in flight,
+// strict priority between classes and round-robin between runs inside a class. A 429 halves the
+// effective rate and pauses all dispatch; each success then adds back 5% (AIMD).
+public class LlmScheduler {
+    private static final Logger logger = LoggerFactory.getLogger(LlmScheduler.class);
+    private static final double MIN_RATE_FACTOR = 0.1;
+    private static final String NO_RUN = "-";
+
+    public enum Priority { HIGH, NORMAL, BULK }
+
+    private final TokenBucket requests;
+    private final TokenBucket tokens;
+    private final int maxConcurrent;
+    private final Set<String> highPriorityCallers;
+    private final Set<String> bulkCallers;
+    private final Duration maxBackoff;
+
+    private final ReentrantLock lock = new ReentrantLock();
+    private final Condition changed = lock.newCondition();
+    // priority -> run -> waiting tickets; a run moves to the back of its map after each grant
+    private final EnumMap<Priority, LinkedHashMap<String, ArrayDeque<Ticket>>> waiting = new EnumMap<>(Priority.class);
+    private int inFlight;
+    private int queued;
+    private double rateFactor = 1.0;
+    private long pausedUntil;
+    private int consecutiveThrottles;
+
+    private final MeterRegistry meterRegistry;
+    private final Counter throttled;
+
+    public LlmScheduler(int requestsPerMinute, int tokensPerMinute, int maxConcurrent,
+                        Set<String> highPriorityCallers, Set<String> bulkCallers, Duration maxBackoff,
+                        MeterRegistry meterRegistry) {
+        this.requests = new TokenBucket(requestsPerMinute);
+        this.tokens = new TokenBucket(tokensPerMinute);
+        this.maxConcurrent = maxConcurrent;
+        this.highPriorityCallers = highPriorityCallers;
+        this.bulkCallers = bulkCallers;
+        this.maxBackoff = maxBackoff;
+        this.meterRegistry = meterRegistry;
+        for (Priority priority : Priority.values()) {
+            waiting.put(priority, new LinkedHashMap<>());
+        }
+        this.throttled = meterRegistry.counter("brd.llm.scheduler.throttled");
+        Gauge.builder("brd.llm.scheduler.queued", this, s -> s.queued).register(meterRegistry);
+        Gauge.builder("brd.llm.scheduler.in-flight", this, s -> s.inFlight).register(meterRegistry);
+        Gauge.builder("brd.llm.scheduler.rate-factor", this, s -> s.rateFactor).register(meterRegistry);
+    }
+
+    public Priority priorityOf(String caller) {
+        if (caller != null && highPriorityCallers.contains(caller)) {
+            return Priority.HIGH;
+        }
+        if (caller != null && bulkCallers.contains(caller)) {
+            return Priority.BULK;
+        }
+        return Priority.NORMAL;
+    }
+
+    // Blocks until the call may start; the caller must finish the grant exactly once
+    public Grant acquire(String caller, String run, int estimatedTokens) {
+        Priority priority = priorityOf(caller);
+        Ticket ticket = new Ticket(run == null ? NO_RUN : run, estimatedTokens);
+        long start = System.nanoTime();
+        lock.lock();
+        try {
+            waiting.get(priority).computeIfAbsent(ticket.run, r -> new ArrayDeque<>()).add(ticket);
+            queued++;
+            while (true) {
+                long now = System.nanoTime();
+                long waitNanos = next() != ticket ? Long.MAX_VALUE : nanosUntilDispatch(ticket, now);
+                if (waitNanos <= 0) {
+                    dispatch(priority, ticket);
+                    break;
+                }
+                try {
+                    if (waitNanos == Long.MAX_VALUE) {
+                        changed.await();
+                    } else {
+                        changed.awaitNanos(waitNanos);
+                    }
+                } catch (InterruptedException e) {
+                    remove(priority, ticket);
+                    changed.signalAll();
+                    Thread.currentThread().interrupt();
+                    throw new IllegalStateException("Interrupted while waiting for an LLM slot", e);
+                }
+            }
+        } finally {
+            lock.unlock();
+        }
+        Timer.builder("brd.llm.scheduler.queue-wait")
+                .tag("priority", priority.name())
+                .register(meterRegistry)
+                .record(System.nanoTime() - start, TimeUnit.NANOSECONDS);
+        return new Grant(estimatedTokens);
+    }
+
+    // Head of the first run in the highest non-empty priority class
+    private Ticket next() {
+        for (LinkedHashMap<String, ArrayDeque<Ticket>> runs : waiting.values()) {
+            Iterator<ArrayDeque<Ticket>> it = runs.values().iterator();
+            if (it.hasNext()) {
+                return it.next().peek();
+            }
+        }
+        return null;
+    }
+
+    private long nanosUntilDispatch(Ticket ticket, long now) {
+        if (inFlight >= maxConcurrent) {
+            return Long.MAX_VALUE; // Woken by a release
+        }
+        if (now < pausedUntil) {
+            return pausedUntil - now;
+        }
+        requests.refill(now, rateFactor);
+        tokens.refill(now, rateFactor);
+        return Math.max(requests.nanosUntil(1, rateFactor), tokens.nanosUntil(ticket.estimatedTokens, rateFactor));
+    }
+
+    private void dispatch(Priority priority, Ticket ticket) {
+        remove(priority, ticket);
+        LinkedHashMap<String, ArrayDeque<Ticket>> runs = waiting.get(priority);
+        ArrayDeque<Ticket> rest = runs.remove(ticket.run);
+        if (rest != null) {
+            runs.put(ticket.run, rest); // Round-robin: this run goes behind the others in its class
+        }
+        requests.take(1);
+        tokens.take(ticket.estimatedTokens);
+        inFlight++;
+        changed.signalAll(); // A new head may be dispatchable
+    }
+
+    private void remove(Priority priority, Ticket ticket) {
+        LinkedHashMap<String, ArrayDeque<Ticket>> runs = waiting.get(priority);
+        ArrayDeque<Ticket> queue = runs.get(ticket.run);
+        if (queue != null && queue.remove(ticket)) {
+            queued--;
+            if (queue.isEmpty()) {
+                runs.remove(ticket.run);
+            }
+        }
+    }
+
+    private void finish(long tokenCorrection, boolean rateLimited) {
+        lock.lock();
+        try {
+            inFlight--;
+            tokens.take(tokenCorrection); // Estimates are replaced by reported usage; may go negative
+            if (rateLimited) {
+                throttled.increment();
+                consecutiveThrottles++;
+                rateFactor = Math.max(MIN_RATE_FACTOR, rateFactor / 2);
+                long backoffMillis = Math.min(maxBackoff.toMillis(), 1000L << Math.min(consecutiveThrottles - 1, 16));
+                pausedUntil = Math.max(pausedUntil, System.nanoTime() + TimeUnit.MILLISECONDS.toNanos(backoffMillis));
+                logger.warn("Provider rate limit hit; rate factor {} and pausing {} ms", rateFactor, backoffMillis);
+            } else {
+                consecutiveThrottles = 0;
+                rateFactor = Math.min(1.0, rateFactor + 0.05);
+            }
+            changed.signalAll();
+        } finally {
+            lock.unlock();
+        }
+    }
+
+    // ~4 chars per token for the prompt, plus the expected completion
+    public static int estimateTokens(int promptChars, int completionTokens) {
+        return promptChars / 4 + completionTokens;
+    }
+
+    public final class Grant {
+        private final int estimatedTokens;
+        private final AtomicBoolean finished = new AtomicBoolean();
+
+        private Grant(int estimatedTokens) {
+            this.estimatedTokens = estimatedTokens;
+        }
+
+        // actualTokens <= 0 means the provider reported no usage; the estimate stands
+        public void completed(long actualTokens) {
+            if (finished.compareAndSet(false, true)) {
+                finish(actualTokens > 0 ? actualTokens - estimatedTokens : 0, false);
+            }
+        }
+
+        public void throttled() {
+            if (finished.compareAndSet(false, true)) {
+                finish(0, true);
+            }
+        }
+
+        public void failed() {
+            if (finished.compareAndSet(false, true)) {
+                finish(0, false);
+            }
+        }
+    }
+
+    private static final class Ticket {
+        private final String run;
+        private final int estimatedTokens;
+
+        private Ticket(String run, int estimatedTokens) {
+            this.run = run;
+            this.estimatedTokens = estimatedTokens;
+        }
+    }
+
+    // Capacity = one minute of budget, refilled continuously; rateFactor scales refill after 429s
+    private static final class TokenBucket {
+        private final double capacity;
+        private final double perNano;
+        private double available;
+        private long lastRefill = System.nanoTime();
+
+        private TokenBucket(int perMinute) {
+            this.capacity = perMinute;
+            this.perNano = perMinute / (double) TimeUnit.MINUTES.toNanos(1);
+            this.available = perMinute;
+        }
+
+        private void refill(long now, double rateFactor) {
+            available = Math.min(capacity, available + (now - lastRefill) * perNano * rateFactor);
+            lastRefill = now;
+        }
+
+        // Requests larger than the whole bucket wait for a full bucket instead of forever
+        private long nanosUntil(double amount, double rateFactor) {
+            double needed = Math.min(amount, capacity);
+            return available >= needed ? 0 : (long) Math.ceil((needed - available) / (perNano * rateFactor));
+        }
+
+        private void take(double amount) {
+            available -= amount;
+        }
+    }
+}
+```
+
+### llm/ScheduledChatModel.java
+```java
+package com.example.brdmultiagent.llm;
+
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.model.ChatResponse;
+import org.springframework.ai.chat.prompt.ChatOptions;
+import org.springframework.ai.chat.prompt.Prompt;
+import reactor.core.publisher.Flux;
+
+// Sits on the provider model, below the response cache, so cache hits never spend rate budget. The scheduling
+// itself is per provider HTTP request (ProviderRequestScheduler): OpenAiChatModel runs the whole tool loop inside
+// one call()/stream(). Streamed requests run on reactor threads, so the caller, run and estimate travel in the
+// subscriber context; blocking requests run on the calling thread and read LlmCallContext directly.
+public class ScheduledChatModel implements ChatModel {
+    private final ChatModel delegate;
+    private final int completionTokenEstimate;
+
+    public ScheduledChatModel(ChatModel delegate, int completionTokenEstimate) {
+        this.delegate = delegate;
+        this.completionTokenEstimate = completionTokenEstimate;
+    }
+
+    @Override
+    public ChatResponse call(Prompt prompt) {
+        return delegate.call(prompt);
+    }
+
+    @Override
+    public Flux<ChatResponse> stream(Prompt prompt) {
+        int estimate = estimate(prompt);
+        return Flux.defer(() -> {
+            String caller = LlmCallContext.currentCaller();
+            String run = LlmCallContext.currentRun();
+            return delegate.stream(prompt)
+                    .contextWrite(ProviderRequestScheduler.context(caller, run, estimate));
+        });
+    }
+
+    @Override
+    public ChatOptions getDefaultOptions() {
+        return delegate.getDefaultOptions();
+    }
+
+    private int estimate(Prompt prompt) {
+        int chars = 0;
+        for (Message message : prompt.getInstructions()) {
+            chars += message.getContent() == null ? 0 : message.getContent().length();
+        }
+        return LlmScheduler.estimateTokens(chars, completionTokenEstimate);
+    }
+}
+```
+
+### llm/ProviderRequestScheduler.java
+```java
+package com.example.brdmultiagent.llm;
+
+import com.example.brdmultiagent.trace.RunTracer;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import org.springframework.http.HttpRequest;
+import org.springframework.http.HttpStatus;
+import org.springframework.http.client.ClientHttpRequestExecution;
+import org.springframework.http.client.ClientHttpRequestInterceptor;
+import org.springframework.http.client.ClientHttpResponse;
+import org.springframework.web.reactive.function.client.ClientResponse;
+import org.springframework.web.reactive.function.client.ExchangeFilterFunction;
+import reactor.core.publisher.Mono;
+import reactor.core.scheduler.Schedulers;
+import reactor.util.context.Context;
+
+import java.io.IOException;
+
+// One scheduler grant per provider HTTP request. OpenAiChatModel sends several requests per model call when the
+// model uses tools, and runs the tools in between; granting per call undercounted requests/tokens and held the
+// in-flight slot while tools ran, and tools that call the model themselves (openAIAnalysisTool, BULK) could then
+// wait forever for a slot. The grant ends when the response has been read, before any tool runs.
+public class ProviderRequestScheduler implements ClientHttpRequestInterceptor {
+    private static final String CALLER = "brd.llm.caller";
+    private static final String RUN = "brd.llm.run";
+    private static final String ESTIMATE = "brd.llm.estimate";
+
+    private final LlmScheduler scheduler;
+    private final int completionTokenEstimate;
+    private final int maxRetries;
+    private final ObjectMapper objectMapper = new ObjectMapper();
+
+    public ProviderRequestScheduler(LlmScheduler scheduler, int completionTokenEstimate, int maxRetries) {
+        this.scheduler = scheduler;
+        this.completionTokenEstimate = completionTokenEstimate;
+        this.maxRetries = maxRetries;
+    }
+
+    static Context context(String caller, String run, int estimate) {
+        Context context = Context.of(ESTIMATE, estimate);
+        context = caller != null ? context.put(CALLER, caller) : context;
+        return run != null ? context.put(RUN, run) : context;
+    }
+
+    // Blocking calls (RestClient): runs on the calling thread. 429s are retried here, behind the scheduler's
+    // backoff; the RestClient needs a buffering request factory so usage can be read before the API client does.
+    @Override
+    public ClientHttpResponse intercept(HttpRequest request, byte[] body, ClientHttpRequestExecution execution)
+            throws IOException {
+        int estimate = LlmScheduler.estimateTokens(body.length, completionTokenEstimate); // JSON ~ prompt chars
+        for (int attempt = 0; ; attempt++) {
+            LlmScheduler.Grant grant = scheduler.acquire(LlmCallContext.currentCaller(), LlmCallContext.currentRun(), estimate);
+            ClientHttpResponse response;
+            try {
+                response = execution.execute(request, body);
+            } catch (IOException | RuntimeException e) {
+                grant.failed();
+                throw e;
+            }
+            if (response.getStatusCode().value() == HttpStatus.TOO_MANY_REQUESTS.value()) {
+                grant.throttled();
+                if (attempt < maxRetries) {
+                    response.close();
+                    RunTracer.countRetry();
+                    continue;
+                }
+                return response; // The API's error handler turns it into an exception
+            }
+            if (response.getStatusCode().isError()) {
+                grant.failed();
+            } else {
+                grant.completed(totalTokens(response));
+            }
+            return response;
+        }
+    }
+
+    // Streamed calls (WebClient): acquire() blocks, so it runs on boundedElastic rather than on the event loop
+    // that sends a tool loop's follow-up requests. Not retried: tokens may already have reached the listener.
+    public ExchangeFilterFunction streamingFilter() {
+        return (request, next) -> Mono.deferContextual(context -> Mono
+                .fromCallable(() -> scheduler.acquire(context.getOrDefault(CALLER, null), context.getOrDefault(RUN, null),
+                        context.getOrDefault(ESTIMATE, completionTokenEstimate)))
+                .subscribeOn(Schedulers.boundedElastic())
+                .flatMap(grant -> next.exchange(request)
+                        .doOnError(e -> grant.failed())
+                        .doOnCancel(grant::failed)
+                        .map(response -> release(grant, response))));
+    }
+
+    // Streaming responses report no usage, so the estimate stands
+    private static ClientResponse release(LlmScheduler.Grant grant, ClientResponse response) {
+        if (response.statusCode().value() == HttpStatus.TOO_MANY_REQUESTS.value()) {
+            grant.throttled();
+            return response;
+        }
+        if (response.statusCode().isError()) {
+            grant.failed();
+            return response;
+        }
+        return response.mutate()
+                .body(body -> body.doFinally(signal -> grant.completed(0)))
+                .build();
+    }
+
+    // For in-process providers (the bench's MockChatModel): one grant around one simulated request, taken on the
+    // calling thread like a blocking request
+    public void around(int promptChars, Runnable request) {
+        LlmScheduler.Grant grant = scheduler.acquire(LlmCallContext.currentCaller(), LlmCallContext.currentRun(),
+                LlmScheduler.estimateTokens(promptChars, completionTokenEstimate));
+        try {
+            request.run();
+        } catch (RuntimeException e) {
+            grant.failed();
+            throw e;
+        }
+        grant.completed(0);
+    }
+
+    private long totalTokens(ClientHttpResponse response) {
+        try {
+            return objectMapper.readTree(response.getBody()).path("usage").path("total_tokens").asLong(0);
+        } catch (IOException e) {
+            return 0; // Estimate stands
+        }
+    }
+}
+```
+
+### llm/InstrumentedChatModel.java
+```java
+package com.example.brdmultiagent.llm;
+
+import com.example.brdmultiagent.trace.RunTracer;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.metadata.Usage;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.model.ChatResponse;
+import org.springframework.ai.chat.prompt.ChatOptions;
+import org.springframework.ai.chat.prompt.Prompt;
+import reactor.core.publisher.Flux;
+import reactor.core.publisher.SignalType;
+
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+
+// Outermost decorator: one span per agent/tool model call, cache hits included (they report no usage).
+// Sizes are in characters.
+public class InstrumentedChatModel implements ChatModel {
+    private final ChatModel delegate;
+    private final RunTracer tracer;
+
+    public InstrumentedChatModel(ChatModel delegate, RunTracer tracer) {
+        this.delegate = delegate;
+        this.tracer = tracer;
+    }
+
+    @Override
+    public ChatResponse call(Prompt prompt) {
+        long start = System.nanoTime();
+        int savedRetries = RunTracer.enterSpan();
+        ChatResponse response = null;
+        String error = null;
+        try {
+            response = delegate.call(prompt);
+            return response;
+        } catch (RuntimeException e) {
+            error = e.getClass().getSimpleName();
+            throw e;
+        } finally {
+            int retries = RunTracer.exitSpan(savedRetries);
+            Usage usage = usage(response);
+            tracer.llmCall(LlmCallContext.currentCaller(), start, System.nanoTime() - start,
+                    usage == null || usage.getPromptTokens() == null ? 0 : usage.getPromptTokens(),
+                    usage == null || usage.getGenerationTokens() == null ? 0 : usage.getGenerationTokens(),
+                    retries, chars(prompt), response == null ? 0 : content(response).length(), error);
+        }
+    }
+
+    // Recorded when the stream ends; the caller/run are captured at subscription, on the calling thread
+    @Override
+    public Flux<ChatResponse> stream(Prompt prompt) {
+        return Flux.defer(() -> {
+            String caller = LlmCallContext.currentCaller();
+            String run = LlmCallContext.currentRun();
+            long start = System.nanoTime();
+            AtomicLong outChars = new AtomicLong();
+            AtomicReference<Usage> lastUsage = new AtomicReference<>();
+            return delegate.stream(prompt)
+                    .doOnNext(chunk -> {
+                        outChars.addAndGet(content(chunk).length());
+                        Usage usage = usage(chunk);
+                        if (usage != null && usage.getTotalTokens() != null && usage.getTotalTokens() > 0) {
+                            lastUsage.set(usage);
+                        }
+                    })
+                    .doFinally(signal -> LlmCallContext.runAs(run, () -> LlmCallContext.callAs(caller, () -> {
+                        Usage usage = lastUsage.get();
+                        tracer.llmCall(caller, start, System.nanoTime() - start,
+                                usage == null || usage.getPromptTokens() == null ? 0 : usage.getPromptTokens(),
+                                usage == null || usage.getGenerationTokens() == null ? 0 : usage.getGenerationTokens(),
+                                0, chars(prompt), outChars.get(),
+                                signal == SignalType.ON_ERROR ? "StreamError" : null);
+                        return null;
+                    })));
+        });
+    }
+
+    @Override
+    public ChatOptions getDefaultOptions() {
+        return delegate.getDefaultOptions();
+    }
+
+    private static Usage usage(ChatResponse response) {
+        return response == null || response.getMetadata() == null ? null : response.getMetadata().getUsage();
+    }
+
+    private static String content(ChatResponse response) {
+        if (response.getResult() == null || response.getResult().getOutput().getContent() == null) {
+            return "";
+        }
+        return response.getResult().getOutput().getContent();
+    }
+
+    private static long chars(Prompt prompt) {
+        long chars = 0;
+        for (Message message : prompt.getInstructions()) {
+            chars += message.getContent() == null ? 0 : message.getContent().length();
+        }
+        return chars;
+    }
+}
+```
+
+### http/ToolHttpClient.java
+```java
+package com.example.brdmultiagent.http;
+
+import com.example.brdmultiagent.trace.RunTracer;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Tags;
+import io.micrometer.core.instrument.Timer;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.io.IOException;
+import java.net.ConnectException;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpConnectTimeoutException;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.time.Duration;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.Semaphore;
+import java.util.concurrent.ThreadLocalRandom;
+import java.util.concurrent.TimeUnit;
+
+// One client for all tool HTTP calls: the JDK client keeps connections alive per host and negotiates
+// HTTP/2 where the server supports it, so Excel and Jenkins calls stop paying a handshake each time.
+@Component
+public class ToolHttpClient {
+    private static final Logger logger = LoggerFactory.getLogger(ToolHttpClient.class);
+
+    private final HttpClient client;
+    private final MeterRegistry meterRegistry;
+    private final Duration requestTimeout;
+    private final int maxPerHost;
+    private final int maxAttempts;
+    private final long baseDelayMs;
+    private final long maxDelayMs;
+    private final int failureThreshold;
+    private final long openMs;
+    private final Set<String> idempotentTargets;
+    private final Map<String, Host> hosts = new ConcurrentHashMap<>();
+
+    private final class Host {
+        final Semaphore permits = new Semaphore(maxPerHost, true);
+        final CircuitBreaker breaker = new CircuitBreaker(failureThreshold, openMs);
+
+        Host(String authority) {
+            meterRegistry.gauge("brd.http.inflight", Tags.of("host", authority),
+                    permits, p -> maxPerHost - p.availablePermits());
+            meterRegistry.gauge("brd.http.waiting", Tags.of("host", authority),
+                    permits, Semaphore::getQueueLength);
+            meterRegistry.gauge("brd.http.circuit.open", Tags.of("host", authority),
+                    breaker, b -> b.isOpen() ? 1 : 0);
+        }
+    }
+
+    public ToolHttpClient(MeterRegistry meterRegistry,
+                          @Value("${brd.http.connect-timeout-ms:2000}") long connectTimeoutMs,
+                          @Value("${brd.http.request-timeout-ms:30000}") long requestTimeoutMs,
+                          @Value("${brd.http.max-per-host:20}") int maxPerHost,
+                          @Value("${brd.http.retry.max-attempts:3}") int maxAttempts,
+                          @Value("${brd.http.retry.base-delay-ms:200}") long baseDelayMs,
+                          @Value("${brd.http.retry.max-delay-ms:5000}") long maxDelayMs,
+                          @Value("${brd.http.circuit-breaker.failure-threshold:5}") int failureThreshold,
+                          @Value("${brd.http.circuit-breaker.open-ms:30000}") long openMs,
+                          @Value("${brd.http.retry.idempotent-targets:}") Set<String> idempotentTargets) {
+        this.meterRegistry = meterRegistry;
+        this.requestTimeout = Duration.ofMillis(requestTimeoutMs);
+        this.maxPerHost = maxPerHost;
+        this.maxAttempts = maxAttempts;
+        this.baseDelayMs = baseDelayMs;
+        this.maxDelayMs = maxDelayMs;
+        this.failureThreshold = failureThreshold;
+        this.openMs = openMs;
+        this.idempotentTargets = idempotentTargets;
+        this.client = HttpClient.newBuilder()
+                .version(HttpClient.Version.HTTP_2) // Falls back to HTTP/1.1 keep-alive when not offered
+                .connectTimeout(Duration.ofMillis(connectTimeoutMs))
+                .followRedirects(HttpClient.Redirect.NORMAL)
+                .build();
+    }
+
+    // Fire-and-forget HEAD so the first real call finds an open (HTTP/2 or keep-alive) connection; the response
+    // and any failure are ignored and kept out of retries, metrics and the circuit breaker
+    public void warm(String url) {
+        HttpRequest request = HttpRequest.newBuilder(URI.create(url))
+                .method("HEAD", HttpRequest.BodyPublishers.noBody())
+                .timeout(requestTimeout)
+                .build();
+        client.sendAsync(request, HttpResponse.BodyHandlers.discarding())
+                .exceptionally(e -> null);
+    }
+
+    public String postJson(String target, String url, String json) {
+        return send(target, HttpRequest.newBuilder(URI.create(url))
+                .header("Content-Type", "application/json")
+                .POST(HttpRequest.BodyPublishers.ofString(json)));
+    }
+
+    // Retries with full-jitter exponential backoff; other 4xx fail immediately. Every target retries 429 and
+    // connect failures (the request never reached the server). Only targets listed in
+    // brd.http.retry.idempotent-targets also retry IO errors, timeouts and 5xx, which may follow a request the
+    // server already acted on: a retried Jenkins buildWithParameters would start a second build.
+    public String send(String target, HttpRequest.Builder builder) {
+        HttpRequest request = builder.timeout(requestTimeout).build();
+        String authority = request.uri().getAuthority();
+        Host host = hosts.computeIfAbsent(authority, Host::new);
+        boolean idempotent = idempotentTargets.contains(target);
+        Exception lastError = null;
+
+        for (int attempt = 1; attempt <= maxAttempts; attempt++) {
+            CircuitBreaker.Permit permit = host.breaker.acquire();
+            if (permit == CircuitBreaker.Permit.DENIED) {
+                meterRegistry.counter("brd.http.rejected", "target", target, "reason", "circuit_open").increment();
+                throw new HttpCallException(target + ": circuit open for " + authority, lastError);
+            }
+            Timer.Sample sample = Timer.start(meterRegistry);
+            String outcome = "error";
+            boolean retryable = false;
+            try {
+                if (!host.permits.tryAcquire(requestTimeout.toMillis(), TimeUnit.MILLISECONDS)) {
+                    meterRegistry.counter("brd.http.rejected", "target", target, "reason", "host_limit").increment();
+                    throw new HttpCallException(target + ": timed out waiting for a connection slot to " + authority, null);
+                }
+                try {
+                    HttpResponse<String> response = client.send(request, HttpResponse.BodyHandlers.ofString());
+                    int status = response.statusCode();
+                    outcome = String.valueOf(status);
+                    if (status / 100 == 2) {
+                        host.breaker.onSuccess();
+                        return response.body();
+                    }
+                    if (status != 429 && status < 500) {
+                        host.breaker.onSuccess(); // The host is healthy, the request is not; retrying won't help
+                        throw new HttpCallException(target + " returned HTTP " + status + ": " + response.body(), null);
+                    }
+                    host.breaker.onFailure();
+                    lastError = new HttpCallException(target + " returned HTTP " + status, null);
+                    retryable = idempotent || status == 429;
+                } finally {
+                    host.permits.release();
+                }
+            } catch (IOException e) {
+                host.breaker.onFailure();
+                lastError = e;
+                retryable = idempotent || notSent(e);
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new HttpCallException(target + ": interrupted", e);
+            } finally {
+                if (permit == CircuitBreaker.Permit.TRIAL) {
+                    host.breaker.releaseTrial(); // No-op once onSuccess/onFailure recorded the outcome
+                }
+                sample.stop(meterRegistry.timer("brd.http.requests", "target", target, "outcome", outcome));
+            }
+
+            if (!retryable) {
+                throw new HttpCallException(target + " failed (not retried: the request may have been processed)",
+                        lastError);
+            }
+            if (attempt < maxAttempts) {
+                meterRegistry.counter("brd.http.retries", "target", target).increment();
+                RunTracer.countRetry();
+                long delay = ThreadLocalRandom.current().nextLong(
+                        Math.min(maxDelayMs, baseDelayMs * (1L << (attempt - 1))) + 1);
+                logger.warn("{} call failed (attempt {}/{}), retrying in {} ms: {}", target, attempt, maxAttempts,
+                        delay, lastError.getMessage());
+                try {
+                    Thread.sleep(delay);
+                } catch (InterruptedException e) {
+                    Thread.currentThread().interrupt();
+                    throw new HttpCallException(target + ": interrupted", e);
+                }
+            }
+        }
+        throw new HttpCallException(target + " failed after " + maxAttempts + " attempts", lastError);
+    }
+
+    private static boolean notSent(IOException e) {
+        for (Throwable cause = e; cause != null; cause = cause.getCause()) {
+            if (cause instanceof ConnectException || cause instanceof HttpConnectTimeoutException) {
+                return true;
+            }
+        }
+        return false;
+    }
+}
+```
+
+### http/CircuitBreaker.java
+```java
+package com.example.brdmultiagent.http;
+
+// Closed -> open after N consecutive failures; after openMs one trial request is let through (half-open)
+public class CircuitBreaker {
+
+    public enum Permit { DENIED, GRANTED, TRIAL }
+
+    private final int failureThreshold;
+    private final long openMs;
+    private int consecutiveFailures;
+    private long openedAt = -1;
+    private boolean trialInFlight;
+
+    public CircuitBreaker(int failureThreshold, long openMs) {
+        this.failureThreshold = failureThreshold;
+        this.openMs = openMs;
+    }
+
+    // A TRIAL permit must end in onSuccess(), onFailure() or releaseTrial(), or the breaker never closes
+    public synchronized Permit acquire() {
+        if (openedAt < 0) {
+            return Permit.GRANTED;
+        }
+        if (System.currentTimeMillis() - openedAt >= openMs && !trialInFlight) {
+            trialInFlight = true;
+            return Permit.TRIAL;
+        }
+        return Permit.DENIED;
+    }
+
+    // The trial ended without saying anything about the host (local limit, interrupt, unexpected error);
+    // the next request may try again
+    public synchronized void releaseTrial() {
+        trialInFlight = false;
+    }
+
+    public synchronized void onSuccess() {
+        consecutiveFailures = 0;
+        openedAt = -1;
+        trialInFlight = false;
+    }
+
+    public synchronized void onFailure() {
+        consecutiveFailures++;
+        if (trialInFlight || consecutiveFailures >= failureThreshold) {
+            openedAt = System.currentTimeMillis();
+        }
+        trialInFlight = false;
+    }
+
+    public synchronized boolean isOpen() {
+        return openedAt >= 0;
+    }
+}
+```
+
+### http/HttpCallException.java
+```java
+package com.example.brdmultiagent.http;
+
+public class HttpCallException extends RuntimeException {
+    public HttpCallException(String message, Throwable cause) {
+        super(message, cause);
+    }
+}
+```
+
+### checkpoint/CheckpointStore.java
+```java
+package com.example.brdmultiagent.checkpoint;
+
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.Payload;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import io.micrometer.core.instrument.DistributionSummary;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.util.HashMap;
+import java.util.Map;
+import java.util.Optional;
+import java.util.concurrent.TimeUnit;
+import java.util.zip.GZIPInputStream;
+import java.util.zip.GZIPOutputStream;
+
+// <dir>/<runId>.json.gz holds the latest checkpoint (messages, routing, small fields, artifact hashes).
+// Artifacts (scenario lists, extracted text) go to <dir>/artifacts/<sha256>.txt.gz once and are never
+// rewritten, so the per-node write stays a few KB even late in a long run.
+@Component
+public class CheckpointStore {
+    private static final Logger logger = LoggerFactory.getLogger(CheckpointStore.class);
+    private static final ObjectMapper objectMapper = new ObjectMapper();
+
+    private final boolean enabled;
+    private final Path dir;
+    private final Path artifactDir;
+    private final Timer writeTimer;
+    private final DistributionSummary writeSize;
+
+    public CheckpointStore(MeterRegistry meterRegistry,
+                           @Value("${brd.checkpoint.enabled:true}") boolean enabled,
+                           @Value("${brd.checkpoint.dir:${java.io.tmpdir}/brd-checkpoints}") String dir) throws IOException {
+        this.enabled = enabled;
+        this.dir = Path.of(dir);
+        this.artifactDir = this.dir.resolve("artifacts");
+        if (enabled) {
+            Files.createDirectories(artifactDir);
+        }
+        this.writeTimer = Timer.builder("brd.checkpoint.write").register(meterRegistry);
+        this.writeSize = DistributionSummary.builder("brd.checkpoint.size").baseUnit("bytes").register(meterRegistry);
+    }
+
+    // Never fails the run: a checkpoint that can't be written only costs resumability
+    public void save(AgentState state, String lastNode) {
+        if (!enabled) {
+            return;
+        }
+        long start = System.nanoTime();
+        try {
+            Map<String, String> artifactHashes = new HashMap<>();
+            for (Map.Entry<String, Payload> artifact : state.getArtifactPayloads().entrySet()) {
+                artifactHashes.put(artifact.getKey(), writeArtifact(artifact.getValue()));
+            }
+            byte[] bytes = gzip(objectMapper.writeValueAsBytes(CheckpointCodec.encode(state, lastNode, artifactHashes)));
+            Path tmp = Files.createTempFile(dir, state.getRunId(), ".tmp");
+            Files.write(tmp, bytes);
+            Files.move(tmp, checkpointFile(state.getRunId()), StandardCopyOption.ATOMIC_MOVE,
+                    StandardCopyOption.REPLACE_EXISTING);
+            writeSize.record(bytes.length);
+        } catch (IOException e) {
+            logger.warn("Failed to checkpoint run {} after {}", state.getRunId(), lastNode, e);
+        } finally {
+            writeTimer.record(System.nanoTime() - start, TimeUnit.NANOSECONDS);
+        }
+    }
+
+    public Optional<AgentState> load(String runId) {
+        Path file = checkpointFile(runId);
+        if (!enabled || !Files.exists(file)) {
+            return Optional.empty();
+        }
+        try (InputStream in = new GZIPInputStream(Files.newInputStream(file))) {
+            CheckpointCodec.Checkpoint checkpoint = objectMapper.readValue(in, CheckpointCodec.Checkpoint.class);
+            Map<String, String> artifacts = new HashMap<>();
+            for (Map.Entry<String, String> entry : checkpoint.artifactHashes().entrySet()) {
+                artifacts.put(entry.getKey(), readArtifact(entry.getValue()));
+            }
+            logger.info("Loaded checkpoint for run {} (step {}, last node {})", runId, checkpoint.steps(),
+                    checkpoint.lastNode());
+            return Optional.of(CheckpointCodec.decode(checkpoint, artifacts));
+        } catch (IOException e) {
+            logger.warn("Unreadable checkpoint for run {}", runId, e);
+            return Optional.empty();
+        }
+    }
+
+    // Artifacts are shared by content, so they are left for an external cleanup of old files
+    public void delete(String runId) {
+        if (!enabled) {
+            return;
+        }
+        try {
+            Files.deleteIfExists(checkpointFile(runId));
+        } catch (IOException e) {
+            logger.warn("Failed to delete checkpoint for run {}", runId, e);
+        }
+    }
+
+    // Run ids become file names, so only job-id characters are accepted
+    public static boolean isValidRunId(String runId) {
+        return runId != null && runId.matches("[A-Za-z0-9-]+");
+    }
+
+    private Path checkpointFile(String runId) {
+        if (!isValidRunId(runId)) {
+            throw new IllegalArgumentException("Invalid run id: " + runId);
+        }
+        return dir.resolve(runId + ".json.gz");
+    }
+
+    // Payloads already hold SHA-256 and gzip bytes in the artifact format, so nothing is re-encoded
+    private String writeArtifact(Payload payload) throws IOException {
+        String hash = payload.hash();
+        Path file = artifactDir.resolve(hash + ".txt.gz");
+        if (!Files.exists(file)) {
+            Path tmp = Files.createTempFile(artifactDir, hash, ".tmp");
+            Files.write(tmp, payload.gzipped());
+            Files.move(tmp, file, StandardCopyOption.ATOMIC_MOVE, StandardCopyOption.REPLACE_EXISTING);
+        }
+        return hash;
+    }
+
+    private String readArtifact(String hash) throws IOException {
+        try (InputStream in = new GZIPInputStream(Files.newInputStream(artifactDir.resolve(hash + ".txt.gz")))) {
+            return new String(in.readAllBytes(), StandardCharsets.UTF_8);
+        }
+    }
+
+    private static byte[] gzip(byte[] raw) throws IOException {
+        ByteArrayOutputStream buffer = new ByteArrayOutputStream(raw.length / 4 + 64);
+        try (OutputStream out = new GZIPOutputStream(buffer)) {
+            out.write(raw);
+        }
+        return buffer.toByteArray();
+    }
+}
+```
+
+### checkpoint/CheckpointCodec.java
+```java
+package com.example.brdmultiagent.checkpoint;
+
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ScenarioResult;
+import org.springframework.ai.chat.messages.AssistantMessage;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.messages.MessageType;
+import org.springframework.ai.chat.messages.SystemMessage;
+import org.springframework.ai.chat.messages.UserMessage;
+
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+// Spring AI messages are not Jackson-friendly, so the state is flattened into plain records
+final class CheckpointCodec {
+    static final int VERSION = 1;
+
+    record MessageRecord(String type, String content, Map<String, Object> metadata) {
+    }
+
+    record Checkpoint(int version, String runId, String lastNode, int steps, String next,
+                      List<MessageRecord> messages, Map<String, String> artifactHashes,
+                      String summary, int summarizedUpTo, List<ScenarioResult> scenarioResults) {
+    }
+
+    private CheckpointCodec() {
+    }
+
+    static Checkpoint encode(AgentState state, String lastNode, Map<String, String> artifactHashes) {
+        List<MessageRecord> messages = new ArrayList<>(state.getMessages().size());
+        for (Message message : state.getMessages()) {
+            // Only our own routing keys are kept; provider metadata is not needed to resume
+            Map<String, Object> metadata = new HashMap<>();
+            for (String key : List.of(AgentState.AGENT_KEY, AgentState.ARTIFACT_KEY)) {
+                Object value = message.getMetadata().get(key);
+                if (value != null) {
+                    metadata.put(key, value.toString());
+                }
+            }
+            messages.add(new MessageRecord(message.getMessageType().name(), message.getContent(), metadata));
+        }
+        return new Checkpoint(VERSION, state.getRunId(), lastNode, state.getSteps(), state.getNext(), messages,
+                artifactHashes, state.getSummary(), state.getSummarizedUpTo(), state.getScenarioResults());
+    }
+
+    static AgentState decode(Checkpoint checkpoint, Map<String, String> artifacts) {
+        if (checkpoint.version() != VERSION) {
+            throw new IllegalStateException("Unsupported checkpoint version " + checkpoint.version());
+        }
+        AgentState state = new AgentState();
+        state.setRunId(checkpoint.runId());
+        state.setSteps(checkpoint.steps());
+        state.setNext(checkpoint.next());
+        for (MessageRecord record : checkpoint.messages()) {
+            state.addMessage(switch (MessageType.valueOf(record.type())) {
+                case USER -> new UserMessage(record.content());
+                case SYSTEM -> new SystemMessage(record.content());
+                default -> new AssistantMessage(record.content(), record.metadata());
+            });
+        }
+        artifacts.forEach(state::restoreArtifact);
+        if (checkpoint.summary() != null) {
+            state.setSummary(checkpoint.summary(), checkpoint.summarizedUpTo());
+        }
+        state.setScenarioResults(checkpoint.scenarioResults() == null ? List.of() : checkpoint.scenarioResults());
+        return state;
+    }
+}
+```
+
+### batch/BatchIngestService.java
+```java
+package com.example.brdmultiagent.batch;
+
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.job.BrdJob;
+import com.example.brdmultiagent.job.BrdJobService;
+import com.example.brdmultiagent.tool.DocumentExtractorTool;
+import com.example.brdmultiagent.tool.ExtractionCache;
+import com.example.brdmultiagent.upload.UploadHandle;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import io.micrometer.core.instrument.DistributionSummary;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import jakarta.annotation.PreDestroy;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Service;
+import org.springframework.web.multipart.MultipartFile;
+
+import java.io.IOException;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.Semaphore;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.zip.ZipEntry;
+import java.util.zip.ZipInputStream;
+
+// Two-stage pipeline per batch: extraction workers parse document N+1.. (warming ExtractionCache) while
+// graph runs for earlier documents are in the job pool. Graph runs started by batches are capped
+// service-wide by a fair semaphore, so bulk imports leave job slots for interactive uploads.
+@Service
+public class BatchIngestService {
+    private static final Logger logger = LoggerFactory.getLogger(BatchIngestService.class);
+    private static final long SUBMIT_RETRY_MILLIS = 1000;
+    private static final long MAX_SUBMIT_WAIT_MILLIS = TimeUnit.MINUTES.toMillis(10);
+
+    private final UploadRegistry uploads;
+    private final ExtractionCache extractionCache;
+    private final DocumentExtractorTool extractor;
+    private final BrdJobService jobService;
+    private final ExecutorService extractPool;
+    private final Semaphore graphSlots;
+    private final int maxDocuments;
+    private final MeterRegistry meterRegistry;
+    private final Timer extractTimer;
+    private final DistributionSummary throughput;
+
+    public BatchIngestService(UploadRegistry uploads,
+                              ExtractionCache extractionCache,
+                              DocumentExtractorTool extractor,
+                              BrdJobService jobService,
+                              MeterRegistry meterRegistry,
+                              @Value("${brd.batch.extract-workers:2}") int extractWorkers,
+                              @Value("${brd.batch.max-in-flight:3}") int maxInFlight,
+                              @Value("${brd.batch.max-documents:200}") int maxDocuments) {
+        this.uploads = uploads;
+        this.extractionCache = extractionCache;
+        this.extractor = extractor;
+        this.jobService = jobService;
+        this.graphSlots = new Semaphore(maxInFlight, true);
+        this.maxDocuments = maxDocuments;
+        this.meterRegistry = meterRegistry;
+        AtomicInteger threadCount = new AtomicInteger();
+        this.extractPool = Executors.newFixedThreadPool(extractWorkers,
+                r -> new Thread(r, "brd-batch-" + threadCount.incrementAndGet()));
+        this.extractTimer = Timer.builder("brd.batch.extract").register(meterRegistry);
+        this.throughput = DistributionSummary.builder("brd.batch.throughput").baseUnit("docs/min").register(meterRegistry);
+    }
+
+    // Every uploaded file, with .zip archives expanded (entries only, hidden and __MACOSX files skipped).
+    // The caller owns the returned handles; on failure the ones registered so far are released.
+    public List<UploadHandle> register(List<MultipartFile> files) throws IOException {
+        List<UploadHandle> documents = new ArrayList<>();
+        try {
+            for (MultipartFile file : files) {
+                String name = file.getOriginalFilename() == null ? "brd" : file.getOriginalFilename();
+                if (!name.toLowerCase(Locale.ROOT).endsWith(".zip")) {
+                    checkCount(documents);
+                    documents.add(uploads.register(file));
+                    continue;
+                }
+                try (ZipInputStream zip = new ZipInputStream(file.getInputStream())) {
+                    ZipEntry entry;
+                    while ((entry = zip.getNextEntry()) != null) {
+                        String entryName = entry.getName().substring(entry.getName().lastIndexOf('/') + 1);
+                        if (entry.isDirectory() || entryName.startsWith(".") || entry.getName().startsWith("__MACOSX")) {
+                            continue;
+                        }
+                        checkCount(documents);
+                        documents.add(uploads.register(entryName, zip)); // Size limit enforced while inflating
+                    }
+                }
+            }
+        } catch (IOException | RuntimeException e) {
+            documents.forEach(UploadHandle::close);
+            throw e;
+        }
+        if (documents.isEmpty()) {
+            throw new IllegalArgumentException("No documents in batch");
+        }
+        return documents;
+    }
+
+    // Takes ownership of the documents. Events: "batch" once, "document" per BRD as it finishes (the
+    // manifest, in completion order), then "summary" with counts and docs/minute.
+    public IngestBatch start(List<UploadHandle> documents, GraphEventListener listener) throws IOException {
+        IngestBatch batch = new IngestBatch(documents.size(), listener);
+        Map<String, Integer> firstByHash = new HashMap<>();
+        List<Runnable> work = new ArrayList<>();
+        List<Map<String, Object>> duplicates = new ArrayList<>();
+        try {
+            for (int i = 0; i < documents.size(); i++) {
+                UploadHandle document = documents.get(i);
+                String hash = extractionCache.keyFor(document.openStream()); // Same key the extraction cache uses
+                Map<String, Object> entry = entry(i, document, hash);
+                Integer first = firstByHash.putIfAbsent(hash, i);
+                if (first != null) {
+                    entry.put("status", "DUPLICATE");
+                    entry.put("duplicateOf", first);
+                    duplicates.add(entry);
+                    document.close();
+                    continue;
+                }
+                int index = i;
+                work.add(() -> process(batch, index, document, entry));
+            }
+        } catch (IOException | RuntimeException e) {
+            documents.forEach(UploadHandle::close);
+            throw e;
+        }
+
+        batch.emit("batch", Map.of("batchId", batch.getId(), "documents", documents.size(),
+                "unique", work.size(), "duplicates", duplicates.size()));
+        for (Map<String, Object> duplicate : duplicates) {
+            recordOutcome(batch, (Integer) duplicate.get("index"), duplicate, false);
+        }
+        work.forEach(extractPool::execute);
+        logger.info("Batch {}: {} documents, {} unique", batch.getId(), documents.size(), work.size());
+        return batch;
+    }
+
+    // Stops queued documents and cancels their running graph jobs; finished entries stay as they are.
+    // Each cancelled job reports "cancelled" to its listener, which records the entry and frees its slot.
+    public void cancel(IngestBatch batch) {
+        if (batch == null) {
+            return;
+        }
+        batch.cancel();
+        for (BrdJob job : batch.running().values()) {
+            jobService.cancel(job);
+        }
+    }
+
+    private void process(IngestBatch batch, int index, UploadHandle document, Map<String, Object> entry) {
+        boolean slotHeld = false;
+        try {
+            if (batch.isCancelled()) {
+                document.close();
+                entry.put("status", "CANCELLED");
+                recordOutcome(batch, index, entry, false);
+                return;
+            }
+            long start = System.nanoTime();
+            extractor.extract(document.reference()); // Result is cached; the BA agent's tool call then hits
+            long extractNanos = System.nanoTime() - start;
+            extractTimer.record(extractNanos, TimeUnit.NANOSECONDS);
+            entry.put("extractMs", extractNanos / 1_000_000);
+
+            // Blocks this extraction worker, so extraction runs at most extract-workers documents ahead
+            graphSlots.acquire();
+            slotHeld = true;
+            // Jobs can also be cancelled one by one (DELETE /jobs/{id}), queued or running; "cancelled" still
+            // frees the slot and counts toward the summary
+            BrdJob job = submit(batch, "Process BRD file: " + document.describe(), (event, data) -> {
+                Map<String, Object> outcome = new LinkedHashMap<>(entry); // entry is not modified after submit
+                outcome.put("jobId", data.get("jobId"));
+                switch (event) {
+                    case "done" -> {
+                        outcome.put("status", "SUCCEEDED");
+                        outcome.put("result", data.get("result"));
+                    }
+                    case "error" -> {
+                        outcome.put("status", "FAILED");
+                        outcome.put("error", data.get("error"));
+                    }
+                    case "cancelled" -> outcome.put("status", "CANCELLED");
+                    default -> {
+                        return; // "queued", "node", ...
+                    }
+                }
+                recordOutcome(batch, index, outcome, true);
+            }, document);
+            batch.running().put(index, job);
+            if (batch.isCancelled()) {
+                cancel(batch); // Cancelled while this job was being submitted
+            }
+        } catch (Exception e) {
+            if (e instanceof InterruptedException) {
+                Thread.currentThread().interrupt();
+            }
+            document.close();
+            entry.put("status", batch.isCancelled() ? "CANCELLED" : "FAILED");
+            entry.put("error", String.valueOf(e.getMessage()));
+            recordOutcome(batch, index, entry, slotHeld);
+        }
+    }
+
+    // The job queue is shared with interactive uploads; a full queue delays the batch rather than failing it
+    private BrdJob submit(IngestBatch batch, String initialInput, GraphEventListener listener, UploadHandle document)
+            throws InterruptedException {
+        long deadline = System.currentTimeMillis() + MAX_SUBMIT_WAIT_MILLIS;
+        while (true) {
+            try {
+                return jobService.submit(initialInput, listener, document);
+            } catch (RejectedExecutionException e) {
+                if (batch.isCancelled() || System.currentTimeMillis() > deadline) {
+                    throw e;
+                }
+                Thread.sleep(SUBMIT_RETRY_MILLIS);
+            }
+        }
+    }
+
+    private void recordOutcome(IngestBatch batch, int index, Map<String, Object> entry, boolean slotHeld) {
+        if (!batch.record(index, entry)) {
+            return; // Already recorded (e.g. cancelled job reporting its error afterwards)
+        }
+        if (slotHeld) {
+            graphSlots.release();
+        }
+        meterRegistry.counter("brd.batch.documents", "status", String.valueOf(entry.get("status"))).increment();
+        batch.completeIfDone().ifPresent(summary -> {
+            throughput.record(((Number) summary.get("docsPerMinute")).doubleValue());
+            logger.info("Batch {} finished: {}", batch.getId(), summary);
+        });
+    }
+
+    private void checkCount(List<UploadHandle> documents) {
+        if (documents.size() >= maxDocuments) {
+            throw new IllegalArgumentException("Batch exceeds " + maxDocuments + " documents");
+        }
+    }
+
+    private static Map<String, Object> entry(int index, UploadHandle document, String hash) {
+        Map<String, Object> entry = new LinkedHashMap<>();
+        entry.put("index", index);
+        entry.put("filename", document.filename());
+        entry.put("sha256", hash);
+        return entry;
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        extractPool.shutdownNow();
+    }
+}
+```
+
+### batch/IngestBatch.java
+```java
+package com.example.brdmultiagent.batch;
+
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.job.BrdJob;
+
+import java.util.HashSet;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Optional;
+import java.util.Set;
+import java.util.TreeMap;
+import java.util.UUID;
+import java.util.concurrent.ConcurrentHashMap;
+
+// One batch request: per-document outcomes, counts and the manifest stream. Listener calls are
+// serialized here, since SseEmitter is not safe for concurrent sends.
+public class IngestBatch {
+    private final String id = UUID.randomUUID().toString();
+    private final int documents;
+    private final GraphEventListener listener;
+    private final long startNanos = System.nanoTime();
+    private final Map<Integer, BrdJob> running = new ConcurrentHashMap<>();
+    private final Set<Integer> recorded = new HashSet<>();
+    private final Map<String, Integer> counts = new TreeMap<>();
+    private volatile boolean cancelled;
+    private boolean completed;
+
+    IngestBatch(int documents, GraphEventListener listener) {
+        this.documents = documents;
+        this.listener = listener;
+    }
+
+    public String getId() {
+        return id;
+    }
+
+    public boolean isCancelled() {
+        return cancelled;
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    Map<Integer, BrdJob> running() {
+        return running;
+    }
+
+    synchronized void emit(String event, Map<String, Object> data) {
+        listener.onEvent(event, data);
+    }
+
+    // First outcome per document wins
+    synchronized boolean record(int index, Map<String, Object> entry) {
+        if (!recorded.add(index)) {
+            return false;
+        }
+        running.remove(index);
+        counts.merge(String.valueOf(entry.get("status")), 1, Integer::sum);
+        emit("document", entry);
+        return true;
+    }
+
+    // Emits "summary" exactly once, after the last document is recorded
+    synchronized Optional<Map<String, Object>> completeIfDone() {
+        if (completed || recorded.size() < documents) {
+            return Optional.empty();
+        }
+        completed = true;
+        long elapsedMillis = Math.max(1, (System.nanoTime() - startNanos) / 1_000_000);
+        Map<String, Object> summary = new LinkedHashMap<>();
+        summary.put("batchId", id);
+        summary.put("documents", documents);
+        summary.put("counts", new LinkedHashMap<>(counts));
+        summary.put("elapsedMs", elapsedMillis);
+        summary.put("docsPerMinute", documents * 60_000.0 / elapsedMillis);
+        emit("summary", summary);
+        return Optional.of(summary);
+    }
+}
+```
+
+### trace/RunTrace.java
+```java
+package com.example.brdmultiagent.trace;
+
+import java.time.Instant;
+import java.util.ArrayList;
+import java.util.Comparator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+// Every node, LLM call and tool call of one graph run, in start order. Spans arrive from the job thread
+// and from tool/analysis worker threads, hence the synchronized methods.
+public class RunTrace {
+    private static final int MAX_SPANS = 2000;
+
+    public record Span(String kind, String name, long startMs, long durationMs, long promptTokens,
+                       long completionTokens, int retries, long inBytes, long outBytes, String error) {
+    }
+
+    private final String runId;
+    private final Instant startedAt = Instant.now();
+    private final long startNanos = System.nanoTime();
+    private final List<Span> spans = new ArrayList<>();
+    private int dropped;
+    private long durationMs = -1;
+
+    RunTrace(String runId) {
+        this.runId = runId;
+    }
+
+    public String getRunId() {
+        return runId;
+    }
+
+    public synchronized long getDurationMs() {
+        return durationMs >= 0 ? durationMs : (System.nanoTime() - startNanos) / 1_000_000;
+    }
+
+    long offsetMs(long nanoTime) {
+        return (nanoTime - startNanos) / 1_000_000;
+    }
+
+    synchronized void add(Span span) {
+        if (spans.size() < MAX_SPANS) {
+            spans.add(span);
+        } else {
+            dropped++;
+        }
+    }
+
+    synchronized void finish() {
+        durationMs = (System.nanoTime() - startNanos) / 1_000_000;
+    }
+
+    // Prompt + completion tokens of every LLM span so far
+    public synchronized long totalTokens() {
+        long tokens = 0;
+        for (Span span : spans) {
+            if ("llm".equals(span.kind())) {
+                tokens += span.promptTokens() + span.completionTokens();
+            }
+        }
+        return tokens;
+    }
+
+    // Totals per (kind, name), most expensive first: what the slow-run report shows
+    public synchronized List<Map<String, Object>> breakdown() {
+        Map<String, long[]> totals = new LinkedHashMap<>(); // count, totalMs, maxMs, prompt, completion, retries, in, out
+        for (Span span : spans) {
+            long[] t = totals.computeIfAbsent(span.kind() + ":" + span.name(), k -> new long[8]);
+            t[0]++;
+            t[1] += span.durationMs();
+            t[2] = Math.max(t[2], span.durationMs());
+            t[3] += span.promptTokens();
+            t[4] += span.completionTokens();
+            t[5] += span.retries();
+            t[6] += span.inBytes();
+            t[7] += span.outBytes();
+        }
+        List<Map<String, Object>> rows = new ArrayList<>(totals.size());
+        totals.forEach((key, t) -> {
+            Map<String, Object> row = new LinkedHashMap<>();
+            row.put("kind", key.substring(0, key.indexOf(':')));
+            row.put("name", key.substring(key.indexOf(':') + 1));
+            row.put("count", t[0]);
+            row.put("totalMs", t[1]);
+            row.put("maxMs", t[2]);
+            row.put("promptTokens", t[3]);
+            row.put("completionTokens", t[4]);
+            row.put("retries", t[5]);
+            row.put("inBytes", t[6]);
+            row.put("outBytes", t[7]);
+            rows.add(row);
+        });
+        rows.sort(Comparator.comparingLong((Map<String, Object> row) -> (Long) row.get("totalMs")).reversed());
+        return rows;
+    }
+
+    public synchronized Map<String, Object> toView(boolean includeSpans) {
+        Map<String, Object> view = new LinkedHashMap<>();
+        view.put("runId", runId);
+        view.put("startedAt", startedAt.toString());
+        view.put("durationMs", getDurationMs());
+        long promptTokens = 0;
+        long completionTokens = 0;
+        for (Span span : spans) {
+            if ("llm".equals(span.kind())) {
+                promptTokens += span.promptTokens();
+                completionTokens += span.completionTokens();
+            }
+        }
+        view.put("promptTokens", promptTokens);
+        view.put("completionTokens", completionTokens);
+        view.put("breakdown", breakdown());
+        if (includeSpans) {
+            view.put("spans", List.copyOf(spans));
+            view.put("droppedSpans", dropped);
+        }
+        return view;
+    }
+}
+```
+
+### trace/RunTracer.java
+```java
+package com.example.brdmultiagent.trace;
+
+import com.example.brdmultiagent.llm.LlmCallContext;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.Comparator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+import java.util.PriorityQueue;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.TimeUnit;
+import java.util.function.Function;
+import java.util.function.Supplier;
+
+// Spans are attached to the active trace of LlmCallContext.currentRun(); calls made outside a run (or on
+// threads that did not re-apply the run, e.g. reactor threads of a streamed response) still get metrics.
+@Component
+public class RunTracer {
+    private static final Logger logger = LoggerFactory.getLogger(RunTracer.class);
+    // Retries of the innermost open span on this thread (HTTP retries, 429 retries)
+    private static final ThreadLocal<int[]> RETRIES = ThreadLocal.withInitial(() -> new int[1]);
+
+    private final MeterRegistry meterRegistry;
+    private final Map<String, RunTrace> active = new ConcurrentHashMap<>();
+    private final int slowRunsKept;
+    private final long slowRunThresholdMs;
+    private final PriorityQueue<RunTrace> slowest = new PriorityQueue<>(Comparator.comparingLong(RunTrace::getDurationMs));
+    private final Map<String, RunTrace> recent; // Finished traces, until the job picks them up (LRU)
+
+    public RunTracer(MeterRegistry meterRegistry,
+                     @Value("${brd.trace.slow-runs-kept:20}") int slowRunsKept,
+                     @Value("${brd.trace.slow-run-threshold-ms:120000}") long slowRunThresholdMs,
+                     @Value("${brd.trace.recent-runs:200}") int recentRuns) {
+        this.meterRegistry = meterRegistry;
+        this.slowRunsKept = slowRunsKept;
+        this.slowRunThresholdMs = slowRunThresholdMs;
+        this.recent = Collections.synchronizedMap(new LinkedHashMap<>(64, 0.75f, true) {
+            @Override
+            protected boolean removeEldestEntry(Map.Entry<String, RunTrace> eldest) {
+                return size() > recentRuns;
+            }
+        });
+    }
+
+    public RunTrace start(String runId) {
+        RunTrace trace = new RunTrace(runId);
+        active.put(runId, trace);
+        return trace;
+    }
+
+    public void finish(RunTrace trace) {
+        trace.finish();
+        active.remove(trace.getRunId());
+        recent.put(trace.getRunId(), trace);
+        meterRegistry.timer("brd.run.duration").record(trace.getDurationMs(), TimeUnit.MILLISECONDS);
+        synchronized (slowest) {
+            slowest.add(trace);
+            if (slowest.size() > slowRunsKept) {
+                slowest.poll(); // Drop the fastest of the kept runs
+            }
+        }
+        if (trace.getDurationMs() >= slowRunThresholdMs) {
+            List<Map<String, Object>> top = trace.breakdown();
+            logger.warn("Slow BRD run {} took {} ms; top offenders: {}", trace.getRunId(), trace.getDurationMs(),
+                    top.subList(0, Math.min(3, top.size())));
+        }
+    }
+
+    public Optional<RunTrace> find(String runId) {
+        return Optional.ofNullable(recent.get(runId));
+    }
+
+    // The in-progress trace of the run on this thread
+    public Optional<RunTrace> current() {
+        String run = LlmCallContext.currentRun();
+        return Optional.ofNullable(run == null ? null : active.get(run));
+    }
+
+    // Slowest recent runs, slowest first, each with its per-node/tool/LLM breakdown
+    public List<Map<String, Object>> slowRuns(int limit) {
+        List<RunTrace> runs;
+        synchronized (slowest) {
+            runs = new ArrayList<>(slowest);
+        }
+        runs.sort(Comparator.comparingLong(RunTrace::getDurationMs).reversed());
+        List<Map<String, Object>> report = new ArrayList<>();
+        for (RunTrace run : runs.subList(0, Math.min(limit, runs.size()))) {
+            report.add(run.toView(false));
+        }
+        return report;
+    }
+
+    public <T> T node(String node, Supplier<T> call) {
+        long start = System.nanoTime();
+        String error = null;
+        try {
+            return call.get();
+        } catch (RuntimeException e) {
+            error = e.getClass().getSimpleName();
+            throw e;
+        } finally {
+            long nanos = System.nanoTime() - start;
+            meterRegistry.timer("brd.graph.node", "node", node, "outcome", error == null ? "ok" : "error")
+                    .record(nanos, TimeUnit.NANOSECONDS);
+            record("node", node, start, nanos, 0, 0, 0, 0, 0, error);
+        }
+    }
+
+    // Wraps a String -> String tool function (FunctionCallback target); sizes are UTF-8 bytes
+    public Function<String, String> tool(String name, Function<String, String> tool) {
+        return input -> {
+            long start = System.nanoTime();
+            int savedRetries = enterSpan();
+            String output = null;
+            String error = null;
+            try {
+                output = tool.apply(input);
+                return output;
+            } catch (RuntimeException e) {
+                error = e.getClass().getSimpleName();
+                throw e;
+            } finally {
+                long nanos = System.nanoTime() - start;
+                int retries = exitSpan(savedRetries);
+                long inBytes = bytes(input);
+                long outBytes = bytes(output);
+                Timer.builder("brd.tool.call").tag("tool", name).tag("outcome", error == null ? "ok" : "error")
+                        .register(meterRegistry).record(nanos, TimeUnit.NANOSECONDS);
+                meterRegistry.summary("brd.tool.payload", "tool", name, "direction", "in").record(inBytes);
+                meterRegistry.summary("brd.tool.payload", "tool", name, "direction", "out").record(outBytes);
+                if (retries > 0) {
+                    meterRegistry.counter("brd.tool.retries", "tool", name).increment(retries);
+                }
+                record("tool", name, start, nanos, 0, 0, retries, inBytes, outBytes, error);
+            }
+        };
+    }
+
+    public void llmCall(String caller, long startNanos, long nanos, long promptTokens, long completionTokens,
+                        int retries, long inChars, long outChars, String error) {
+        String name = caller == null ? "other" : caller;
+        meterRegistry.timer("brd.llm.call", "caller", name, "outcome", error == null ? "ok" : "error")
+                .record(nanos, TimeUnit.NANOSECONDS);
+        meterRegistry.counter("brd.llm.tokens", "caller", name, "type", "prompt").increment(promptTokens);
+        meterRegistry.counter("brd.llm.tokens", "caller", name, "type", "completion").increment(completionTokens);
+        if (retries > 0) {
+            meterRegistry.counter("brd.llm.retries", "caller", name).increment(retries);
+        }
+        record("llm", name, startNanos, nanos, promptTokens, completionTokens, retries, inChars, outChars, error);
+    }
+
+    // Span bookkeeping for retry counts: enter returns the outer span's count, exit restores it
+    public static int enterSpan() {
+        int[] retries = RETRIES.get();
+        int saved = retries[0];
+        retries[0] = 0;
+        return saved;
+    }
+
+    public static int exitSpan(int saved) {
+        int[] retries = RETRIES.get();
+        int own = retries[0];
+        retries[0] = saved;
+        return own;
+    }
+
+    public static void countRetry() {
+        RETRIES.get()[0]++;
+    }
+
+    private void record(String kind, String name, long startNanos, long nanos, long promptTokens,
+                        long completionTokens, int retries, long inBytes, long outBytes, String error) {
+        String run = LlmCallContext.currentRun();
+        RunTrace trace = run == null ? null : active.get(run);
+        if (trace != null) {
+            trace.add(new RunTrace.Span(kind, name, trace.offsetMs(startNanos), nanos / 1_000_000, promptTokens,
+                    completionTokens, retries, inBytes, outBytes, error));
+        }
+    }
+
+    private static long bytes(String value) {
+        return value == null ? 0 : value.getBytes(StandardCharsets.UTF_8).length;
+    }
+}
+```
+
+### upload/UploadRegistry.java
+```java
+package com.example.brdmultiagent.upload;
+
+import io.micrometer.core.instrument.Counter;
+import io.micrometer.core.instrument.DistributionSummary;
+import io.micrometer.core.instrument.MeterRegistry;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+import org.springframework.web.multipart.MultipartFile;
+
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.Map;
+import java.util.Optional;
+import java.util.UUID;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+// Live uploads, addressed by the upload://<id> reference the agents pass to documentExtractorTool
+@Component
+public class UploadRegistry {
+    private static final Logger logger = LoggerFactory.getLogger(UploadRegistry.class);
+    private static final Pattern REFERENCE = Pattern.compile("upload://([0-9a-f\\-]{36})");
+    private static final Pattern DESCRIBED_REFERENCE = Pattern.compile("upload://([0-9a-f\\-]{36})( \\([^)\\n]*\\))?");
+
+    private final Map<String, UploadHandle> uploads = new ConcurrentHashMap<>();
+    private final long maxBytes;
+    private final long memoryThresholdBytes;
+    private final AtomicLong liveBytes = new AtomicLong();
+    private final DistributionSummary uploadSizes;
+    private final Counter spilled;
+
+    public UploadRegistry(MeterRegistry meterRegistry,
+                          @Value("${brd.upload.max-bytes:52428800}") long maxBytes,
+                          @Value("${brd.upload.memory-threshold-bytes:8388608}") long memoryThresholdBytes) {
+        this.maxBytes = maxBytes;
+        this.memoryThresholdBytes = memoryThresholdBytes;
+        this.uploadSizes = DistributionSummary.builder("brd.upload.bytes").baseUnit("bytes").register(meterRegistry);
+        this.spilled = meterRegistry.counter("brd.upload.spilled");
+        meterRegistry.gauge("brd.upload.live", uploads, Map::size);
+        meterRegistry.gauge("brd.upload.live.bytes", liveBytes, AtomicLong::get);
+    }
+
+    // Small uploads stay in memory and never touch disk; larger ones get exactly one temp file, which
+    // transferTo can usually satisfy by moving the container's own spool file instead of copying it
+    public UploadHandle register(MultipartFile file) throws IOException {
+        if (file.isEmpty()) {
+            throw new IllegalArgumentException("Empty upload");
+        }
+        if (file.getSize() > maxBytes) {
+            throw new UploadTooLargeException(file.getSize(), maxBytes);
+        }
+        String id = UUID.randomUUID().toString();
+        String filename = file.getOriginalFilename() == null ? "brd" : file.getOriginalFilename();
+        UploadHandle handle;
+        if (file.getSize() <= memoryThresholdBytes) {
+            // One exactly-sized array; getBytes() goes through a growing buffer and copies again
+            byte[] bytes;
+            try (InputStream in = file.getInputStream()) {
+                bytes = in.readNBytes((int) file.getSize());
+            }
+            handle = new UploadHandle(id, filename, bytes, null, this::onReleased);
+        } else {
+            Path spillFile = Files.createTempFile("brd-upload-", ".bin");
+            file.transferTo(spillFile);
+            handle = new UploadHandle(id, filename, null, spillFile, this::onReleased);
+            spilled.increment();
+        }
+        return track(handle);
+    }
+
+    // For sources of unknown size (zip entries): same memory/spill policy, with the size limit enforced
+    // while reading. Does not close the stream.
+    public UploadHandle register(String filename, InputStream content) throws IOException {
+        byte[] head = content.readNBytes((int) Math.min(memoryThresholdBytes, maxBytes) + 1);
+        if (head.length == 0) {
+            throw new IllegalArgumentException("Empty upload: " + filename);
+        }
+        if (head.length > maxBytes) {
+            throw new UploadTooLargeException(head.length, maxBytes);
+        }
+        String id = UUID.randomUUID().toString();
+        if (head.length <= memoryThresholdBytes) {
+            return track(new UploadHandle(id, filename, head, null, this::onReleased));
+        }
+        Path spillFile = Files.createTempFile("brd-upload-", ".bin");
+        try (OutputStream out = Files.newOutputStream(spillFile)) {
+            out.write(head);
+            long total = head.length;
+            byte[] buffer = new byte[64 * 1024];
+            int read;
+            while ((read = content.read(buffer)) != -1) {
+                total += read;
+                if (total > maxBytes) {
+                    throw new UploadTooLargeException(total, maxBytes);
+                }
+                out.write(buffer, 0, read);
+            }
+        } catch (IOException | RuntimeException e) {
+            Files.deleteIfExists(spillFile);
+            throw e;
+        }
+        spilled.increment();
+        return track(new UploadHandle(id, filename, null, spillFile, this::onReleased));
+    }
+
+    private UploadHandle track(UploadHandle handle) {
+        uploads.put(handle.id(), handle);
+        liveBytes.addAndGet(handle.size());
+        uploadSizes.record(handle.size());
+        return handle;
+    }
+
+    // Finds an upload:// reference anywhere in the tool argument and takes a reference on it;
+    // the caller must release() it. Empty for plain paths or uploads that are already gone.
+    public Optional<UploadHandle> acquire(String text) {
+        if (text == null) {
+            return Optional.empty();
+        }
+        Matcher matcher = REFERENCE.matcher(text);
+        if (!matcher.find()) {
+            return Optional.empty();
+        }
+        UploadHandle handle = uploads.get(matcher.group(1));
+        return handle != null && handle.retain() ? Optional.of(handle) : Optional.empty();
+    }
+
+    // Replaces every live upload://<id> (filename) with its content hash, so text that differs only by which
+    // upload of a document it names compares equal (LLM cache keys). Unknown or released ids are left as they are.
+    public String normalizeReferences(String text) {
+        if (text == null || !text.contains("upload://")) {
+            return text;
+        }
+        Matcher matcher = DESCRIBED_REFERENCE.matcher(text);
+        StringBuilder normalized = new StringBuilder(text.length());
+        while (matcher.find()) {
+            String hash = null;
+            Optional<UploadHandle> handle = acquire(matcher.group());
+            if (handle.isPresent()) {
+                try {
+                    hash = handle.get().contentHash();
+                } catch (IOException e) {
+                    logger.debug("Could not hash upload {}", matcher.group(1), e);
+                } finally {
+                    handle.get().release();
+                }
+            }
+            matcher.appendReplacement(normalized, Matcher.quoteReplacement(hash != null ? "upload:sha256:" + hash : matcher.group()));
+        }
+        matcher.appendTail(normalized);
+        return normalized.toString();
+    }
+
+    private void onReleased(UploadHandle handle) {
+        uploads.remove(handle.id());
+        liveBytes.addAndGet(-handle.size());
+        if (handle.path() != null) {
+            try {
+                Files.deleteIfExists(handle.path());
+            } catch (IOException e) {
+                logger.warn("Failed to delete upload spill file {}", handle.path(), e);
+            }
+        }
+    }
+}
+```
+
+### upload/UploadHandle.java
+```java
+package com.example.brdmultiagent.upload;
+
+import java.io.ByteArrayInputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.HexFormat;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.function.Consumer;
+
+// The request owns one reference (released by close()); each tool read takes and releases its own.
+// Whoever drops the count to zero frees the bytes / deletes the spill file, so cleanup is deterministic.
+public class UploadHandle implements AutoCloseable {
+
+    private final String id;
+    private final String filename;
+    private final byte[] bytes; // In-memory upload, or null when spilled
+    private final Path path;    // Spill file, or null when in memory
+    private final long size;
+    private final Consumer<UploadHandle> onReleased;
+    private final AtomicInteger refs = new AtomicInteger(1);
+    private final AtomicBoolean ownerClosed = new AtomicBoolean();
+    private volatile String contentHash; // SHA-256 of the bytes, computed on first use
+
+    UploadHandle(String id, String filename, byte[] bytes, Path path, Consumer<UploadHandle> onReleased) throws IOException {
+        this.id = id;
+        this.filename = filename;
+        this.bytes = bytes;
+        this.path = path;
+        this.size = bytes != null ? bytes.length : Files.size(path);
+        this.onReleased = onReleased;
+    }
+
+    public String id() { return id; }
+    public String filename() { return filename; }
+    public byte[] bytes() { return bytes; }
+    public Path path() { return path; }
+    public long size() { return size; }
+
+    public String reference() {
+        return "upload://" + id;
+    }
+
+    // How the upload is named in a run's initial prompt
+    public String describe() {
+        return reference() + " (" + filename + ")";
+    }
+
+    public InputStream openStream() throws IOException {
+        return bytes != null ? new ByteArrayInputStream(bytes) : Files.newInputStream(path);
+    }
+
+    public String contentHash() throws IOException {
+        String hash = contentHash;
+        if (hash == null) {
+            try (InputStream in = openStream()) {
+                MessageDigest digest = MessageDigest.getInstance("SHA-256");
+                byte[] buffer = new byte[64 * 1024];
+                int read;
+                while ((read = in.read(buffer)) != -1) {
+                    digest.update(buffer, 0, read);
+                }
+                hash = HexFormat.of().formatHex(digest.digest());
+            } catch (NoSuchAlgorithmException e) {
+                throw new IllegalStateException(e);
+            }
+            contentHash = hash;
+        }
+        return hash;
+    }
+
+    boolean retain() {
+        int current;
+        do {
+            current = refs.get();
+            if (current == 0) {
+                return false; // Already released
+            }
+        } while (!refs.compareAndSet(current, current + 1));
+        return true;
+    }
+
+    public void release() {
+        if (refs.decrementAndGet() == 0) {
+            onReleased.accept(this);
+        }
+    }
+
+    @Override
+    public void close() {
+        if (ownerClosed.compareAndSet(false, true)) {
+            release();
+        }
+    }
+}
+```
+
+### upload/UploadTooLargeException.java
+```java
+package com.example.brdmultiagent.upload;
+
+public class UploadTooLargeException extends RuntimeException {
+    public UploadTooLargeException(long size, long maxBytes) {
+        super("Upload of " + size + " bytes exceeds the " + maxBytes + " byte limit");
+    }
+}
+```
+
+### job/BrdJob.java
+```java
+package com.example.brdmultiagent.job;
+
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.trace.RunTrace;
+
+import java.time.Duration;
+import java.time.Instant;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.concurrent.Future;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicReference;
+
+public class BrdJob {
+
+    public enum Status { QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED }
+
+    private final String id;
+    private final String initialInput;
+    private final Instant submittedAt = Instant.now();
+    private volatile Instant startedAt;
+    private volatile Instant finishedAt;
+    private final AtomicReference<Status> status = new AtomicReference<>(Status.QUEUED);
+    private volatile String result;
+    private volatile String error;
+    private volatile Future<?> future;
+    private final GraphEventListener listener;
+    private final AutoCloseable resource; // Released exactly once when the job ends or is cancelled
+    private final AtomicBoolean resourceClosed = new AtomicBoolean();
+    private final AgentState resumeState; // Non-null when resuming from a checkpoint
+    private volatile RunTrace trace;
+
+    public BrdJob(String id, String initialInput, GraphEventListener listener, AutoCloseable resource) {
+        this(id, initialInput, listener, resource, null);
+    }
+
+    BrdJob(String id, String initialInput, GraphEventListener listener, AutoCloseable resource, AgentState resumeState) {
+        this.id = id;
+        this.initialInput = initialInput;
+        this.listener = listener;
+        this.resource = resource;
+        this.resumeState = resumeState;
+    }
+
+    AgentState getResumeState() { return resumeState; }
+
+    // Per-node/LLM/tool timings of the run, available once it finishes
+    public RunTrace getTrace() { return trace; }
+    void setTrace(RunTrace trace) { this.trace = trace; }
+
+    void closeResource() {
+        if (resource != null && resourceClosed.compareAndSet(false, true)) {
+            try {
+                resource.close();
+            } catch (Exception e) {
+                // Best effort; the upload registry logs its own cleanup failures
+            }
+        }
+    }
+
+    public String getId() { return id; }
+    public String getInitialInput() { return initialInput; }
+    public GraphEventListener getListener() { return listener; }
+    public Status getStatus() { return status.get(); }
+    public String getResult() { return result; }
+    public String getError() { return error; }
+    public Instant getFinishedAt() { return finishedAt; }
+    Future<?> getFuture() { return future; }
+    void setFuture(Future<?> future) { this.future = future; }
+
+    // False when the job was cancelled while queued
+    boolean markRunning() {
+        Instant now = Instant.now();
+        if (!status.compareAndSet(Status.QUEUED, Status.RUNNING)) {
+            return false;
+        }
+        startedAt = now;
+        return true;
+    }
+
+    // The mark* methods race between the worker and cancel(); only the first terminal state wins.
+    // Result/error are written before the transition so a reader that sees the status also sees them.
+    boolean markSucceeded(String result) {
+        this.result = result;
+        return finish(Status.SUCCEEDED);
+    }
+
+    boolean markFailed(String error) {
+        if (isDone()) {
+            return false;
+        }
+        this.error = error;
+        return finish(Status.FAILED);
+    }
+
+    boolean markCancelled() {
+        return finish(Status.CANCELLED);
+    }
+
+    private boolean finish(Status finalStatus) {
+        Instant now = Instant.now();
+        for (Status current = status.get(); current == Status.QUEUED || current == Status.RUNNING; current = status.get()) {
+            if (status.compareAndSet(current, finalStatus)) {
+                finishedAt = now;
+                return true;
+            }
+        }
+        return false;
+    }
+
+    public boolean isDone() {
+        Status current = status.get();
+        return current == Status.SUCCEEDED || current == Status.FAILED || current == Status.CANCELLED;
+    }
+
+    // Time spent waiting for a worker; large values mean the pool is undersized
+    public Duration getQueueWait() {
+        Instant end = startedAt != null ? startedAt : (finishedAt != null ? finishedAt : Instant.now());
+        return Duration.between(submittedAt, end);
+    }
+
+    public Duration getRunTime() {
+        if (startedAt == null) {
+            return Duration.ZERO;
+        }
+        return Duration.between(startedAt, finishedAt != null ? finishedAt : Instant.now());
+    }
+
+    public Map<String, Object> toStatus() {
+        Map<String, Object> view = new LinkedHashMap<>();
+        view.put("jobId", id);
+        view.put("status", status.get().name());
+        view.put("submittedAt", submittedAt.toString());
+        view.put("queueWaitMs", getQueueWait().toMillis());
+        view.put("runTimeMs", getRunTime().toMillis());
+        if (error != null) {
+            view.put("error", error);
+        }
+        return view;
+    }
+}
+```
+
+### job/BrdJobService.java
+```java
+package com.example.brdmultiagent.job;
+
+import com.example.brdmultiagent.checkpoint.CheckpointStore;
+import com.example.brdmultiagent.graph.BrdWorkflowGraph;
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.GraphEventListener;
+import com.example.brdmultiagent.trace.RunTracer;
+import com.example.brdmultiagent.upload.UploadHandle;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Timer;
+import jakarta.annotation.PreDestroy;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Service;
+
+import java.time.Duration;
+import java.time.Instant;
+import java.util.Map;
+import java.util.Optional;
+import java.util.UUID;
+import java.util.concurrent.*;
+import java.util.concurrent.atomic.AtomicInteger;
+
+@Service
+public class BrdJobService {
+    private static final Logger logger = LoggerFactory.getLogger(BrdJobService.class);
+
+    private final BrdWorkflowGraph workflowGraph;
+    private final CheckpointStore checkpointStore;
+    private final UploadRegistry uploads;
+    private final RunTracer runTracer;
+    private final ThreadPoolExecutor executor;
+    private final Map<String, BrdJob> jobs = new ConcurrentHashMap<>();
+    private final Duration retention;
+    private final Timer queueWaitTimer;
+    private final Timer runTimer;
+    private final MeterRegistry meterRegistry;
+
+    public BrdJobService(BrdWorkflowGraph workflowGraph,
+                         CheckpointStore checkpointStore,
+                         UploadRegistry uploads,
+                         RunTracer runTracer,
+                         MeterRegistry meterRegistry,
+                         @Value("${brd.jobs.pool-size:4}") int poolSize,
+                         @Value("${brd.jobs.queue-capacity:50}") int queueCapacity,
+                         @Value("${brd.jobs.retention-minutes:60}") long retentionMinutes) {
+        this.workflowGraph = workflowGraph;
+        this.checkpointStore = checkpointStore;
+        this.uploads = uploads;
+        this.runTracer = runTracer;
+        this.meterRegistry = meterRegistry;
+        this.retention = Duration.ofMinutes(retentionMinutes);
+
+        // Bounded queue + AbortPolicy: when full, submit() throws and the controller answers 429
+        AtomicInteger threadCount = new AtomicInteger();
+        this.executor = new ThreadPoolExecutor(poolSize, poolSize, 0L, TimeUnit.MILLISECONDS,
+                new ArrayBlockingQueue<>(queueCapacity),
+                r -> new Thread(r, "brd-job-" + threadCount.incrementAndGet()),
+                new ThreadPoolExecutor.AbortPolicy());
+
+        meterRegistry.gauge("brd.jobs.queue.depth", executor, e -> e.getQueue().size());
+        meterRegistry.gauge("brd.jobs.active", executor, ThreadPoolExecutor::getActiveCount);
+        meterRegistry.gauge("brd.jobs.pool.size", executor, ThreadPoolExecutor::getMaximumPoolSize);
+        this.queueWaitTimer = Timer.builder("brd.jobs.queue.wait").register(meterRegistry);
+        this.runTimer = Timer.builder("brd.jobs.run").register(meterRegistry);
+    }
+
+    public BrdJob submit(String initialInput) {
+        return submit(initialInput, null, null);
+    }
+
+    // Streaming runs share the same bounded pool. The listener gets "queued" before the job can start and exactly one
+    // of "done"/"error"/"cancelled" at the end, after the job's status is final. The resource (typically the upload) is closed when the job finishes, fails, is cancelled or rejected.
+    public BrdJob submit(String initialInput, GraphEventListener listener, AutoCloseable resource) {
+        BrdJob job = new BrdJob(UUID.randomUUID().toString(), initialInput, listener, resource);
+        jobs.put(job.getId(), job);
+        return enqueue(job);
+    }
+
+    // Re-runs a failed/cancelled/interrupted job from its last checkpoint, under the same job id.
+    // Works after a JVM restart too, as long as BA has finished or the uploaded BRD is still live.
+    // IllegalArgumentException for a malformed id, IllegalStateException when the job can't be resumed now.
+    public Optional<BrdJob> resume(String jobId) {
+        if (!CheckpointStore.isValidRunId(jobId)) {
+            throw new IllegalArgumentException("Invalid job id: " + jobId);
+        }
+        Optional<AgentState> checkpoint = checkpointStore.load(jobId);
+        if (checkpoint.isEmpty()) {
+            return Optional.empty();
+        }
+        BrdJob job = new BrdJob(jobId, null, null, requiredUpload(jobId, checkpoint.get()), checkpoint.get());
+        try {
+            // Atomic check-and-replace, so two concurrent resumes can't both enqueue
+            jobs.compute(jobId, (id, existing) -> {
+                if (existing != null && !existing.isDone()) {
+                    throw new IllegalStateException("Job " + jobId + " is still " + existing.getStatus());
+                }
+                return job;
+            });
+        } catch (IllegalStateException e) {
+            job.closeResource();
+            throw e;
+        }
+        return Optional.of(enqueue(job));
+    }
+
+    // The first attempt released its upload when it ended. Until BA has produced scenarios the extractor still
+    // needs the document, and without it would hand BA the mock fallback, so the upload must still be live.
+    private UploadHandle requiredUpload(String jobId, AgentState state) {
+        if (state.getLatestOutput("ba_agent") != null || state.getMessages().isEmpty()) {
+            return null;
+        }
+        String initialInput = state.getMessages().get(0).getContent();
+        if (initialInput == null || !initialInput.contains("upload://")) {
+            return null; // Plain file path; nothing to hold
+        }
+        return uploads.acquire(initialInput).orElseThrow(() -> new IllegalStateException(
+                "Upload of job " + jobId + " is gone and BA had not finished; upload the BRD again"));
+    }
+
+    private BrdJob enqueue(BrdJob job) {
+        evictExpired();
+        notify(job, "queued", job.toStatus()); // Before submit, so it precedes every event from the worker
+        try {
+            job.setFuture(executor.submit(() -> execute(job)));
+        } catch (RejectedExecutionException e) {
+            job.closeResource();
+            jobs.remove(job.getId());
+            meterRegistry.counter("brd.jobs.rejected").increment();
+            throw e;
+        }
+        logger.info("Queued BRD job {} (queue depth {})", job.getId(), getQueueDepth());
+        return job;
+    }
+
+    private void execute(BrdJob job) {
+        if (!job.markRunning()) {
+            return; // Cancelled while queued
+        }
+        queueWaitTimer.record(job.getQueueWait());
+        boolean finished; // False when cancel() got there first; it has already notified the listener
+        try {
+            String result = job.getResumeState() != null
+                    ? workflowGraph.resume(job.getResumeState(), job.getListener())
+                    : workflowGraph.run(job.getId(), job.getInitialInput(), job.getListener());
+            finished = job.markSucceeded(result);
         } catch (Exception e) {
-            return "Mock extracted content: BRD requirements..."; // Fallback
+            if (Thread.currentThread().isInterrupted()) {
+                finished = job.markCancelled();
+            } else {
+                logger.error("BRD job {} failed", job.getId(), e);
+                finished = job.markFailed(e.getMessage());
+            }
+        } finally {
+            job.closeResource();
+            runTracer.find(job.getId()).ifPresent(job::setTrace);
+            runTimer.record(job.getRunTime());
+            meterRegistry.counter("brd.jobs.completed", "status", job.getStatus().name()).increment();
+            logger.info("BRD job {} {} (queued {} ms, ran {} ms)", job.getId(), job.getStatus(),
+                    job.getQueueWait().toMillis(), job.getRunTime().toMillis());
+        }
+        if (finished) {
+            notifyFinished(job);
+        }
+    }
+
+    private void notifyFinished(BrdJob job) {
+        switch (job.getStatus()) {
+            case SUCCEEDED -> notify(job, "done", Map.of("jobId", job.getId(), "result", job.getResult()));
+            case FAILED -> notify(job, "error", Map.of("jobId", job.getId(), "error", String.valueOf(job.getError())));
+            default -> notify(job, "cancelled", Map.of("jobId", job.getId()));
+        }
+    }
+
+    // A listener failure (e.g. the client's stream already closed) never changes the job's outcome
+    private void notify(BrdJob job, String event, Map<String, Object> data) {
+        if (job.getListener() == null) {
+            return;
+        }
+        try {
+            job.getListener().onEvent(event, data);
+        } catch (RuntimeException e) {
+            logger.warn("Listener of BRD job {} failed on {}", job.getId(), event, e);
+        }
+    }
+
+    public Optional<BrdJob> find(String id) {
+        return Optional.ofNullable(jobs.get(id));
+    }
+
+    public void cancel(BrdJob job) {
+        if (!job.markCancelled()) {
+            return; // Already finished; keep its status
+        }
+        Future<?> future = job.getFuture();
+        if (future != null) {
+            future.cancel(true); // Removes a queued task, interrupts a running one
+        }
+        job.closeResource(); // A queued task never reaches execute(); tools still reading hold their own reference
+        notifyFinished(job); // execute() skips its notification once the job is cancelled, queued or not
+    }
+
+    public int getQueueDepth() {
+        return executor.getQueue().size();
+    }
+
+    public Map<String, Object> stats() {
+        return Map.of(
+                "poolSize", executor.getMaximumPoolSize(),
+                "active", executor.getActiveCount(),
+                "queueDepth", executor.getQueue().size(),
+                "queueRemainingCapacity", executor.getQueue().remainingCapacity(),
+                "completed", executor.getCompletedTaskCount(),
+                "trackedJobs", jobs.size(),
+                "meanQueueWaitMs", queueWaitTimer.mean(TimeUnit.MILLISECONDS),
+                "meanRunMs", runTimer.mean(TimeUnit.MILLISECONDS));
+    }
+
+    private void evictExpired() {
+        Instant cutoff = Instant.now().minus(retention);
+        jobs.values().removeIf(job -> job.isDone() && job.getFinishedAt() != null && job.getFinishedAt().isBefore(cutoff));
+    }
+
+    @PreDestroy
+    public void shutdown() {
+        executor.shutdownNow();
+    }
+}
+```
+
+### bench/GraphCompileBenchmark.java
+(JMH, test scope. Measures the graph setup cost that used to be paid on every `/upload-brd`; agents are mocks, so only build/compile is timed, not LLM calls. Run with `mvn test-compile exec:java -Dexec.classpathScope=test -Dexec.mainClass=org.openjdk.jmh.Main -Dexec.args="GraphCompileBenchmark"`.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.agent.BAAgent;
+import com.example.brdmultiagent.agent.CodingAgent;
+import com.example.brdmultiagent.agent.DevAgent;
+import com.example.brdmultiagent.agent.SupervisorAgent;
+import com.example.brdmultiagent.checkpoint.CheckpointStore;
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.BrdWorkflowGraph;
+import com.example.brdmultiagent.graph.LoopGuard;
+import com.example.brdmultiagent.graph.SpeculativePrefetch;
+import com.example.brdmultiagent.trace.RunTracer;
+import dev.langchain4j.langgraph.CompiledGraph;
+import org.openjdk.jmh.annotations.*;
+
+import java.util.concurrent.TimeUnit;
+
+import static org.mockito.Mockito.mock;
+
+@State(Scope.Benchmark)
+@BenchmarkMode({Mode.Throughput, Mode.SampleTime})
+@OutputTimeUnit(TimeUnit.MICROSECONDS)
+@Warmup(iterations = 3, time = 2)
+@Measurement(iterations = 5, time = 2)
+@Fork(1)
+public class GraphCompileBenchmark {
+
+    private BrdWorkflowGraph workflowGraph;
+
+    @Setup
+    public void setup() {
+        // Startup cost: construction compiles the graph once
+        workflowGraph = new BrdWorkflowGraph(mock(SupervisorAgent.class), mock(BAAgent.class),
+                mock(DevAgent.class), mock(CodingAgent.class), mock(CheckpointStore.class), mock(RunTracer.class),
+                mock(LoopGuard.class), mock(SpeculativePrefetch.class));
+    }
+
+    // Old behaviour: every request rebuilt the StateGraph and compiled it
+    @Benchmark
+    @Threads(16)
+    public CompiledGraph<AgentState> perRequestCompile() {
+        return workflowGraph.buildGraph().compile();
+    }
+
+    // Steady state: requests reuse the graph compiled at startup
+    @Benchmark
+    @Threads(16)
+    public CompiledGraph<AgentState> sharedCompiledGraph() {
+        return workflowGraph.getCompiledGraph();
+    }
+}
+```
+
+### bench/ExtractionCacheBenchmark.java
+(JMH, test scope. Generates a corpus of large text-only PDFs in @Setup and compares a cold PDFBox pass (1 vs 4 page-range workers, full text and time-to-first-chunk) with memory- and disk-tier hits. The hit paths still include the SHA-256 over the file, since every real call pays it.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.tool.DocumentChunk;
+import com.example.brdmultiagent.tool.DocumentChunks;
+import com.example.brdmultiagent.tool.DocumentExtractorTool;
+import com.example.brdmultiagent.tool.ExtractionCache;
+import com.example.brdmultiagent.tool.PageParallelExtractor;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import io.micrometer.core.instrument.simple.SimpleMeterRegistry;
+import org.openjdk.jmh.annotations.*;
+
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.concurrent.TimeUnit;
+
+@State(Scope.Benchmark)
+@BenchmarkMode(Mode.AverageTime)
+@OutputTimeUnit(TimeUnit.MILLISECONDS)
+@Warmup(iterations = 2)
+@Measurement(iterations = 5)
+@Fork(1)
+public class ExtractionCacheBenchmark {
+
+    @Param({"50", "300"})
+    public int pages;
+
+    @Param({"1", "4"})
+    public int workers; // Page-range parallelism for the cold path
+
+    private static final int CORPUS_SIZE = 8;
+
+    private final String[] corpus = new String[CORPUS_SIZE];
+    private int next;
+    private DocumentExtractorTool uncached;
+    private DocumentExtractorTool memoryCached;
+    private DocumentExtractorTool diskCached;
+    private PageParallelExtractor pageExtractor;
+
+    @Setup(Level.Trial)
+    public void setup() throws Exception {
+        Path dir = Files.createTempDirectory("brd-corpus");
+        for (int i = 0; i < CORPUS_SIZE; i++) {
+            corpus[i] = BrdPdfs.write(dir.resolve("brd-" + i + ".pdf"), pages, i).toString();
+        }
+        UploadRegistry uploads = new UploadRegistry(new SimpleMeterRegistry(), Long.MAX_VALUE, Long.MAX_VALUE);
+        pageExtractor = new PageParallelExtractor(workers, 16, 4000);
+        uncached = new DocumentExtractorTool(new ExtractionCache(new SimpleMeterRegistry(), 0, ""), uploads, pageExtractor);
+        memoryCached = new DocumentExtractorTool(new ExtractionCache(new SimpleMeterRegistry(), Long.MAX_VALUE, ""),
+                uploads, pageExtractor);
+        // Memory tier of 0 chars forces every hit through the disk tier
+        diskCached = new DocumentExtractorTool(new ExtractionCache(new SimpleMeterRegistry(), 0,
+                Files.createTempDirectory("brd-extraction-cache").toString()), uploads, pageExtractor);
+        for (String file : corpus) {
+            memoryCached.extract(file);
+            diskCached.extract(file);
+        }
+    }
+
+    private String nextFile() {
+        next = (next + 1) % CORPUS_SIZE;
+        return corpus[next];
+    }
+
+    @Benchmark
+    public String coldExtraction() {
+        return uncached.extract(nextFile());
+    }
+
+    // Time to the first chunk: what downstream analysis waits for before it can start
+    @Benchmark
+    public DocumentChunk coldFirstChunk() throws Exception {
+        try (DocumentChunks chunks = uncached.extractChunks(nextFile())) {
+            return chunks.next();
+        }
+    }
+
+    @TearDown(Level.Trial)
+    public void tearDown() {
+        pageExtractor.shutdown();
+    }
+
+    @Benchmark
+    public String memoryHit() {
+        return memoryCached.extract(nextFile());
+    }
+
+    @Benchmark
+    public String diskHit() {
+        return diskCached.extract(nextFile());
+    }
+}
+```
+
+### bench/MockChatModel.java
+(Test scope. Deterministic stand-in for OpenAI: fixed latency plus per-1k-prompt-char latency, numbered scenarios derived from a hash of the prompt, and token usage metadata. Given a tool pipeline, a prompt that enables functions runs those tools once each, in pipeline order, feeding each output into the next, which stands in for the provider's tool-call loop. Given a ProviderRequestScheduler, the simulated request takes a scheduler grant like a real one, released before the tools run.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.llm.ProviderRequestScheduler;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import org.springframework.ai.chat.messages.AssistantMessage;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.messages.MessageType;
+import org.springframework.ai.chat.metadata.ChatResponseMetadata;
+import org.springframework.ai.chat.metadata.Usage;
+import org.springframework.ai.chat.model.ChatModel;
+import org.springframework.ai.chat.model.ChatResponse;
+import org.springframework.ai.chat.model.Generation;
+import org.springframework.ai.chat.prompt.ChatOptions;
+import org.springframework.ai.chat.prompt.Prompt;
+import org.springframework.ai.model.function.FunctionCallback;
+import org.springframework.ai.model.function.FunctionCallingOptions;
+import reactor.core.publisher.Flux;
+
+import java.util.List;
+import java.util.Set;
+import java.util.concurrent.locks.LockSupport;
+import java.util.function.Function;
+
+public class MockChatModel implements ChatModel {
+    private static final ObjectMapper objectMapper = new ObjectMapper();
+    // LLM routing only happens when SupervisorRules cannot decide; the mock ends the run there
+    private static final String SUPERVISOR_PROMPT = "You are the Supervisor Agent";
+
+    private final long baseLatencyMicros;
+    private final long latencyMicrosPer1kChars;
+    private final int scenariosPerCall;
+    private final List<String> toolPipeline;
+    private final Function<String, FunctionCallback> tools; // null = text only
+    private final ProviderRequestScheduler requests;        // null = not scheduled
+
+    public MockChatModel(long baseLatencyMicros, long latencyMicrosPer1kChars, int scenariosPerCall) {
+        this(baseLatencyMicros, latencyMicrosPer1kChars, scenariosPerCall, List.of(), null);
+    }
+
+    public MockChatModel(long baseLatencyMicros, long latencyMicrosPer1kChars, int scenariosPerCall,
+                         List<String> toolPipeline, Function<String, FunctionCallback> tools) {
+        this(baseLatencyMicros, latencyMicrosPer1kChars, scenariosPerCall, toolPipeline, tools, null);
+    }
+
+    public MockChatModel(long baseLatencyMicros, long latencyMicrosPer1kChars, int scenariosPerCall,
+                         List<String> toolPipeline, Function<String, FunctionCallback> tools,
+                         ProviderRequestScheduler requests) {
+        this.baseLatencyMicros = baseLatencyMicros;
+        this.latencyMicrosPer1kChars = latencyMicrosPer1kChars;
+        this.scenariosPerCall = scenariosPerCall;
+        this.toolPipeline = toolPipeline;
+        this.tools = tools;
+        this.requests = requests;
+    }
+
+    @Override
+    public ChatResponse call(Prompt prompt) {
+        String contents = prompt.getContents();
+        Runnable request = () -> LockSupport.parkNanos((baseLatencyMicros + latencyMicrosPer1kChars * contents.length() / 1000) * 1000);
+        if (requests != null) {
+            requests.around(contents.length(), request);
+        } else {
+            request.run();
+        }
+        Set<String> functions = prompt.getOptions() instanceof FunctionCallingOptions options
+                && options.getFunctions() != null ? options.getFunctions() : Set.of();
+        String out = contents.contains(SUPERVISOR_PROMPT) ? "{\"next\": \"FINISH\", \"reason\": \"mock\"}"
+                : tools == null || functions.isEmpty() ? scenarios(contents) : runTools(functions, prompt);
+        Usage usage = new Usage() {
+            @Override
+            public Long getPromptTokens() {
+                return (long) contents.length() / 4;
+            }
+
+            @Override
+            public Long getGenerationTokens() {
+                return (long) out.length() / 4;
+            }
+        };
+        return new ChatResponse(List.of(new Generation(new AssistantMessage(out))),
+                ChatResponseMetadata.builder().withUsage(usage).build());
+    }
+
+    private String scenarios(String contents) {
+        int seed = contents.hashCode();
+        StringBuilder out = new StringBuilder();
+        for (int i = 0; i < scenariosPerCall; i++) {
+            out.append(i + 1).append(". As a user ").append(Integer.toHexString(seed + i))
+                    .append(", I want outcome ").append(i).append(" so that the BRD is covered\n");
+        }
+        return out.toString();
+    }
+
+    // Starts from the run's first user message (it carries the upload:// reference)
+    private String runTools(Set<String> functions, Prompt prompt) {
+        String value = prompt.getInstructions().stream()
+                .filter(message -> message.getMessageType() == MessageType.USER)
+                .map(Message::getContent)
+                .findFirst()
+                .orElse(prompt.getContents());
+        for (String name : toolPipeline) {
+            if (functions.contains(name)) {
+                try {
+                    String result = tools.apply(name).call(objectMapper.writeValueAsString(value));
+                    value = result.startsWith("\"") ? objectMapper.readValue(result, String.class) : result;
+                } catch (Exception e) {
+                    throw new IllegalStateException("Mock tool call " + name + " failed", e);
+                }
+            }
+        }
+        return value;
+    }
+
+    @Override
+    public Flux<ChatResponse> stream(Prompt prompt) {
+        return Flux.just(call(prompt));
+    }
+
+    @Override
+    public ChatOptions getDefaultOptions() {
+        return null;
+    }
+}
+```
+
+### bench/BrdPdfs.java
+(Test scope. Synthetic text-only BRD PDFs, deterministic per (pages, seed); shared by the extraction and end-to-end benchmarks.)
+```java
+package com.example.brdmultiagent.bench;
+
+import org.apache.pdfbox.pdmodel.PDDocument;
+import org.apache.pdfbox.pdmodel.PDPage;
+import org.apache.pdfbox.pdmodel.PDPageContentStream;
+import org.apache.pdfbox.pdmodel.font.PDType1Font;
+import org.apache.pdfbox.pdmodel.font.Standard14Fonts;
+
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+
+public final class BrdPdfs {
+
+    private BrdPdfs() {
+    }
+
+    public static Path write(Path path, int pages, int seed) throws IOException {
+        try (OutputStream out = Files.newOutputStream(path)) {
+            write(out, pages, seed);
+        }
+        return path;
+    }
+
+    public static byte[] bytes(int pages, int seed) throws IOException {
+        ByteArrayOutputStream out = new ByteArrayOutputStream();
+        write(out, pages, seed);
+        return out.toByteArray();
+    }
+
+    // Distinct documents of the same size, so content-hash caches see a realistic mix
+    public static byte[][] corpus(int size, int pages) throws IOException {
+        byte[][] corpus = new byte[size][];
+        for (int i = 0; i < size; i++) {
+            corpus[i] = bytes(pages, i);
+        }
+        return corpus;
+    }
+
+    private static void write(OutputStream out, int pages, int seed) throws IOException {
+        try (PDDocument doc = new PDDocument()) {
+            PDType1Font font = new PDType1Font(Standard14Fonts.FontName.HELVETICA);
+            for (int p = 0; p < pages; p++) {
+                PDPage page = new PDPage();
+                doc.addPage(page);
+                try (PDPageContentStream content = new PDPageContentStream(doc, page)) {
+                    content.beginText();
+                    content.setFont(font, 10);
+                    content.newLineAtOffset(50, 750);
+                    for (int line = 0; line < 60; line++) {
+                        content.showText("REQ-" + seed + "-" + p + "-" + line
+                                + " The system shall validate the settlement amount before posting.");
+                        content.newLineAtOffset(0, -12);
+                    }
+                    content.endText();
+                }
+            }
+            doc.save(out);
         }
     }
 }
+```
 
-// OpenAIAnalysisTool.java
-package com.example.brdmultiagent.tool;
+### bench/StubServices.java
+(Test scope. The Excel microservice and Jenkins as local `com.sun.net.httpserver` endpoints with fixed latency, so the real MicroserviceCallerTool/JenkinsApiCallerTool and ToolHttpClient are exercised without the network.)
+```java
+package com.example.brdmultiagent.bench;
 
-import org.springframework.ai.chat.model.ChatModel;
-import org.springframework.ai.chat.prompt.Prompt;
-import org.springframework.beans.factory.annotation.Autowired;
-import org.springframework.stereotype.Component;
+import com.sun.net.httpserver.HttpExchange;
+import com.sun.net.httpserver.HttpServer;
 
-@Component
-public class OpenAIAnalysisTool {
-    @Autowired
-    private ChatModel chatModel;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.net.InetAddress;
+import java.net.InetSocketAddress;
+import java.nio.charset.StandardCharsets;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.locks.LockSupport;
 
-    public String analyze(String content) {
-        Prompt prompt = new Prompt("Generate scenarios from BRD: " + content);
-        return chatModel.call(prompt).getResult().getOutput().getContent();
+public class StubServices implements AutoCloseable {
+
+    private final HttpServer server;
+    private final ExecutorService executor = Executors.newCachedThreadPool();
+    private final AtomicLong excelCalls = new AtomicLong();
+    private final AtomicLong jenkinsCalls = new AtomicLong();
+
+    public StubServices(long microserviceLatencyMillis, long jenkinsLatencyMillis) throws IOException {
+        server = HttpServer.create(new InetSocketAddress(InetAddress.getLoopbackAddress(), 0), 0);
+        server.setExecutor(executor);
+        server.createContext("/excel", exchange -> respond(exchange, microserviceLatencyMillis,
+                "/tmp/brd-bench/scenario-" + excelCalls.incrementAndGet() + ".xlsx"));
+        server.createContext("/jenkins", exchange -> respond(exchange, jenkinsLatencyMillis,
+                "Jenkins build #" + jenkinsCalls.incrementAndGet() + " queued"));
+        server.start();
+    }
+
+    public String microserviceUrl() {
+        return "http://127.0.0.1:" + server.getAddress().getPort() + "/excel";
+    }
+
+    public String jenkinsUrl() {
+        return "http://127.0.0.1:" + server.getAddress().getPort() + "/jenkins";
+    }
+
+    public long excelCalls() {
+        return excelCalls.get();
+    }
+
+    public long jenkinsCalls() {
+        return jenkinsCalls.get();
+    }
+
+    private static void respond(HttpExchange exchange, long latencyMillis, String body) throws IOException {
+        try {
+            exchange.getRequestBody().readAllBytes();
+            LockSupport.parkNanos(TimeUnit.MILLISECONDS.toNanos(latencyMillis));
+            byte[] bytes = body.getBytes(StandardCharsets.UTF_8);
+            exchange.sendResponseHeaders(200, bytes.length);
+            try (OutputStream out = exchange.getResponseBody()) {
+                out.write(bytes);
+            }
+        } finally {
+            exchange.close();
+        }
+    }
+
+    @Override
+    public void close() {
+        server.stop(0);
+        executor.shutdownNow();
     }
 }
+```
+
+### bench/BenchProfileConfig.java
+(Test scope, active only with the `bench` profile. Also adds `mcpHopTool`, which McpLoadTest uses for nested agent-to-agent MCP hops. Swaps the provider inside the `chatModel` bean, and with it every ChatClient, for MockChatModel. The rest of the model chain stays as in production: every simulated request goes through the LlmScheduler (unless brd.llm-scheduler.enabled=false), and calls are traced. The response cache stays out, so every run pays for its model calls. Agents, graph, tools, job pool and controllers keep their production wiring.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.llm.InstrumentedChatModel;
+import com.example.brdmultiagent.llm.LlmScheduler;
+import com.example.brdmultiagent.llm.ProviderRequestScheduler;
+import com.example.brdmultiagent.mcp.McpClient;
+import com.example.brdmultiagent.mcp.McpClients;
+import com.example.brdmultiagent.trace.RunTracer;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import com.fasterxml.jackson.databind.node.ObjectNode;
+import org.springframework.ai.model.function.FunctionCallback;
+import org.springframework.ai.model.function.FunctionCallbackWrapper;
+import org.springframework.beans.factory.BeanFactory;
+import org.springframework.beans.factory.config.BeanPostProcessor;
+import org.springframework.context.annotation.Bean;
+import org.springframework.context.annotation.Configuration;
+import org.springframework.context.annotation.Profile;
+import org.springframework.core.env.Environment;
+
+import java.io.IOException;
+import java.io.UncheckedIOException;
+import java.net.URI;
+import java.util.List;
 
-// JsonGeneratorTool.java, MicroserviceCallerTool.java, JenkinsApiCallerTool.java (similar mocks as before)
+@Configuration
+@Profile("bench")
+public class BenchProfileConfig {
+
+    // The order the agents' prompts ask for: BA extracts and analyzes in one streaming step, Dev builds JSON
+    // then calls the microservice, Coding calls Jenkins
+    static final List<String> TOOL_PIPELINE = List.of("documentAnalysisTool",
+            "jsonGeneratorTool", "microserviceCallerTool", "jenkinsApiCallerTool");
+
+    @Bean
+    public static BeanPostProcessor mockChatModelPostProcessor(BeanFactory beanFactory, Environment env) {
+        return new BeanPostProcessor() {
+            @Override
+            public Object postProcessAfterInitialization(Object bean, String beanName) {
+                if (!"chatModel".equals(beanName)) {
+                    return bean;
+                }
+                // Same scheduler bean and settings as the production chain; only the HTTP hop is simulated
+                ProviderRequestScheduler requests = env.getProperty("brd.llm-scheduler.enabled", Boolean.class, true)
+                        ? new ProviderRequestScheduler(beanFactory.getBean(LlmScheduler.class),
+                                env.getProperty("brd.llm-scheduler.completion-token-estimate", Integer.class, 800), 0)
+                        : null;
+                MockChatModel mock = new MockChatModel(
+                        env.getProperty("bench.llm.base-latency-micros", Long.class, 200_000L),
+                        env.getProperty("bench.llm.latency-micros-per-1k-chars", Long.class, 2_000L),
+                        env.getProperty("bench.llm.scenarios", Integer.class, 8),
+                        TOOL_PIPELINE,
+                        name -> beanFactory.getBean(name, FunctionCallback.class), // Lazy: tools depend on chatModel
+                        requests);
+                return new InstrumentedChatModel(mock, beanFactory.getBean(RunTracer.class));
+            }
+        };
+    }
+
+    // One agent calling the next over MCP from inside a server request, the case McpClients' in-process path is
+    // for. Input: {"hops": n, "url": "<our /mcp>", "http": false, "input": "..."}; makes n nested calls, the last
+    // one to jsonGeneratorTool. Exposed only when listed in brd.mcp.tools.
+    @Bean("mcpHopTool")
+    public FunctionCallback mcpHopTool(BeanFactory beanFactory) {
+        ObjectMapper objectMapper = new ObjectMapper();
+        return FunctionCallbackWrapper.builder((String request) -> {
+                    try {
+                        ObjectNode hop = (ObjectNode) objectMapper.readTree(request);
+                        int hops = hop.path("hops").asInt(1);
+                        String url = hop.path("url").asText();
+                        McpClients clients = beanFactory.getBean(McpClients.class); // Lazy: McpServer lists this tool
+                        McpClient client = hop.path("http").asBoolean() ? clients.http(URI.create(url)) : clients.connect(url);
+                        McpClient.ToolResult result = hops <= 1
+                                ? client.callTool("jsonGeneratorTool", hop.path("input").asText())
+                                : client.callTool("mcpHopTool", objectMapper.writeValueAsString(hop.put("hops", hops - 1)));
+                        if (result.isError()) {
+                            throw new IllegalStateException(result.text());
+                        }
+                        return result.text();
+                    } catch (IOException e) {
+                        throw new UncheckedIOException(e);
+                    }
+                })
+                .withName("mcpHopTool")
+                .withDescription("Bench only: forward to the next agent over MCP")
+                .withInputType(String.class)
+                .withOutputType(String.class)
+                .build();
+    }
+}
 ```
 
-### graph/BrdWorkflowGraph.java
+### bench/BenchApp.java
+(Test scope. Starts StubServices and the real application context with the `bench` profile. Response and extraction caches are off, so every run pays the mock LLM latency and a cold PDFBox pass.)
 ```java
-package com.example.brdmultiagent.graph;
+package com.example.brdmultiagent.bench;
 
-import com.example.brdmultiagent.agent.BAAgent;
-import com.example.brdmultiagent.agent.CodingAgent;
-import com.example.brdmultiagent.agent.DevAgent;
-import com.example.brdmultiagent.agent.SupervisorAgent;
-import dev.langchain4j.langgraph.StateGraph;
-import dev.langchain4j.langgraph.StateGraph.Edge;
-import dev.langchain4j.langgraph.StateGraph.Node;
-import org.springframework.beans.factory.annotation.Autowired;
-import org.springframework.stereotype.Component;
+import com.example.brdmultiagent.BrdMultiagentOrchestratorApplication;
+import org.springframework.boot.WebApplicationType;
+import org.springframework.boot.builder.SpringApplicationBuilder;
+import org.springframework.boot.web.context.WebServerApplicationContext;
+import org.springframework.context.ConfigurableApplicationContext;
 
+import java.io.IOException;
+import java.nio.file.Files;
+import java.util.HashMap;
 import java.util.Map;
 
-import static dev.langchain4j.langgraph.StateGraph.END;
-import static dev.langchain4j.langgraph.StateGraph.START;
+public final class BenchApp implements AutoCloseable {
 
-@Component
-public class BrdWorkflowGraph {
+    private final StubServices stubs;
+    private final ConfigurableApplicationContext context;
 
-    private final SupervisorAgent supervisorAgent;
-    private final BAAgent baAgent;
-    private final DevAgent devAgent;
-    private final CodingAgent codingAgent;
+    private BenchApp(StubServices stubs, ConfigurableApplicationContext context) {
+        this.stubs = stubs;
+        this.context = context;
+    }
 
-    @Autowired
-    public BrdWorkflowGraph(SupervisorAgent supervisorAgent, BAAgent baAgent, DevAgent devAgent, CodingAgent codingAgent) {
-        this.supervisorAgent = supervisorAgent;
-        this.baAgent = baAgent;
-        this.devAgent = devAgent;
-        this.codingAgent = codingAgent;
+    // overrides win over the defaults below, e.g. bench.llm.base-latency-micros or brd.jobs.pool-size
+    public static BenchApp start(boolean web, Map<String, Object> overrides) throws IOException {
+        StubServices stubs = new StubServices(
+                ((Number) overrides.getOrDefault("bench.stub.microservice-latency-ms", 50)).longValue(),
+                ((Number) overrides.getOrDefault("bench.stub.jenkins-latency-ms", 20)).longValue());
+        Map<String, Object> properties = new HashMap<>();
+        properties.put("spring.ai.openai.api-key", "bench"); // Never used: the model is mocked
+        properties.put("server.port", 0);
+        properties.put("brd.microservice.url", stubs.microserviceUrl());
+        properties.put("brd.jenkins.url", stubs.jenkinsUrl());
+        properties.put("brd.llm-cache.enabled", false);
+        properties.put("brd.mcp.token", "bench"); // McpClients sends it to our own /mcp
+        properties.put("brd.extraction-cache.max-chars", 0);
+        properties.put("brd.checkpoint.dir", Files.createTempDirectory("brd-bench-checkpoints").toString());
+        properties.put("logging.level.com.example.brdmultiagent", "WARN");
+        properties.putAll(overrides);
+        ConfigurableApplicationContext context = new SpringApplicationBuilder(BrdMultiagentOrchestratorApplication.class)
+                .profiles("bench")
+                .web(web ? WebApplicationType.SERVLET : WebApplicationType.NONE)
+                .properties(properties)
+                .run();
+        return new BenchApp(stubs, context);
     }
 
-    public StateGraph<AgentState> buildGraph() {
-        return new StateGraph<>(AgentState::new)
-                .addNode("supervisor", state -> supervisorAgent.invoke(state))
-                .addNode("ba_agent", state -> baAgent.invoke(state))
-                .addNode("dev_agent", state -> devAgent.invoke(state))
-                .addNode("coding_agent", state -> codingAgent.invoke(state))
-                .addEdge(START, "supervisor")
-                .addConditionalEdges("supervisor",
-                        state -> state.getNext(), // Router function
-                        Map.of("ba_agent", "ba_agent",
-                               "dev_agent", "dev_agent",
-                               "coding_agent", "coding_agent",
-                               "FINISH", END))
-                .addEdge("ba_agent", "supervisor")
-                .addEdge("dev_agent", "supervisor")
-                .addEdge("coding_agent", "supervisor");
+    public <T> T bean(Class<T> type) {
+        return context.getBean(type);
     }
 
-    public String run(String initialInput) {
-        AgentState initialState = new AgentState();
-        initialState.addMessage(new org.springframework.ai.chat.messages.UserMessage(initialInput));
+    public String baseUrl() {
+        return "http://127.0.0.1:" + ((WebServerApplicationContext) context).getWebServer().getPort();
+    }
 
-        StateGraph<AgentState> graph = buildGraph();
-        AgentState finalState = graph.compile().invoke(initialState);
+    public StubServices stubs() {
+        return stubs;
+    }
 
-        return finalState.getFinalOutput();
+    @Override
+    public void close() {
+        context.close();
+        stubs.close();
     }
 }
 ```
 
-### controller/UploadController.java
+### bench/EndToEndBenchmark.java
+(JMH, test scope. One full `BrdWorkflowGraph.run` per op (upload registration, extraction, map-reduce analysis, Dev fan-out against the stub microservice, Jenkins stub) with the mock LLM at 20 ms per call. SampleTime gives p50/p99; add `-prof gc` for allocation rate and `-t 1` / `-t 16` for concurrency.)
 ```java
-package com.example.brdmultiagent.controller;
+package com.example.brdmultiagent.bench;
 
 import com.example.brdmultiagent.graph.BrdWorkflowGraph;
-import org.springframework.beans.factory.annotation.Autowired;
-import org.springframework.http.ResponseEntity;
-import org.springframework.web.bind.annotation.PostMapping;
-import org.springframework.web.bind.annotation.RequestParam;
-import org.springframework.web.bind.annotation.RestController;
-import org.springframework.web.multipart.MultipartFile;
+import com.example.brdmultiagent.upload.UploadHandle;
+import com.example.brdmultiagent.upload.UploadRegistry;
+import org.openjdk.jmh.annotations.*;
+
+import java.io.ByteArrayInputStream;
+import java.util.Map;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+
+@State(Scope.Benchmark)
+@BenchmarkMode(Mode.SampleTime)
+@OutputTimeUnit(TimeUnit.MILLISECONDS)
+@Warmup(iterations = 2, time = 10)
+@Measurement(iterations = 3, time = 20)
+@Threads(4)
+@Fork(1)
+public class EndToEndBenchmark {
+
+    @Param({"5", "50"})
+    public int pages;
+
+    @Param({"20000"})
+    public long llmLatencyMicros;
+
+    private BenchApp app;
+    private BrdWorkflowGraph workflowGraph;
+    private UploadRegistry uploads;
+    private byte[][] corpus;
+    private final AtomicInteger next = new AtomicInteger();
+
+    @Setup(Level.Trial)
+    public void setup() throws Exception {
+        app = BenchApp.start(false, Map.of("bench.llm.base-latency-micros", llmLatencyMicros));
+        workflowGraph = app.bean(BrdWorkflowGraph.class);
+        uploads = app.bean(UploadRegistry.class);
+        corpus = BrdPdfs.corpus(8, pages);
+    }
+
+    @Benchmark
+    public String fullRun() throws Exception {
+        byte[] pdf = corpus[Math.floorMod(next.getAndIncrement(), corpus.length)];
+        try (UploadHandle upload = uploads.register("brd.pdf", new ByteArrayInputStream(pdf))) {
+            return workflowGraph.run("Process BRD file: " + upload.describe());
+        }
+    }
+
+    @TearDown(Level.Trial)
+    public void tearDown() {
+        app.close();
+    }
+}
+```
+
+### bench/LoadDriver.java
+(Test scope, plain `main`. Boots the bench application on a random port and drives `POST /upload-brd` with closed-loop clients for every (BRD size, concurrency) pair. Prints throughput, p50/p99/max latency and allocation rate, and appends them to `target/bench/load-driver.csv`. Allocation is summed over all JVM threads, so it includes the driver's own clients.
+Run: `mvn test-compile exec:java -Dexec.classpathScope=test -Dexec.mainClass=com.example.brdmultiagent.bench.LoadDriver -Dexec.args="pages=5,50 concurrency=1,4,16 seconds=30 llm-latency-ms=200"`)
+```java
+package com.example.brdmultiagent.bench;
 
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.lang.management.ManagementFactory;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.nio.charset.StandardCharsets;
 import java.nio.file.Files;
 import java.nio.file.Path;
+import java.nio.file.StandardOpenOption;
+import java.time.Instant;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.ThreadLocalRandom;
+import java.util.concurrent.TimeUnit;
 
-@RestController
-public class UploadController {
+public final class LoadDriver {
+    private static final String BOUNDARY = "brd-bench-boundary";
+    private static final int WARMUP_SECONDS = 5;
 
-    @Autowired
-    private BrdWorkflowGraph workflowGraph;
+    private record Result(int pages, int concurrency, int ok, int errors, double seconds, long[] latenciesMicros,
+                          long allocatedBytes) {
 
-    @PostMapping("/upload-brd")
-    public ResponseEntity<String> uploadBrd(@RequestParam("file") MultipartFile file) {
-        try {
-            Path tempPath = Files.createTempFile("brd-", file.getOriginalFilename());
-            file.transferTo(tempPath);
-            String initialInput = "Process BRD file: " + tempPath.toString();
-            String result = workflowGraph.run(initialInput);
-            return ResponseEntity.ok(result);
-        } catch (Exception e) {
-            return ResponseEntity.badRequest().body("Error: " + e.getMessage());
+        long percentileMillis(double p) {
+            if (latenciesMicros.length == 0) {
+                return 0;
+            }
+            return latenciesMicros[(int) Math.min(latenciesMicros.length - 1, Math.ceil(p * latenciesMicros.length) - 1)] / 1000;
+        }
+
+        String row() {
+            return String.format("%6d %6d %8.1f %8.2f %8d %8d %8d %6d %10.1f", pages, concurrency, ok * 60 / seconds,
+                    ok / seconds, percentileMillis(0.50), percentileMillis(0.99), percentileMillis(1.0), errors,
+                    allocatedBytes / seconds / (1024 * 1024));
+        }
+
+        String csv() {
+            return String.join(",", Instant.now().toString(), String.valueOf(pages), String.valueOf(concurrency),
+                    String.valueOf(ok), String.valueOf(errors), String.format("%.1f", ok * 60 / seconds),
+                    String.valueOf(percentileMillis(0.50)), String.valueOf(percentileMillis(0.99)),
+                    String.format("%.1f", allocatedBytes / seconds / (1024 * 1024)));
+        }
+    }
+
+    private LoadDriver() {
+    }
+
+    public static void main(String[] args) throws Exception {
+        Map<String, String> options = new HashMap<>(Map.of(
+                "pages", "5,50", "concurrency", "1,4,16", "seconds", "30", "llm-latency-ms", "200"));
+        for (String arg : args) {
+            String[] kv = arg.split("=", 2);
+            options.put(kv[0], kv[1]);
+        }
+        int seconds = Integer.parseInt(options.get("seconds"));
+        long llmLatencyMicros = Long.parseLong(options.get("llm-latency-ms")) * 1000;
+        int maxConcurrency = Arrays.stream(options.get("concurrency").split(",")).mapToInt(Integer::parseInt).max().orElse(1);
+
+        List<Result> results = new ArrayList<>();
+        try (BenchApp app = BenchApp.start(true, Map.of(
+                "bench.llm.base-latency-micros", llmLatencyMicros,
+                "brd.jobs.pool-size", maxConcurrency))) {
+            HttpClient client = HttpClient.newBuilder().version(HttpClient.Version.HTTP_1_1).build();
+            URI uri = URI.create(app.baseUrl() + "/upload-brd");
+            System.out.printf("%6s %6s %8s %8s %8s %8s %8s %6s %10s%n",
+                    "pages", "conc", "docs/min", "req/s", "p50 ms", "p99 ms", "max ms", "errors", "alloc MB/s");
+            for (String pages : options.get("pages").split(",")) {
+                byte[][] corpus = BrdPdfs.corpus(8, Integer.parseInt(pages));
+                for (String concurrency : options.get("concurrency").split(",")) {
+                    int p = Integer.parseInt(pages);
+                    int c = Integer.parseInt(concurrency);
+                    drive(client, uri, corpus, p, c, WARMUP_SECONDS); // Discarded
+                    Result result = drive(client, uri, corpus, p, c, seconds);
+                    System.out.println(result.row());
+                    results.add(result);
+                }
+            }
+        }
+        writeCsv(results);
+    }
+
+    private static Result drive(HttpClient client, URI uri, byte[][] corpus, int pages, int concurrency, int seconds)
+            throws Exception {
+        ExecutorService clients = Executors.newFixedThreadPool(concurrency);
+        long allocatedBefore = allocatedBytes();
+        long start = System.nanoTime();
+        long deadline = start + TimeUnit.SECONDS.toNanos(seconds);
+        List<Future<long[]>> futures = new ArrayList<>();
+        for (int c = 0; c < concurrency; c++) {
+            futures.add(clients.submit(() -> {
+                // [0] = errors, then one latency (µs) per successful request
+                long[] samples = new long[1024];
+                int n = 1;
+                while (System.nanoTime() < deadline) {
+                    byte[] pdf = corpus[ThreadLocalRandom.current().nextInt(corpus.length)];
+                    long t0 = System.nanoTime();
+                    HttpResponse<String> response = client.send(multipart(uri, pdf), HttpResponse.BodyHandlers.ofString());
+                    if (response.statusCode() != 200) {
+                        samples[0]++;
+                        continue;
+                    }
+                    if (n == samples.length) {
+                        samples = Arrays.copyOf(samples, n * 2);
+                    }
+                    samples[n++] = (System.nanoTime() - t0) / 1000;
+                }
+                return Arrays.copyOf(samples, n);
+            }));
+        }
+        int errors = 0;
+        List<Long> latencies = new ArrayList<>();
+        for (Future<long[]> future : futures) {
+            long[] samples = future.get();
+            errors += (int) samples[0];
+            for (int i = 1; i < samples.length; i++) {
+                latencies.add(samples[i]);
+            }
+        }
+        double elapsed = (System.nanoTime() - start) / 1e9;
+        long allocated = allocatedBytes() - allocatedBefore;
+        clients.shutdown();
+        clients.awaitTermination(1, TimeUnit.MINUTES); // Dead client threads must not skew the next window
+        long[] sorted = latencies.stream().mapToLong(Long::longValue).sorted().toArray();
+        return new Result(pages, concurrency, sorted.length, errors, elapsed, sorted, allocated);
+    }
+
+    private static HttpRequest multipart(URI uri, byte[] pdf) throws IOException {
+        ByteArrayOutputStream body = new ByteArrayOutputStream(pdf.length + 256);
+        body.write(("--" + BOUNDARY + "\r\nContent-Disposition: form-data; name=\"file\"; filename=\"brd.pdf\"\r\n"
+                + "Content-Type: application/pdf\r\n\r\n").getBytes(StandardCharsets.US_ASCII));
+        body.write(pdf);
+        body.write(("\r\n--" + BOUNDARY + "--\r\n").getBytes(StandardCharsets.US_ASCII));
+        return HttpRequest.newBuilder(uri)
+                .header("Content-Type", "multipart/form-data; boundary=" + BOUNDARY)
+                .POST(HttpRequest.BodyPublishers.ofByteArray(body.toByteArray()))
+                .build();
+    }
+
+    // Bytes allocated by live threads; pooled server/job/client threads persist across a measurement
+    private static long allocatedBytes() {
+        com.sun.management.ThreadMXBean threads = (com.sun.management.ThreadMXBean) ManagementFactory.getThreadMXBean();
+        long total = 0;
+        for (long allocated : threads.getThreadAllocatedBytes(threads.getAllThreadIds())) {
+            total += Math.max(0, allocated);
+        }
+        return total;
+    }
+
+    private static void writeCsv(List<Result> results) throws IOException {
+        Path file = Path.of("target", "bench", "load-driver.csv");
+        Files.createDirectories(file.getParent());
+        if (!Files.exists(file)) {
+            Files.writeString(file, "timestamp,pages,concurrency,ok,errors,docs_per_min,p50_ms,p99_ms,alloc_mb_per_s\n");
+        }
+        StringBuilder rows = new StringBuilder();
+        results.forEach(result -> rows.append(result.csv()).append('\n'));
+        Files.writeString(file, rows, StandardOpenOption.APPEND);
+        System.out.println("Appended " + results.size() + " rows to " + file.toAbsolutePath());
+    }
+}
+```
+
+### bench/McpLoadTest.java
+(Test scope, plain `main`. Boots the bench application and drives `tools/call` hops against its own `/mcp` with closed-loop clients. Each iteration is a chain of `hops` dependent calls, like DeveloperAgent → BAAgent → TestAgent. Modes: `http` goes over loopback HTTP, `in-process` uses the McpClients fast path, and `http-batch` sends the same number of independent calls as one JSON-RPC batch. Those hops are all made by the client. In `nested-http` and `nested-in-process`, the client makes one HTTP call to `mcpHopTool` and the server makes the `hops` dependent calls itself, agent to agent inside that request, over loopback HTTP or the in-process path. Their per-call latency includes a share of the outer call. Prints calls/s and p50/p99 latency per call.
+Run: `mvn test-compile exec:java -Dexec.classpathScope=test -Dexec.mainClass=com.example.brdmultiagent.bench.McpLoadTest -Dexec.args="concurrency=1,8,32 seconds=20 hops=3"`)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.mcp.McpClient;
+import com.example.brdmultiagent.mcp.McpClients;
+import com.fasterxml.jackson.databind.ObjectMapper;
+
+import java.net.URI;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.TimeUnit;
+
+public final class McpLoadTest {
+    private static final int WARMUP_SECONDS = 5;
+    private static final String TOOL = "jsonGeneratorTool"; // Cheap mock: the numbers are mostly transport cost
+    private static final String INPUT = "As a treasury user, I want to approve payments above the limit so that fraud is caught";
+    private static final String HOP_TOOL = "mcpHopTool"; // BenchProfileConfig
+    private static final ObjectMapper objectMapper = new ObjectMapper();
+
+    private McpLoadTest() {
+    }
+
+    public static void main(String[] args) throws Exception {
+        Map<String, String> options = new HashMap<>(Map.of(
+                "concurrency", "1,8,32", "seconds", "20", "hops", "3",
+                "modes", "http,in-process,http-batch,nested-http,nested-in-process"));
+        for (String arg : args) {
+            String[] kv = arg.split("=", 2);
+            options.put(kv[0], kv[1]);
+        }
+        int seconds = Integer.parseInt(options.get("seconds"));
+        int hops = Integer.parseInt(options.get("hops"));
+
+        try (BenchApp app = BenchApp.start(true, Map.of("logging.level.com.example.brdmultiagent.mcp", "ERROR",
+                "brd.mcp.tools", TOOL + "," + HOP_TOOL))) {
+            McpClients clients = app.bean(McpClients.class);
+            String url = app.baseUrl() + "/mcp";
+            System.out.printf("%-17s %6s %10s %10s %10s %7s%n", "mode", "conc", "calls/s", "p50 µs", "p99 µs", "errors");
+            for (String mode : options.get("modes").split(",")) {
+                McpClient client = mode.equals("in-process") ? clients.connect(url) : clients.http(URI.create(url));
+                client.initialize();
+                String nested = objectMapper.createObjectNode().put("hops", hops).put("url", url)
+                        .put("http", mode.equals("nested-http")).put("input", INPUT).toString();
+                for (String concurrency : options.get("concurrency").split(",")) {
+                    int c = Integer.parseInt(concurrency);
+                    drive(client, mode, hops, nested, c, WARMUP_SECONDS); // Discarded
+                    System.out.println(drive(client, mode, hops, nested, c, seconds));
+                }
+            }
+        }
+    }
+
+    private static String drive(McpClient client, String mode, int hops, String nested, int concurrency, int seconds)
+            throws Exception {
+        ExecutorService threads = Executors.newFixedThreadPool(concurrency);
+        List<McpClient.ToolCall> batch = Collections.nCopies(hops, new McpClient.ToolCall(TOOL, INPUT));
+        long start = System.nanoTime();
+        long deadline = start + TimeUnit.SECONDS.toNanos(seconds);
+        List<Future<long[]>> futures = new ArrayList<>();
+        for (int i = 0; i < concurrency; i++) {
+            futures.add(threads.submit(() -> {
+                // [0] = errors, then one latency (µs) per call
+                long[] samples = new long[1024];
+                int n = 1;
+                while (System.nanoTime() < deadline) {
+                    if (n + hops >= samples.length) {
+                        samples = Arrays.copyOf(samples, samples.length * 2);
+                    }
+                    if (mode.startsWith("nested-")) {
+                        long t0 = System.nanoTime();
+                        McpClient.ToolResult result = client.callTool(HOP_TOOL, nested);
+                        if (result.isError()) {
+                            samples[0]++;
+                            continue;
+                        }
+                        long perCall = (System.nanoTime() - t0) / 1000 / hops;
+                        for (int hop = 0; hop < hops; hop++) {
+                            samples[n++] = perCall;
+                        }
+                        continue;
+                    }
+                    if (mode.equals("http-batch")) {
+                        long t0 = System.nanoTime();
+                        List<McpClient.ToolResult> results = client.callTools(batch);
+                        long perCall = (System.nanoTime() - t0) / 1000 / hops;
+                        for (McpClient.ToolResult result : results) {
+                            if (result.isError()) {
+                                samples[0]++;
+                            } else {
+                                samples[n++] = perCall;
+                            }
+                        }
+                        continue;
+                    }
+                    for (int hop = 0; hop < hops; hop++) {
+                        long t0 = System.nanoTime();
+                        McpClient.ToolResult result = client.callTool(TOOL, INPUT);
+                        if (result.isError()) {
+                            samples[0]++;
+                            break;
+                        }
+                        samples[n++] = (System.nanoTime() - t0) / 1000;
+                    }
+                }
+                return Arrays.copyOf(samples, n);
+            }));
+        }
+        int errors = 0;
+        List<Long> latencies = new ArrayList<>();
+        for (Future<long[]> future : futures) {
+            long[] samples = future.get();
+            errors += (int) samples[0];
+            for (int i = 1; i < samples.length; i++) {
+                latencies.add(samples[i]);
+            }
+        }
+        double elapsed = (System.nanoTime() - start) / 1e9;
+        threads.shutdown();
+        threads.awaitTermination(1, TimeUnit.MINUTES);
+        long[] sorted = latencies.stream().mapToLong(Long::longValue).sorted().toArray();
+        return String.format("%-17s %6d %10.0f %10d %10d %7d", mode, concurrency, sorted.length / elapsed,
+                percentile(sorted, 0.50), percentile(sorted, 0.99), errors);
+    }
+
+    private static long percentile(long[] sorted, double p) {
+        return sorted.length == 0 ? 0 : sorted[(int) Math.min(sorted.length - 1, Math.ceil(p * sorted.length) - 1)];
+    }
+}
+```
+
+### bench/MapReduceAnalysisBenchmark.java
+(JMH, test scope. OpenAIAnalysisTool against MockChatModel (200 ms + 2 ms per 1k prompt chars) across document sizes; single-shot-chars is set so that every size above 24k chars takes the map-reduce path. The single-shot baseline for the same document is `singleShot`.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.tool.AnalysisResult;
+import com.example.brdmultiagent.tool.OpenAIAnalysisTool;
+import io.micrometer.core.instrument.simple.SimpleMeterRegistry;
+import org.openjdk.jmh.annotations.*;
+
+import java.util.concurrent.TimeUnit;
+
+@State(Scope.Benchmark)
+@BenchmarkMode(Mode.AverageTime)
+@OutputTimeUnit(TimeUnit.MILLISECONDS)
+@Warmup(iterations = 1)
+@Measurement(iterations = 3)
+@Fork(1)
+public class MapReduceAnalysisBenchmark {
+
+    @Param({"20000", "100000", "400000"})
+    public int documentChars;
+
+    @Param({"1", "4", "8"})
+    public int concurrency;
+
+    private String document;
+    private OpenAIAnalysisTool mapReduce;
+    private OpenAIAnalysisTool singleShot;
+
+    @Setup(Level.Trial)
+    public void setup() {
+        StringBuilder doc = new StringBuilder();
+        for (int section = 1; doc.length() < documentChars; section++) {
+            doc.append(section).append(". SECTION ").append(section).append('\n');
+            for (int line = 0; line < 20; line++) {
+                doc.append("REQ-").append(section).append('-').append(line)
+                        .append(" The system shall reconcile settlement batch ").append(line).append(".\n");
+            }
+        }
+        document = doc.toString();
+        MockChatModel model = new MockChatModel(200_000, 2_000, 8);
+        mapReduce = new OpenAIAnalysisTool(model, new SimpleMeterRegistry(), 24_000, 12_000, concurrency, 1000);
+        singleShot = new OpenAIAnalysisTool(model, new SimpleMeterRegistry(), Integer.MAX_VALUE, 12_000, 1, 1000);
+    }
+
+    @Benchmark
+    public AnalysisResult mapReduce() {
+        return mapReduce.analyze(document, partial -> { });
+    }
+
+    @Benchmark
+    public AnalysisResult singleShot() {
+        return singleShot.analyze(document, partial -> { });
+    }
+
+    @TearDown(Level.Trial)
+    public void tearDown() {
+        mapReduce.shutdown();
+        singleShot.shutdown();
+    }
+}
+```
+
+### bench/AgentStateFootprintBenchmark.java
+(Test scope, plain `main`, no Spring or model calls. Holds `runs` concurrent AgentStates through a typical run: upload message, ten supervisor decisions, a ~64 KB BA scenario list, a ~16 KB Dev output and a Coding reply, plus one supervisor view per step. It compares them with the previous representation (ArrayList history copied for every view, artifacts as plain Strings). `brds=distinct` gives every run its own BRD and `brds=shared` re-submits one BRD to all runs. Prints the retained heap per run after a full GC and the bytes allocated per step.
+Run: `mvn test-compile exec:java -Dexec.classpathScope=test -Dexec.mainClass=com.example.brdmultiagent.bench.AgentStateFootprintBenchmark -Dexec.args="runs=1000 brds=distinct,shared"`; pin the heap, e.g. `MAVEN_OPTS=-Xmx4g`.)
+```java
+package com.example.brdmultiagent.bench;
+
+import com.example.brdmultiagent.graph.AgentState;
+import com.example.brdmultiagent.graph.ContextWindow;
+import org.springframework.ai.chat.messages.AssistantMessage;
+import org.springframework.ai.chat.messages.Message;
+import org.springframework.ai.chat.messages.SystemMessage;
+import org.springframework.ai.chat.messages.UserMessage;
+
+import java.lang.management.ManagementFactory;
+import java.lang.ref.Reference;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+public final class AgentStateFootprintBenchmark {
+    private static final int SUPERVISOR_TURNS = 10;
+    private static final int STEPS_PER_RUN = 1 + SUPERVISOR_TURNS + 3;
+    private static final int INLINE_OUTPUT_CHARS = 2000; // As in AgentState
+    private static final int PREVIEW_CHARS = 300;
+    private static final SystemMessage SYSTEM = new SystemMessage("You are the supervisor.");
+
+    private AgentStateFootprintBenchmark() {
+    }
+
+    public static void main(String[] args) throws Exception {
+        Map<String, String> options = new HashMap<>(Map.of("runs", "1000", "brds", "distinct,shared"));
+        for (String arg : args) {
+            String[] kv = arg.split("=", 2);
+            options.put(kv[0], kv[1]);
+        }
+        int runs = Integer.parseInt(options.get("runs"));
+        // No summarization: the budget is never exceeded, so this is the plain view path
+        ContextWindow window = new ContextWindow(null, Integer.MAX_VALUE, 4);
+
+        System.out.printf("%-9s %-8s %14s %14s%n", "brds", "state", "retained KB/run", "alloc KB/step");
+        for (String brds : options.get("brds").split(",")) {
+            // Inputs exist before the baseline, so only what the states keep (or allocate) is counted
+            String[] inputs = new String[runs];
+            for (int run = 0; run < runs; run++) {
+                inputs[run] = brds.equals("shared") && run > 0 ? inputs[0] : brd(run);
+            }
+            for (String kind : List.of("legacy", "compact", "legacy", "compact")) { // First pair is warm-up
+                Object[] states = new Object[runs];
+                long baseline = retainedHeap();
+                long allocatedBefore = allocatedBytes();
+                for (int run = 0; run < runs; run++) {
+                    states[run] = kind.equals("compact") ? compactRun(inputs[run], window) : legacyRun(inputs[run]);
+                }
+                long allocated = allocatedBytes() - allocatedBefore;
+                long retained = retainedHeap() - baseline;
+                Reference.reachabilityFence(states);
+                System.out.printf("%-9s %-8s %14.1f %14.1f%n", brds, kind, retained / 1024.0 / runs,
+                        allocated / 1024.0 / runs / STEPS_PER_RUN);
+            }
+        }
+    }
+
+    private static AgentState compactRun(String brd, ContextWindow window) {
+        AgentState state = new AgentState();
+        state.addMessage(new UserMessage("Process BRD upload://" + Integer.toHexString(brd.hashCode())));
+        for (int turn = 0; turn < SUPERVISOR_TURNS; turn++) {
+            // As SupervisorAgent builds its prompt
+            List<Message> view = window.viewFor("supervisor", state);
+            List<Message> prompt = new ArrayList<>(view.size() + 3);
+            prompt.add(SYSTEM);
+            prompt.addAll(view);
+            state.addAgentOutput("supervisor", "{\"next\": \"" + agentFor(turn) + "\"}");
+            String output = agentOutput(turn, brd);
+            if (output != null) {
+                state.addAgentOutput(agentFor(turn), output);
+            }
+        }
+        return state;
+    }
+
+    private static LegacyState legacyRun(String brd) {
+        LegacyState state = new LegacyState();
+        state.messages.add(new UserMessage("Process BRD upload://" + Integer.toHexString(brd.hashCode())));
+        for (int turn = 0; turn < SUPERVISOR_TURNS; turn++) {
+            state.view();
+            state.addAgentOutput("supervisor", "{\"next\": \"" + agentFor(turn) + "\"}");
+            String output = agentOutput(turn, brd);
+            if (output != null) {
+                state.addAgentOutput(agentFor(turn), output);
+            }
+        }
+        return state;
+    }
+
+    private static String agentFor(int turn) {
+        return switch (turn) {
+            case 0 -> "ba_agent";
+            case 1 -> "dev_agent";
+            case 2 -> "coding_agent";
+            default -> "supervisor";
+        };
+    }
+
+    // BA: scenario list derived from the BRD (~64 KB); Dev: per-scenario JSON/Excel summary (~16 KB); Coding: short
+    private static String agentOutput(int turn, String brd) {
+        return switch (turn) {
+            case 0 -> brd.substring(0, 64 * 1024);
+            case 1 -> brd.substring(brd.length() - 16 * 1024);
+            case 2 -> "Jenkins build queued: brd-tests #" + Math.abs(brd.hashCode() % 1000);
+            default -> null;
+        };
+    }
+
+    private static String brd(int seed) {
+        StringBuilder text = new StringBuilder(80 * 1024);
+        for (int i = 1; text.length() < 80 * 1024; i++) {
+            text.append(i).append(". As a treasury user in region ").append(seed).append(", I want payment batch ")
+                    .append(i * 31 + seed).append(" reconciled against ledger ").append(i % 17)
+                    .append(" so that settlement breaks are caught before cut-off.\n");
+        }
+        return text.toString();
+    }
+
+    private static long retainedHeap() throws InterruptedException {
+        for (int i = 0; i < 3; i++) {
+            System.gc();
+            Thread.sleep(100); // Lets the Cleaner drop payloads of the previous round
+        }
+        return ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed();
+    }
+
+    private static long allocatedBytes() {
+        com.sun.management.ThreadMXBean threads = (com.sun.management.ThreadMXBean) ManagementFactory.getThreadMXBean();
+        return threads.getThreadAllocatedBytes(Thread.currentThread().getId());
+    }
+
+    // The AgentState layout before MessageLog/PayloadStore: mutable history copied into every prompt view
+    private static final class LegacyState {
+        final List<Message> messages = new ArrayList<>();
+        final Map<String, String> artifacts = new HashMap<>();
+
+        // ContextWindow rendered every message into a new list, then the supervisor copied it to prepend its prompt
+        List<Message> view() {
+            List<Message> full = new ArrayList<>(messages.size());
+            full.addAll(messages);
+            List<Message> prompt = new ArrayList<>(full);
+            prompt.add(0, SYSTEM);
+            return prompt;
+        }
+
+        void addAgentOutput(String agent, String content) {
+            if (content.length() <= INLINE_OUTPUT_CHARS) {
+                messages.add(new AssistantMessage(content, Map.of(AgentState.AGENT_KEY, agent)));
+                return;
+            }
+            artifacts.put(agent, content);
+            String reference = "[" + agent + " output stored as artifact '" + agent + "', " + content.length()
+                    + " chars] Preview: " + content.substring(0, PREVIEW_CHARS) + "...";
+            messages.add(new AssistantMessage(reference, Map.of(AgentState.AGENT_KEY, agent, AgentState.ARTIFACT_KEY, agent)));
         }
     }
 }
@@ -619,16 +8369,107 @@ Multi-agent system using Spring AI (adapted from Alibaba Graph example).
 - Set OPENAI_API_KEY.
 - mvn spring-boot:run
 - POST /upload-brd with 'file' multipart.
+- Or POST /upload-brd/stream (same body) for Server-Sent Events: queued, node, token..., analysis... (partial scenarios per chunk), done|error|cancelled.
+- Or POST /upload-brd/jobs (same body) -> 202 {jobId}; then GET /jobs/{id}, GET /jobs/{id}/result, DELETE /jobs/{id}.
+- Bulk: POST /upload-brd/batch with files=<pdf>... and/or a .zip (SSE). Identical documents (SHA-256) run once and are
+  reported as DUPLICATE; extraction runs ahead of the graph runs (brd.batch.*). Events: batch, document (manifest entry
+  per BRD, in completion order), summary {counts, elapsedMs, docsPerMinute}. Metrics: brd.batch.documents{status},
+  brd.batch.extract, brd.batch.throughput.
+- Job runs checkpoint AgentState after every node (brd.checkpoint.*). POST /jobs/{id}/resume continues a failed,
+  cancelled or JVM-interrupted run from its last checkpoint, skipping the BA/Dev work already done. Uploads live only
+  in memory/temp files, so resuming a run that stopped before BA finished answers 409 once its upload is gone; upload
+  the BRD again instead.
+  Metrics: brd.checkpoint.write (latency), brd.checkpoint.size (bytes).
 
 ## Workflow
-- Upload triggers graph.
+- Upload triggers graph. The BRD is handed to the agents as an upload://<id> reference: small files are parsed
+  straight from memory, large ones from a single spill file, and both are freed/deleted when the run ends.
+  Oversized uploads get 413. Metrics: brd.upload.bytes, brd.upload.spilled, brd.upload.live(.bytes).
+  To compare peak RSS / disk I/O per upload, watch VmHWM in /proc/<pid>/status and `pidstat -d` while posting a BRD.
 - Supervisor routes: BA (extract/analyze) -> Dev (JSON/microservice) -> Coding (Jenkins) -> FINISH.
-- Agents use tools; state persists messages.
+- The supervisor routes by rule when AgentState makes the next step obvious and calls the LLM only otherwise.
+  Metrics: brd.supervisor.routes{path=rule|llm,next}, brd.supervisor.llm.latency, brd.supervisor.saved.ms.
+- LLM routing asks for a schema'd JSON object (provider JSON mode, brd.supervisor.json-mode). Malformed replies are
+  repaired locally (code fences, surrounding prose), then re-asked once; a decision that still does not parse fails
+  the job with its checkpoint intact instead of finishing the run. Metrics: brd.supervisor.parse{outcome}.
+- When BA outputs a numbered/bulleted scenario list, Dev calls jsonGeneratorTool + microserviceCallerTool per scenario
+  in parallel (brd.dev.fan-out.concurrency); failures are per scenario and results keep BA order.
+- After BA, when the supervisor routes by LLM (fast path off; rule-based routing is instant and never speculates),
+  its decision overlaps with Dev's first step (brd.speculation.*): jsonGeneratorTool starts
+  per scenario and the microservice connection is opened; Dev uses the results if the supervisor picks dev_agent,
+  otherwise they are dropped. Metrics: brd.speculation{outcome=committed|discarded} (hit rate),
+  brd.speculation.saved (time the work ran ahead), brd.speculation.wasted.
+- Agents use tools; state persists messages. Large agent outputs are stored once as artifacts and referenced
+  from history; each agent gets its own view (ContextWindow) with older turns summarized past brd.context.token-budget.
+- AgentState keeps history in a persistent MessageLog (appends share earlier messages; prompt views are the log
+  itself unless an artifact is inlined) and large outputs as Payload handles from PayloadStore: one gzip copy per
+  distinct content across all runs, spilled to brd.payload.spill-dir above brd.payload.spill-bytes and freed when
+  the last state drops it. Checkpoints write the payload bytes as-is. Metrics: brd.payload.intern{result},
+  brd.payload.entries, brd.payload.heap.bytes, brd.payload.spilled.bytes. bench/AgentStateFootprintBenchmark
+  compares retained heap per run and allocation per step at 1k concurrent runs with the old layout.
+- The graph is compiled once at startup (a bad graph fails boot) and shared by all requests.
 
 ## Notes
 - Tools are mocks; implement real PDF extraction, API calls.
 - For Alibaba DashScope, replace OpenAiChatModel.
 - Debug with logs.
+- Job pool: brd.jobs.pool-size / queue-capacity; a full queue returns 429. Size it from GET /jobs/stats or
+  /actuator/metrics/brd.jobs.queue.depth, brd.jobs.queue.wait and brd.jobs.run.
+- OpenAIAnalysisTool switches to map-reduce above brd.analysis.single-shot-chars: chunks are analyzed concurrently
+  (brd.analysis.concurrency, max-requests-per-second), scenarios are de-duplicated (exact + near-duplicate) and merged
+  in document order; per-chunk partial results go to a callback. A failed chunk is logged and skipped (the analysis
+  fails only if every chunk does); a reply that is not a list counts as one scenario, as in single-shot mode.
+  Metrics: brd.analysis.stage{map|reduce}, brd.analysis.tokens, brd.analysis.chunk.failures.
+- PDFs are parsed in page ranges across brd.extraction.workers (each worker parses the PDF structure once and reuses
+  it for its ranges); DocumentExtractorTool.extractChunks returns a lazy, in-order iterator of section-aware chunks
+  (heading, TEXT/TABLE, requirement IDs, pages; also on cache hits) usable before the last page is parsed.
+  documentAnalysisTool feeds that iterator straight into OpenAIAnalysisTool's map step, so scenario generation for the
+  first sections overlaps parsing of the rest.
+- PDF extraction is cached by SHA-256 of the file (brd.extraction-cache.*); set disk-dir to keep it across restarts.
+  Metrics: brd.extraction.cache.hits{tier}, misses, evictions, chars.
+- LLM responses are cached in front of the ChatModel (brd.llm-cache.*): exact key on model, default and prompt options
+  and messages (upload:// references replaced by the document's SHA-256, so re-uploads hit), optional
+  embedding-similarity tier, TTL + LRU, per-agent opt-out. Metrics: brd.llm.cache.hits{tier}, misses, evictions, bypass.
+- Tool calls are memoized (brd.tool-memo.*) according to per-tool idempotency declared in AppConfig: extraction,
+  analysis and JSON generation are cached for the TTL; microservice calls only merge identical concurrent calls;
+  Jenkins calls always run. The Dev fan-out and speculation go through the same memoized functions, and a tool's
+  fallback result (e.g. the extractor's mock text after a failure) is shared with concurrent callers but not cached.
+  Document tools are keyed by the upload's content hash (runs of the same BRD share results) or a plain file's size
+  and modification time. Metrics: brd.tool.memo.avoided{tool,reason=cache|single_flight}, brd.tool.memo.saved{tool},
+  brd.tool.memo.misses{tool}, entries, in-flight.
+- Cache misses go through one LLM scheduler (brd.llm-scheduler.*), one grant per provider HTTP request (a tool loop
+  makes several): requests/min and tokens/min buckets, a cap on requests in flight, supervisor > agents > map-reduce analysis, round-robin between runs, and on a 429 the rate halves
+  and dispatch pauses (exponential, then +5% per success). Metrics: brd.llm.scheduler.queue-wait{priority}, queued,
+  in-flight, rate-factor, throttled.
+- Every run is traced: one span per graph node, agent/tool LLM call (tokens, retries, chars) and tool call (bytes,
+  retries). GET /jobs/{id}/trace returns the run's breakdown and spans, GET /jobs/slow-runs the slowest recent runs.
+  Metrics: brd.graph.node{node}, brd.llm.call{caller}, brd.llm.tokens{caller,type}, brd.llm.retries, brd.tool.call{tool},
+  brd.tool.payload{tool,direction}, brd.tool.retries, brd.run.duration.
+- Runs are bounded (brd.budget.*): after each supervisor decision LoopGuard checks steps, tokens, wall clock and
+  repeated routing cycles; when one is exhausted the run finishes early with the agents' latest outputs, a "budget"
+  stream event and brd.budget.exhausted{budget}.
+- MicroserviceCallerTool and JenkinsApiCallerTool share ToolHttpClient (brd.http.*): keep-alive/HTTP/2, per-host limit,
+  jittered retries (429 and connect failures; IO errors/timeouts/5xx only for brd.http.retry.idempotent-targets, so a
+  Jenkins build is never triggered twice), per-host circuit breaker. Metrics: brd.http.requests, retries, rejected, inflight, waiting,
+  circuit.open. Point brd.microservice.url / brd.jenkins.url at a local stub (e.g. com.sun.net.httpserver) to test.
+- POST /mcp speaks MCP over JSON-RPC 2.0 (initialize, ping, tools/list, tools/call) for the tools in brd.mcp.tools,
+  including batches (entries run in parallel, responses in request order). It requires
+  "Authorization: Bearer <brd.mcp.token>" and refuses everything while no token is set. The Jenkins and microservice
+  tools are not exposed unless listed, and file tools (brd.mcp.upload-only-tools) take upload:// references only. tools/list is built once at startup. McpClients
+  gives agents a client: a URL pointing at this instance's own /mcp goes straight to McpServer on the calling
+  thread (brd.mcp.in-process) with the same requests, ids and errors; other URLs share one keep-alive/HTTP/2 client.
+  Metrics: brd.mcp.requests{method,outcome}, brd.mcp.batch.size, brd.mcp.client.messages{transport}.
+  bench/McpLoadTest compares per-hop latency and calls/s over HTTP, in-process and batched, both for client-driven
+  hops and for nested agent-to-agent hops made inside a server request.
+- Benchmarks (JMH) live in src/test/java/.../bench; GraphCompileBenchmark compares per-request compile vs the shared graph at 16 threads;
+  MapReduceAnalysisBenchmark (mock ChatModel) shows analysis time vs document size and concurrency;
+  ExtractionCacheBenchmark compares cold extraction (1/4 workers, first chunk) with cache hits on 50/300-page PDFs.
+- Offline end-to-end numbers: the "bench" profile (test scope) swaps OpenAI for MockChatModel and BenchApp points the
+  microservice/Jenkins URLs at local stubs; extraction, analysis, JSON, fan-out and HTTP tools run for real, and every
+  mock request still goes through the LLM scheduler (brd.llm-scheduler.*; the response cache is off).
+  EndToEndBenchmark (JMH, SampleTime; add -prof gc) times whole graph runs; LoadDriver drives POST /upload-brd over
+  BRD sizes x concurrency and reports docs/min, p50/p99/max and allocation MB/s (also appended to
+  target/bench/load-driver.csv). Compare runs before merging anything on the request path.
 ```
 
 This matches the example's multi-agent pattern: supervisor-coordinated loop with tools and conditional routing. Test and extend!